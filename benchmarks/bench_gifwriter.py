@@ -0,0 +1,67 @@
+"""
+Compare write_gif against saving full RGB frames with Pillow, which quantizes each frame on its own.
+
+    $ python benchmarks/bench_gifwriter.py --root-dir <root> --dataset DR_USA_Intersection_EP0
+"""
+
+import io
+import logging
+import time
+from pathlib import Path
+
+import click
+
+from interactionviz.catalog import Catalog
+from interactionviz.gifwriter import write_gif
+from interactionviz.gifwriter.gifwriter import _render_map, draw_frame
+from interactionviz.viewers import viewport_for_map
+
+
+def write_gif_rgb(tracks, interaction_map, fileobj, width, height):
+    """
+    The Pillow based writer that write_gif replaced, kept as a baseline.
+    """
+    viewport = viewport_for_map(width, height, interaction_map)
+    map_img = _render_map(viewport, interaction_map, "pil")
+    imgs = [draw_frame(viewport, map_img, f, width, height, "pil") for f in tracks]
+    imgs[0].save(
+        fp=fileobj,
+        format="GIF",
+        append_images=imgs[1:],
+        save_all=True,
+        duration=100,
+        loop=1,
+    )
+
+
+def _timed(fn, *args):
+    out = io.BytesIO()
+    start = time.perf_counter()
+    fn(*args, out, 800, 600)
+    return time.perf_counter() - start, len(out.getvalue())
+
+
+@click.command()
+@click.option("--root-dir", required=True, type=click.Path(exists=True))
+@click.option("--dataset", required=True)
+@click.option("--session", default=0, type=int)
+@click.option("--frames", default=200, type=int, help="Frames to encode.")
+def main(root_dir, dataset, session, frames):
+    logging.disable(logging.WARNING)
+    catalog = Catalog(Path(root_dir))
+    interaction_map = catalog.load_map(dataset)
+    tracks = catalog.load_tracks(dataset, session)[:frames]
+
+    rgb_s, rgb_bytes = _timed(write_gif_rgb, tracks, interaction_map)
+    new_s, new_bytes = _timed(write_gif, tracks, interaction_map)
+
+    print(f"frames:    {len(tracks)}")
+    print(f"rgb:       {rgb_s:.2f}s {rgb_bytes / 1e6:.2f}MB")
+    print(
+        f"palette:   {new_s:.2f}s {new_bytes / 1e6:.2f}MB "
+        f"({rgb_s / new_s:.1f}x faster, {rgb_bytes / new_bytes:.1f}x smaller)"
+    )
+
+
+if __name__ == "__main__":
+    main()
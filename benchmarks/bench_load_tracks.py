@@ -0,0 +1,80 @@
+"""
+Compare the bulk NumPy trackfile parser against the original row-by-row parser.
+
+    $ python benchmarks/bench_load_tracks.py <root>/recorded_trackfiles/DR_USA_Intersection_EP0/vehicle_tracks_000.csv
+"""
+
+import time
+from collections import defaultdict
+from csv import DictReader
+from pathlib import Path
+
+import click
+import numpy as np
+
+from interactionviz.tracks import Agent, Frame, load_tracks_files
+from interactionviz.tracks.tracks import _kind_from_str
+
+
+def load_tracks_files_rowwise(*trackfiles):
+    """
+    The DictReader based loader that load_tracks_files replaced, kept as a baseline.
+    """
+    tracks = []
+    all_frame_ids = set()
+
+    for p in trackfiles:
+        agents_by_frame = defaultdict(list)
+        with Path(p).open() as f:
+            for dct in DictReader(f):
+                if "length" in dct:
+                    extent = np.array([float(dct["length"]), float(dct["width"])])
+                else:
+                    extent = None
+                agents_by_frame[int(dct["frame_id"])].append(
+                    Agent(
+                        kind=_kind_from_str(dct["agent_type"]),
+                        track_id=str(dct["track_id"]),
+                        position=np.array([float(dct["x"]), float(dct["y"])]),
+                        yaw=float(dct["psi_rad"]) if "psi_rad" in dct else None,
+                        extent=extent,
+                    )
+                )
+        tracks.append(agents_by_frame)
+        all_frame_ids |= set(agents_by_frame.keys())
+
+    result = []
+    for frame_id in sorted(all_frame_ids):
+        agents = []
+        for t in tracks:
+            if frame_id in t:
+                agents.extend(t[frame_id])
+        result.append(Frame(frame_id=frame_id, agents=agents))
+    return result
+
+
+def _best_of(repeat, fn, *args):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+@click.command()
+@click.argument("trackfiles", nargs=-1, required=True, type=click.Path(exists=True))
+@click.option("--repeat", default=3, help="Report the best of this many runs.")
+def main(trackfiles, repeat):
+    rowwise_s, frames = _best_of(repeat, load_tracks_files_rowwise, *trackfiles)
+    bulk_s, store = _best_of(repeat, load_tracks_files, *trackfiles)
+
+    assert len(frames) == len(store)
+    print(f"rows:    {store.num_rows}")
+    print(f"frames:  {len(store)}")
+    print(f"rowwise: {rowwise_s:.3f}s")
+    print(f"bulk:    {bulk_s:.3f}s ({rowwise_s / bulk_s:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Compare the NumPy rasterizer against drawing each shape with PIL,
+for the map and for the agents of every frame, as write_gif renders them.
+
+    $ python benchmarks/bench_raster.py --root-dir <root> --dataset DR_USA_Intersection_EP0
+"""
+
+import logging
+import time
+from pathlib import Path
+
+import click
+import numpy as np
+
+from interactionviz.catalog import Catalog
+from interactionviz.gifwriter.encoder import Palette
+from interactionviz.gifwriter.gifwriter import BACKENDS, _Renderer, _render_map
+from interactionviz.viewers import viewport_for_map
+from interactionviz.viewers.agents import AGENT_COLORS, frame_arrays
+
+
+@click.command()
+@click.option("--root-dir", required=True, type=click.Path(exists=True))
+@click.option("--dataset", required=True)
+@click.option("--session", default=0, type=int)
+@click.option("--frames", default=500, type=int, help="Frames to render.")
+def main(root_dir, dataset, session, frames):
+    logging.disable(logging.WARNING)
+    catalog = Catalog(Path(root_dir))
+    interaction_map = catalog.load_map(dataset)
+    tracks = catalog.load_tracks(dataset, session)
+    agents = [frame_arrays(tracks[i]) for i in range(min(frames, len(tracks)))]
+    viewport = viewport_for_map(800, 600, interaction_map)
+
+    print(
+        f"frames:  {len(agents)}, {np.mean([len(a.track_ids) for a in agents]):.1f} agents per frame"
+    )
+    map_img = _render_map(viewport, interaction_map, "pil")
+    palette = Palette.build(np.asarray(map_img), AGENT_COLORS)
+
+    for backend in BACKENDS:
+        start = time.perf_counter()
+        _render_map(viewport, interaction_map, backend)
+        map_ms = 1000 * (time.perf_counter() - start)
+
+        renderer = _Renderer(viewport, map_img, palette, 100, backend)
+        start = time.perf_counter()
+        for a in agents:
+            renderer.indices(a)
+        frame_ms = 1000 * (time.perf_counter() - start) / len(agents)
+
+        print(f"{backend:6s}  map {map_ms:6.1f}ms  frame {frame_ms:6.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
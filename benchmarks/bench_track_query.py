@@ -0,0 +1,90 @@
+"""
+Compare TrackQuery against scanning the frames of a session, for random box x frame window queries.
+
+    $ python benchmarks/bench_track_query.py <root>/recorded_trackfiles/DR_USA_Intersection_EP0/vehicle_tracks_000.csv
+"""
+
+import time
+
+import click
+import numpy as np
+
+from interactionviz.tracks import TrackQuery, load_tracks_files
+
+
+def scan_agents(tracks, first, stop, lower, upper):
+    """
+    The Python scan over Frame.agents that TrackQuery replaces, kept as a baseline.
+    """
+    return [
+        (frame.frame_id, agent.track_id)
+        for frame in tracks
+        if first <= frame.frame_id < stop
+        for agent in frame.agents
+        if np.all(agent.position >= lower) and np.all(agent.position <= upper)
+    ]
+
+
+def scan_columns(tracks, first, stop, lower, upper):
+    """
+    A vectorized scan over every row of the store.
+    """
+    positions = np.stack([tracks.x, tracks.y], axis=-1)
+    inside = (
+        (tracks.frame_id >= first)
+        & (tracks.frame_id < stop)
+        & np.all((positions >= lower) & (positions <= upper), axis=-1)
+    )
+    return np.flatnonzero(inside)
+
+
+def _timed(fn, queries):
+    start = time.perf_counter()
+    results = [fn(*q) for q in queries]
+    return (time.perf_counter() - start) / len(queries), results
+
+
+@click.command()
+@click.argument("trackfiles", nargs=-1, required=True, type=click.Path(exists=True))
+@click.option("--queries", default=200, type=int)
+@click.option("--box-size", default=30.0, type=float, help="Side of the boxes, meters.")
+@click.option("--window", default=600, type=int, help="Frames in each query.")
+@click.option(
+    "--scan-queries", default=5, type=int, help="Queries for the Python scan."
+)
+def main(trackfiles, queries, box_size, window, scan_queries):
+    tracks = load_tracks_files(*trackfiles)
+    print(f"rows:    {tracks.num_rows}, frames: {len(tracks)}")
+
+    start = time.perf_counter()
+    index = TrackQuery(tracks)
+    print(f"index:   {1000 * (time.perf_counter() - start):.1f}ms to build")
+
+    rng = np.random.default_rng(0)
+    positions = np.stack([tracks.x, tracks.y], axis=-1)
+    centers = positions[rng.integers(0, tracks.num_rows, queries)]
+    firsts = rng.integers(tracks.frame_ids[0], tracks.frame_ids[-1], queries)
+    boxes = [
+        (int(f), int(f) + window, c - box_size / 2, c + box_size / 2)
+        for f, c in zip(firsts, centers)
+    ]
+
+    query_s, found = _timed(
+        lambda f, s, lo, hi: index.query((f, s), bbox=(lo, hi)).rows, boxes
+    )
+    columns_s, expected = _timed(lambda *q: scan_columns(tracks, *q), boxes)
+    assert all(np.array_equal(a, b) for a, b in zip(found, expected))
+    agents_s, _ = _timed(lambda *q: scan_agents(tracks, *q), boxes[:scan_queries])
+
+    print(f"matches: {np.mean([len(f) for f in found]):.0f} rows per query")
+    print(f"agents:  {1000 * agents_s:9.2f}ms per query")
+    print(f"columns: {1000 * columns_s:9.2f}ms per query")
+    print(
+        f"query:   {1000 * query_s:9.2f}ms per query "
+        f"({agents_s / query_s:.0f}x faster than agents, "
+        f"{columns_s / query_s:.1f}x faster than columns)"
+    )
+
+
+if __name__ == "__main__":
+    main()
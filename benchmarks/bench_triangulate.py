@@ -0,0 +1,96 @@
+"""
+Compare zipper lane triangulation against the Delaunay triangulation it replaced,
+on every map in the dataset.
+
+    $ python benchmarks/bench_triangulate.py --root-dir </root/of/interaction/dataset>
+
+For each map this reports the time to triangulate all lanes with each method,
+and how far the triangulated area is from the area enclosed by the lane boundaries,
+which shows where Delaunay fills curved lanes incorrectly.
+"""
+
+import pathlib
+import time
+
+import click
+import numpy as np
+from scipy.spatial import Delaunay
+
+from interactionviz.maps import load_map_xml
+from interactionviz.maps.map import zipper_triangulate
+
+
+def delaunay_triangulate(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """
+    The original Lane.to_triangles, kept as a baseline.
+    """
+    left_ps = list(left)
+    right_ps = list(right)
+
+    def is_left(idx):
+        return idx < len(left_ps)
+
+    ps = left_ps + right_ps
+    simplices = Delaunay(ps).simplices
+
+    result = []
+    for i in range(simplices.shape[0]):
+        num_left_points = sum(is_left(idx) for idx in simplices[i])
+        if num_left_points == 1 or num_left_points == 2:
+            result.append(simplices[i])
+
+    return np.array(result, dtype=np.int64).reshape(-1, 3)
+
+
+def _area_error(left, right, triangles) -> float:
+    ps = np.concatenate([left, right])
+    t = ps[triangles]
+    u, v = t[:, 1] - t[:, 0], t[:, 2] - t[:, 0]
+    area = 0.5 * np.abs(u[:, 0] * v[:, 1] - u[:, 1] * v[:, 0]).sum()
+
+    outline = np.concatenate([left, right[::-1]])
+    x, y = outline[:, 0], outline[:, 1]
+    expected = 0.5 * abs(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))
+    return abs(area - expected)
+
+
+def _run(method, boundaries):
+    start = time.perf_counter()
+    triangles = [method(left, right) for left, right in boundaries]
+    elapsed = time.perf_counter() - start
+
+    error = sum(_area_error(l, r, t) for (l, r), t in zip(boundaries, triangles))
+    return elapsed, error
+
+
+@click.command()
+@click.option(
+    "--root-dir",
+    required=True,
+    type=click.Path(exists=True, dir_okay=True, file_okay=False),
+    help="Root directory of the interaction dataset.",
+)
+def main(root_dir: str):
+    print(
+        f"{'map':<32} {'lanes':>6} {'delaunay':>10} {'zipper':>10} {'speedup':>8}"
+        f" {'delaunay err m2':>16} {'zipper err m2':>14}"
+    )
+
+    for path in sorted(pathlib.Path(root_dir).joinpath("maps").glob("*.osm_xy")):
+        interaction_map = load_map_xml(path)
+        boundaries = [
+            (lane.left_way.positions, lane.right_way.positions)
+            for lane in interaction_map.lanes.values()
+        ]
+
+        delaunay_s, delaunay_err = _run(delaunay_triangulate, boundaries)
+        zipper_s, zipper_err = _run(zipper_triangulate, boundaries)
+
+        print(
+            f"{path.stem:<32} {len(boundaries):>6} {delaunay_s:>9.3f}s {zipper_s:>9.3f}s"
+            f" {delaunay_s / zipper_s:>7.1f}x {delaunay_err:>16.1f} {zipper_err:>14.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Compare the size and encoding cost of the WebViewer's JSON frames against binary delta frames.
+
+    $ python benchmarks/bench_web_protocol.py <root>/recorded_trackfiles/DR_USA_Intersection_EP0/vehicle_tracks_000.csv
+"""
+
+import json
+import time
+
+import click
+import numpy as np
+
+from interactionviz.tracks import load_tracks_files
+from interactionviz.viewers import Viewport, protocol
+from interactionviz.viewers.web import _serialize_agents
+
+
+def _viewport(tracks):
+    return Viewport(
+        screen_width=1000,
+        screen_height=1000,
+        viewport_x_range=np.array([tracks.x.min(), tracks.x.max()]),
+        viewport_y_range=np.array([tracks.y.min(), tracks.y.max()]),
+    )
+
+
+@click.command()
+@click.argument("trackfiles", nargs=-1, required=True, type=click.Path(exists=True))
+def main(trackfiles):
+    tracks = load_tracks_files(*trackfiles)
+    viewport = _viewport(tracks)
+
+    start = time.perf_counter()
+    json_bytes = 0
+    for i, frame in enumerate(tracks):
+        payload = dict(
+            current_index=i,
+            max_index=len(tracks),
+            agents=_serialize_agents(viewport, frame),
+        )
+        json_bytes += len(json.dumps(dict(action="frame", payload=payload)))
+    json_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    encoder = protocol.FrameEncoder(viewport, tracks)
+    binary_bytes = 0
+    for i, frame in enumerate(tracks):
+        tracks_payload = encoder.new_tracks(frame)
+        if tracks_payload is not None:
+            binary_bytes += len(
+                json.dumps(dict(action="tracks", payload=tracks_payload))
+            )
+        binary_bytes += len(encoder.encode(i))
+    binary_s = time.perf_counter() - start
+
+    n = len(tracks)
+    print(f"frames: {n}")
+    print(f"json:   {json_bytes / n:8.0f} bytes/frame {1e6 * json_s / n:8.1f} us/frame")
+    print(
+        f"binary: {binary_bytes / n:8.0f} bytes/frame {1e6 * binary_s / n:8.1f} us/frame"
+        f" ({json_bytes / binary_bytes:.1f}x smaller, {json_s / binary_s:.1f}x faster)"
+    )
+
+
+if __name__ == "__main__":
+    main()
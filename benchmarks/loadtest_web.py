@@ -0,0 +1,145 @@
+"""
+Load test the WebViewer with many simulated clients on localhost.
+
+The server runs in a background thread, each client negotiates an encoding and plays
+the recording from the start. Frame latency is how late each frame arrives,
+relative to when it was due at the playback rate.
+
+    $ python benchmarks/loadtest_web.py --root-dir <root> --dataset DR_USA_Intersection_EP0 --clients 50
+"""
+
+import asyncio
+import json
+import socket
+import threading
+import time
+from pathlib import Path
+
+import click
+import numpy as np
+import websockets
+
+from interactionviz.maps import load_map_xml
+from interactionviz.tracks import load_tracks_files
+from interactionviz.viewers import WebViewer, protocol
+from interactionviz.viewers.framecache import FrameCache
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+class _ServerThread:
+    def __init__(self, viewer: WebViewer, port: int):
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            self.server = self.loop.run_until_complete(viewer.serve("localhost", port))
+            ready.set()
+            self.loop.run_forever()
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+        ready.wait()
+
+    def cpu_time(self) -> float:
+        """
+        The CPU time used by the server thread so far.
+        """
+
+        async def thread_time():
+            return time.thread_time()
+
+        return asyncio.run_coroutine_threadsafe(thread_time(), self.loop).result()
+
+
+async def _client(uri: str, encoding: str, num_frames: int, rate: float):
+    latencies = []
+    received = 0
+    # The last frame index received, none if the session ends first.
+    index = -1
+
+    async with websockets.connect(uri, max_size=None) as websocket:
+        await websocket.send(json.dumps(dict(action="hello", encodings=[encoding])))
+        while json.loads(await websocket.recv()).get("action") != "hello":
+            pass
+
+        await websocket.send(json.dumps(dict(action="play", rate=rate)))
+        started = time.perf_counter()
+
+        while received < num_frames:
+            message = await websocket.recv()
+            if isinstance(message, bytes):
+                index = protocol.decode(message)["index"]
+            else:
+                response = json.loads(message)
+                if response["action"] == "ended":
+                    break
+                if response["action"] != "frame":
+                    continue
+                index = response["payload"]["current_index"]
+
+            received += 1
+            latencies.append(time.perf_counter() - (started + index / rate))
+
+        await websocket.send(json.dumps(dict(action="pause")))
+
+    return latencies, index + 1 - received
+
+
+@click.command()
+@click.option("--root-dir", required=True, type=click.Path(exists=True))
+@click.option("--dataset", required=True)
+@click.option("--session", default=0, type=int)
+@click.option("--clients", default=50, type=int)
+@click.option("--frames", default=100, type=int, help="Frames played by each client.")
+@click.option("--rate", default=50.0, help="Playback rate in frames per second.")
+@click.option(
+    "--encoding",
+    default=protocol.BINARY,
+    type=click.Choice([protocol.BINARY, protocol.JSON]),
+)
+@click.option("--cache-mb", default=256, type=int, help="0 disables the frame cache.")
+def main(root_dir, dataset, session, clients, frames, rate, encoding, cache_mb):
+    root = Path(root_dir)
+    interaction_map = load_map_xml(root / "maps" / f"{dataset}.osm_xy")
+    tracks = load_tracks_files(
+        *sorted(
+            (root / "recorded_trackfiles" / dataset).glob(f"*_tracks_{session:03d}.csv")
+        )
+    )
+    frame_cache = FrameCache(max_bytes=cache_mb * 1024 * 1024)
+    viewer = WebViewer(interaction_map, tracks, frame_cache=frame_cache)
+
+    port = _free_port()
+    server = _ServerThread(viewer, port)
+    uri = f"ws://localhost:{port}"
+
+    async def run_clients():
+        return await asyncio.gather(
+            *[_client(uri, encoding, frames, rate) for _ in range(clients)]
+        )
+
+    cpu_before = server.cpu_time()
+    results = asyncio.run(run_clients())
+    cpu = server.cpu_time() - cpu_before
+
+    latencies = 1e3 * np.concatenate([r[0] for r in results])
+    dropped = sum(r[1] for r in results)
+    print(f"clients:          {clients}")
+    print(f"frames received:  {len(latencies)} ({dropped} dropped)")
+    print(f"latency p50:      {np.percentile(latencies, 50):.1f}ms")
+    print(f"latency p99:      {np.percentile(latencies, 99):.1f}ms")
+    print(f"server cpu:       {cpu:.2f}s ({1e3 * cpu / clients:.1f}ms per client)")
+    print(
+        f"frame cache:      {frame_cache.hits} hits, {frame_cache.misses} misses, "
+        f"{frame_cache.nbytes / 1024:.0f}kB"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Time each stage of the pipeline, from parsing to rendering, on a synthetic dataset,
+and write the timings as JSON, so runs on different commits can be compared.
+
+    $ python benchmarks/suite.py --output before.json
+    $ git checkout <branch>
+    $ python benchmarks/suite.py --output after.json --compare before.json
+
+The dataset is generated by synthetic.py, so the suite needs no downloads.
+With --compare, stages that got slower than the baseline by more than --threshold
+are reported, and the suite exits with status 1.
+"""
+
+import io
+import json
+import pathlib
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple
+
+import click
+import numpy as np
+
+from interactionviz.analysis import interactions, kinematics
+from interactionviz.cache import Cache
+from interactionviz.gifwriter import write_gif
+from interactionviz.maps import MapMesh, load_map_xml
+from interactionviz.tracks import TrackQuery, load_tracks_files
+from interactionviz.viewers import protocol, viewport_for_map
+from interactionviz.viewers.web import _serialize_agents
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent))
+import synthetic  # noqa: E402
+
+SCREEN_SIZE = 1000
+QUERY_BOX = 20.0  # meters
+QUERY_FRAMES = 100
+
+
+def _stages(root: pathlib.Path, gif_frames: int) -> List[Tuple[str, Callable]]:
+    """
+    The stages to time, in pipeline order, each as a function of no arguments.
+    Later stages reuse what earlier ones loaded, so only the stage itself is timed.
+    """
+    map_path = root.joinpath("maps", f"{synthetic.DATASET}.osm_xy")
+    trackfiles = sorted(
+        root.joinpath("recorded_trackfiles", synthetic.DATASET).glob("*.csv")
+    )
+    interaction_map = load_map_xml(map_path)
+    tracks = load_tracks_files(*trackfiles)
+    viewport = viewport_for_map(SCREEN_SIZE, SCREEN_SIZE, interaction_map)
+    positions = np.stack([tracks.x, tracks.y], axis=-1).astype(np.float64)
+    cache = Cache(root.joinpath("cache"))
+    cache.load_tracks(*trackfiles)
+    cache.load_map(map_path)
+
+    def triangulate():
+        for lane in interaction_map.lanes.values():
+            lane.to_triangles()
+
+    def serialize_agents():
+        for frame in tracks:
+            _serialize_agents(viewport, frame)
+
+    def encode_frames():
+        encoder = protocol.FrameEncoder(viewport, tracks)
+        for i, frame in enumerate(tracks):
+            encoder.new_tracks(frame)
+            encoder.encode(i)
+
+    def track_index():
+        tracks.track_rows = tracks.track_offsets = None
+        tracks.build_track_index()
+
+    query = TrackQuery(tracks)
+    rng = np.random.default_rng(0)
+    centers = positions[rng.integers(tracks.num_rows, size=100)]
+    starts = rng.integers(0, max(len(tracks) - QUERY_FRAMES, 1), size=len(centers))
+
+    def track_query():
+        for center, start in zip(centers, tracks.frame_ids[starts]):
+            query.query(
+                frames=(start, start + QUERY_FRAMES),
+                bbox=(center - QUERY_BOX, center + QUERY_BOX),
+            )
+
+    return [
+        ("load_map_xml", lambda: load_map_xml(map_path)),
+        ("lane_to_triangles", triangulate),
+        ("map_mesh", lambda: MapMesh.build(interaction_map)),
+        ("load_tracks_files", lambda: load_tracks_files(*trackfiles)),
+        ("cache_load_tracks", lambda: cache.load_tracks(*trackfiles)),
+        ("cache_load_map", lambda: cache.load_map(map_path)),
+        ("viewport_project", lambda: viewport.project(positions)),
+        ("serialize_agents", serialize_agents),
+        ("encode_frames", encode_frames),
+        ("track_index", track_index),
+        ("track_query_build", lambda: TrackQuery(tracks)),
+        ("track_query", track_query),
+        ("kinematics", lambda: kinematics(tracks)),
+        ("interactions", lambda: interactions(tracks)),
+        (
+            "write_gif",
+            lambda: write_gif(tracks[:gif_frames], interaction_map, io.BytesIO()),
+        ),
+    ]
+
+
+def _time(fn: Callable, repeats: int) -> Dict[str, float]:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return dict(min=min(times), median=statistics.median(times), repeats=repeats)
+
+
+def _metadata(scale: synthetic.Scale) -> Dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=pathlib.Path(__file__).parent,
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+    return dict(
+        commit=commit or None,
+        python=platform.python_version(),
+        numpy=np.__version__,
+        platform=platform.platform(),
+        scale=scale.__dict__,
+    )
+
+
+def _compare(stages: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """
+    Print each stage's time against the baseline, returning the stages that regressed.
+    """
+    regressions = []
+    print(f"\n{'stage':<20} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for name, result in stages.items():
+        if name not in baseline:
+            print(f"{name:<20} {'-':>10} {result['min']:10.4f}")
+            continue
+        ratio = result["min"] / baseline[name]["min"]
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            flag = " REGRESSION"
+        print(
+            f"{name:<20} {baseline[name]['min']:10.4f} {result['min']:10.4f} "
+            f"{ratio:7.2f}{flag}"
+        )
+    return regressions
+
+
+@click.command()
+@click.option("--lanes", default=synthetic.Scale.lanes, type=int)
+@click.option("--agents", default=synthetic.Scale.agents, type=int)
+@click.option("--frames", default=synthetic.Scale.frames, type=int)
+@click.option("--seed", default=synthetic.Scale.seed, type=int)
+@click.option("--repeats", default=3, type=int, help="Runs of each stage.")
+@click.option("--gif-frames", default=200, type=int, help="Frames to render to GIF.")
+@click.option(
+    "--workdir",
+    type=click.Path(file_okay=False),
+    help="Where to generate the dataset, a temporary directory by default.",
+)
+@click.option("--output", type=click.Path(dir_okay=False), help="Write JSON results.")
+@click.option(
+    "--compare",
+    type=click.Path(exists=True, dir_okay=False),
+    help="JSON results of a previous run to compare against.",
+)
+@click.option(
+    "--threshold",
+    default=0.1,
+    type=float,
+    help="The slowdown over the baseline that counts as a regression.",
+)
+def main(
+    lanes,
+    agents,
+    frames,
+    seed,
+    repeats,
+    gif_frames,
+    workdir,
+    output,
+    compare,
+    threshold,
+):
+    scale = synthetic.Scale(lanes, agents, frames, seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        root = pathlib.Path(workdir or tmp)
+        synthetic.write_dataset(root, scale)
+
+        stages = {}
+        for name, fn in _stages(root, gif_frames):
+            stages[name] = _time(fn, repeats)
+            print(
+                f"{name:<20} min {stages[name]['min']:10.4f}s "
+                f"median {stages[name]['median']:10.4f}s"
+            )
+
+    results = dict(metadata=_metadata(scale), stages=stages)
+    if output:
+        pathlib.Path(output).write_text(json.dumps(results, indent=2) + "\n")
+
+    if compare:
+        baseline = json.loads(pathlib.Path(compare).read_text())
+        if baseline["metadata"]["scale"] != results["metadata"]["scale"]:
+            print("warning: the baseline was run at a different scale")
+        regressions = _compare(stages, baseline["stages"], threshold)
+        if regressions:
+            print(f"\n{len(regressions)} stage(s) regressed: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Generate a synthetic dataset, laid out like the INTERACTION dataset, so the benchmarks run offline.
+
+    <root>/maps/<dataset>.osm_xy
+    <root>/recorded_trackfiles/<dataset>/{vehicle,pedestrian}_tracks_000.csv
+
+The map is an intersection of straight roads meeting at the origin, each with several lanes,
+split into lanelets whose boundaries are shared between neighbouring lanes, as in lanelet2 maps.
+Vehicles drive along the lanes at constant speeds, and pedestrians wander around the
+intersection. The same arguments always generate the same files.
+
+    $ python benchmarks/synthetic.py <root> --lanes 200 --agents 1500 --frames 10000
+"""
+
+import pathlib
+from dataclasses import dataclass
+from typing import List
+
+import click
+import numpy as np
+
+from interactionviz.tracks import FRAME_INTERVAL_MS
+
+DATASET = "DR_SYNTHETIC"
+ROADS = 4
+LANES_PER_ROAD = 3
+LANE_WIDTH = 3.5  # meters
+LANELET_LENGTH = 12.0  # meters
+POINTS_PER_BOUNDARY = 5
+# Roads start this far from the middle of the intersection.
+INNER_RADIUS = 15.0  # meters
+PEDESTRIAN_FRACTION = 0.1
+
+
+@dataclass
+class Scale:
+    """
+    The size of a synthetic dataset: lanelets in the map, agents and frames in the recording.
+    """
+
+    lanes: int = 200
+    agents: int = 1500
+    frames: int = 10000
+    seed: int = 0
+
+
+def write_dataset(root: pathlib.Path, scale: Scale, dataset: str = DATASET) -> None:
+    rng = np.random.default_rng(scale.seed)
+    root.joinpath("maps").mkdir(parents=True, exist_ok=True)
+    tracks_dir = root.joinpath("recorded_trackfiles", dataset)
+    tracks_dir.mkdir(parents=True, exist_ok=True)
+
+    centerlines = _write_map(
+        root.joinpath("maps", f"{dataset}.osm_xy"), scale.lanes, rng
+    )
+    _write_tracks(tracks_dir, centerlines, scale, rng)
+
+
+def _write_map(path: pathlib.Path, num_lanes: int, rng) -> List[np.ndarray]:
+    """
+    Write the map, returning the centerline of each lane, from the intersection outwards.
+    """
+    # Every lane of every road is split into the same number of lanelets.
+    segments = max(1, round(num_lanes / (ROADS * LANES_PER_ROAD)))
+
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<osm generator="synthetic">']
+    next_id = iter(range(1, 1 << 40))
+    relations = []
+    centerlines = []
+
+    for road in range(ROADS):
+        angle = 2 * np.pi * road / ROADS + rng.uniform(-0.2, 0.2)
+        direction = np.array([np.cos(angle), np.sin(angle)])
+        normal = np.array([-direction[1], direction[0]])
+        bend = rng.uniform(-0.002, 0.002)
+
+        def point(s, offset):
+            # A gently curving road, s meters from the intersection.
+            return direction * (INNER_RADIUS + s) + normal * (offset + bend * s * s)
+
+        num_boundaries = LANES_PER_ROAD + 1
+        length = segments * LANELET_LENGTH
+        s = np.linspace(0, length, segments * (POINTS_PER_BOUNDARY - 1) + 1)
+
+        # The nodes of each boundary, shared by the lanelets on either side of it.
+        nodes = []
+        for b in range(num_boundaries):
+            offset = (b - num_boundaries / 2 + 0.5) * LANE_WIDTH
+            ids = []
+            for p in [point(v, offset) for v in s]:
+                ids.append(next(next_id))
+                lines.append(f'  <node id="{ids[-1]}" x="{p[0]:.3f}" y="{p[1]:.3f}"/>')
+            nodes.append(ids)
+
+        # Boundary ways, one per lanelet, outer ones solid and inner ones dashed.
+        ways = []
+        for b in range(num_boundaries):
+            subtype = "solid" if b in (0, num_boundaries - 1) else "dashed"
+            row = []
+            for k in range(segments):
+                start = k * (POINTS_PER_BOUNDARY - 1)
+                refs = nodes[b][start : start + POINTS_PER_BOUNDARY]
+                row.append(next(next_id))
+                lines.append(
+                    f'  <way id="{row[-1]}">'
+                    + "".join(f'<nd ref="{r}"/>' for r in refs)
+                    + f'<tag k="type" v="line_thin"/><tag k="subtype" v="{subtype}"/></way>'
+                )
+            ways.append(row)
+
+        stop_line = next(next_id)
+        lines.append(
+            f'  <way id="{stop_line}"><nd ref="{nodes[0][0]}"/><nd ref="{nodes[-1][0]}"/>'
+            '<tag k="type" v="stop_line"/></way>'
+        )
+
+        for lane in range(LANES_PER_ROAD):
+            offset = (lane - LANES_PER_ROAD / 2 + 0.5) * LANE_WIDTH
+            centerlines.append(np.array([point(v, offset) for v in s]))
+            for k in range(segments):
+                relations.append((ways[lane + 1][k], ways[lane][k]))
+
+    for left, right in relations:
+        lines.append(
+            f'  <relation id="{next(next_id)}">'
+            f'<member type="way" ref="{left}" role="left"/>'
+            f'<member type="way" ref="{right}" role="right"/>'
+            '<tag k="type" v="lanelet"/><tag k="subtype" v="road"/></relation>'
+        )
+    lines.append("</osm>")
+    path.write_text("\n".join(lines) + "\n")
+    return centerlines
+
+
+def _write_tracks(tracks_dir: pathlib.Path, centerlines, scale: Scale, rng) -> None:
+    num_pedestrians = int(scale.agents * PEDESTRIAN_FRACTION)
+    vehicles = []
+    for track_id in range(1, scale.agents - num_pedestrians + 1):
+        vehicles.append(_vehicle(track_id, centerlines, scale.frames, rng))
+    pedestrians = []
+    for track_id in range(1, num_pedestrians + 1):
+        pedestrians.append(_pedestrian(track_id, scale.frames, rng))
+
+    _write_csv(
+        tracks_dir.joinpath("vehicle_tracks_000.csv"),
+        "track_id,frame_id,timestamp_ms,agent_type,x,y,vx,vy,psi_rad,length,width",
+        vehicles,
+    )
+    _write_csv(
+        tracks_dir.joinpath("pedestrian_tracks_000.csv"),
+        "track_id,frame_id,timestamp_ms,agent_type,x,y,vx,vy",
+        pedestrians,
+    )
+
+
+def _vehicle(track_id: int, centerlines, num_frames: int, rng) -> List[str]:
+    """
+    A car driving the length of a lane, in either direction, at a constant speed.
+    """
+    line = centerlines[rng.integers(len(centerlines))]
+    if rng.random() < 0.5:
+        line = line[::-1]
+    arc = np.concatenate(
+        [[0], np.cumsum(np.linalg.norm(np.diff(line, axis=0), axis=-1))]
+    )
+
+    speed = rng.uniform(5, 15)
+    dt = FRAME_INTERVAL_MS / 1000
+    s = np.arange(0, arc[-1], speed * dt)
+    first = int(rng.integers(1, max(num_frames - len(s), 1) + 1))
+    s = s[: num_frames - first + 1]
+
+    x = np.interp(s, arc, line[:, 0])
+    y = np.interp(s, arc, line[:, 1])
+    vx = np.gradient(x, dt) if len(s) > 1 else np.zeros(len(s))
+    vy = np.gradient(y, dt) if len(s) > 1 else np.zeros(len(s))
+    psi = np.arctan2(vy, vx)
+    length, width = rng.uniform(3.8, 5.2), rng.uniform(1.7, 2.1)
+
+    return [
+        f"{track_id},{frame},{frame * FRAME_INTERVAL_MS},car,{x[i]:.3f},{y[i]:.3f},"
+        f"{vx[i]:.3f},{vy[i]:.3f},{psi[i]:.3f},{length:.2f},{width:.2f}"
+        for i, frame in enumerate(range(first, first + len(s)))
+    ]
+
+
+def _pedestrian(track_id: int, num_frames: int, rng) -> List[str]:
+    """
+    A pedestrian walking a smooth random path around the intersection.
+    """
+    steps = int(rng.integers(50, 300))
+    first = int(rng.integers(1, max(num_frames - steps, 1) + 1))
+    steps = min(steps, num_frames - first + 1)
+
+    dt = FRAME_INTERVAL_MS / 1000
+    heading = rng.uniform(0, 2 * np.pi) + np.cumsum(rng.normal(0, 0.05, steps))
+    velocity = 1.4 * np.stack([np.cos(heading), np.sin(heading)], axis=-1)
+    position = rng.uniform(-INNER_RADIUS, INNER_RADIUS, 2) + np.cumsum(
+        velocity * dt, axis=0
+    )
+
+    return [
+        f"P{track_id},{frame},{frame * FRAME_INTERVAL_MS},pedestrian/bicycle,"
+        f"{position[i, 0]:.3f},{position[i, 1]:.3f},{velocity[i, 0]:.3f},{velocity[i, 1]:.3f}"
+        for i, frame in enumerate(range(first, first + steps))
+    ]
+
+
+def _write_csv(path: pathlib.Path, header: str, tracks: List[List[str]]) -> None:
+    with path.open("w") as f:
+        f.write(header + "\n")
+        for rows in tracks:
+            if rows:
+                f.write("\n".join(rows) + "\n")
+
+
+@click.command()
+@click.argument("root", type=click.Path(file_okay=False))
+@click.option("--lanes", default=Scale.lanes, type=int, help="Lanelets in the map.")
+@click.option("--agents", default=Scale.agents, type=int, help="Tracks in the session.")
+@click.option("--frames", default=Scale.frames, type=int, help="Frames in the session.")
+@click.option("--seed", default=Scale.seed, type=int)
+def main(root, lanes, agents, frames, seed):
+    write_dataset(pathlib.Path(root), Scale(lanes, agents, frames, seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+from .kinematics import Kinematics, kinematics
+from .interactions import (
+    Interactions,
+    PostEncroachment,
+    interactions,
+    post_encroachment,
+    time_to_collision,
+)
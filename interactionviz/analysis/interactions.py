@@ -0,0 +1,164 @@
+from dataclasses import dataclass
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from interactionviz.tracks import TrackStore
+
+DEFAULT_RADIUS = 20.0  # meters
+# Agents closer than this to a point another agent passed have encroached on it.
+DEFAULT_CONFLICT_DISTANCE = 1.0  # meters
+# The half width assumed for agents without an extent, i.e. pedestrians and bicycles.
+DEFAULT_HALF_WIDTH = 0.5  # meters
+
+
+@dataclass
+class Interactions:
+    """
+    Pairs of agents within a radius of each other in the same frame, sorted by frame.
+    first and second are rows of the TrackStore, with first < second.
+    """
+
+    frame_ids: np.ndarray  # (P,)
+    first: np.ndarray  # (P,)
+    second: np.ndarray  # (P,)
+    distance: np.ndarray  # (P,) m, between centers
+    ttc: np.ndarray  # (P,) s, inf if the pair isn't closing in
+
+    def __len__(self) -> int:
+        return len(self.frame_ids)
+
+    def in_frame(self, frame_id: int) -> slice:
+        """
+        The pairs in the frame with the given id.
+        """
+        return slice(
+            int(np.searchsorted(self.frame_ids, frame_id, side="left")),
+            int(np.searchsorted(self.frame_ids, frame_id, side="right")),
+        )
+
+
+@dataclass
+class PostEncroachment:
+    """
+    Pairs of tracks whose paths came within the conflict distance of each other,
+    with the shortest time between one agent passing a conflict point and the other reaching it.
+    """
+
+    first: np.ndarray  # (C,) track codes, with first < second
+    second: np.ndarray  # (C,) track codes
+    pet: np.ndarray  # (C,) s
+    positions: np.ndarray  # (C, 2) the conflict points
+
+
+def interactions(store: TrackStore, radius: float = DEFAULT_RADIUS) -> Interactions:
+    """
+    Find every pair of agents within radius of each other in each frame, with one KD-tree
+    over the whole session: frames are stacked along a third axis, far enough apart that
+    only agents in the same frame can be paired.
+
+    Time to collision assumes constant velocities, and agents as discs of their half widths.
+    """
+    frame_index = np.repeat(np.arange(len(store)), np.diff(store.frame_offsets))
+    points = np.stack(
+        [store.x, store.y, frame_index * (2.0 * radius + 1.0)], axis=-1
+    ).astype(np.float64)
+    pairs = cKDTree(points).query_pairs(radius, output_type="ndarray")
+    pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+    first, second = pairs[:, 0], pairs[:, 1]
+
+    offset = points[second, :2] - points[first, :2]
+    velocity = np.stack(
+        [store.vx[second] - store.vx[first], store.vy[second] - store.vy[first]],
+        axis=-1,
+    ).astype(np.float64)
+    half_width = (
+        np.where(np.isnan(store.width), 2 * DEFAULT_HALF_WIDTH, store.width) / 2
+    )
+    reach = half_width[first] + half_width[second]
+
+    return Interactions(
+        frame_ids=store.frame_id[first],
+        first=first,
+        second=second,
+        distance=np.linalg.norm(offset, axis=-1),
+        ttc=time_to_collision(offset, velocity, reach),
+    )
+
+
+def time_to_collision(
+    offset: np.ndarray, velocity: np.ndarray, reach: np.ndarray
+) -> np.ndarray:
+    """
+    The time until the (N, 2) relative offsets, moving at the relative velocities,
+    first come within reach of the origin: 0 if they already are, inf if they never do.
+    """
+    a = (velocity**2).sum(axis=-1)
+    b = (offset * velocity).sum(axis=-1)
+    c = (offset**2).sum(axis=-1) - reach**2
+    discriminant = b**2 - a * c
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = (-b - np.sqrt(discriminant)) / a
+    ttc = np.where((discriminant >= 0) & (a > 0) & (t >= 0), t, np.inf)
+    return np.where(c <= 0, 0.0, ttc)
+
+
+def post_encroachment(
+    store: TrackStore,
+    pairs: Interactions,
+    conflict_distance: float = DEFAULT_CONFLICT_DISTANCE,
+) -> PostEncroachment:
+    """
+    Compute the post-encroachment time of the pairs of tracks that interacted:
+    among the points of one track's path within conflict_distance of the other's,
+    the smallest time between the two agents being there.
+    """
+    if store.track_rows is None:
+        store.build_track_index()
+
+    track_pairs = np.sort(
+        np.stack([store.track[pairs.first], store.track[pairs.second]], axis=-1),
+        axis=-1,
+    )
+    track_pairs = np.unique(track_pairs, axis=0).reshape(-1, 2)
+
+    positions = np.stack([store.x, store.y], axis=-1).astype(np.float64)
+    seconds = store.timestamp_ms / 1000.0
+    trees = {}
+
+    def track(code):
+        rows = store.track_rows[
+            store.track_offsets[code] : store.track_offsets[code + 1]
+        ]
+        if code not in trees:
+            trees[code] = cKDTree(positions[rows])
+        return rows, trees[code]
+
+    pet = np.full(len(track_pairs), np.inf)
+    conflicts = np.full((len(track_pairs), 2), np.nan)
+    for i, (a, b) in enumerate(track_pairs):
+        rows_a, tree_a = track(a)
+        rows_b, tree_b = track(b)
+        # Every pair of points within range, not only the nearest, as a later pass
+        # closer to the conflict point can be further apart in time.
+        close = tree_a.sparse_distance_matrix(
+            tree_b, conflict_distance, output_type="ndarray"
+        )
+        close = close[close["v"] < conflict_distance]
+        if len(close) == 0:
+            continue
+
+        near_a, near_b = rows_a[close["i"]], rows_b[close["j"]]
+        gaps = np.abs(seconds[near_a] - seconds[near_b])
+        best = np.argmin(gaps)
+        pet[i] = gaps[best]
+        conflicts[i] = positions[near_a[best]]
+
+    found = np.isfinite(pet)
+    return PostEncroachment(
+        first=track_pairs[found, 0],
+        second=track_pairs[found, 1],
+        pet=pet[found],
+        positions=conflicts[found],
+    )
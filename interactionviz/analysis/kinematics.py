@@ -0,0 +1,64 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from interactionviz.tracks import TrackStore
+
+
+@dataclass
+class Kinematics:
+    """
+    The motion of every row of a TrackStore, aligned with its columns.
+    Derivatives are NaN for tracks with a single row, and yaw rates for agents without a yaw.
+    """
+
+    speed: np.ndarray  # (R,) m/s
+    acceleration: np.ndarray  # (R,) m/s^2, the rate of change of speed
+    yaw_rate: np.ndarray  # (R,) rad/s
+
+
+def kinematics(store: TrackStore) -> Kinematics:
+    """
+    Compute the speed, acceleration and yaw rate of every row, differencing along each track
+    in the track index, against the recorded timestamps.
+    """
+    if store.track_rows is None:
+        store.build_track_index()
+
+    rows = store.track_rows
+    track = store.track[rows]
+    seconds = store.timestamp_ms[rows] / 1000.0
+    # Whether each row is followed by a row of the same track.
+    same_track = track[1:] == track[:-1]
+
+    speed = np.hypot(store.vx, store.vy).astype(np.float64)
+    acceleration = np.empty(store.num_rows)
+    yaw_rate = np.empty(store.num_rows)
+
+    acceleration[rows] = _derivative(speed[rows], seconds, same_track)
+    yaw_rate[rows] = _derivative(
+        store.psi[rows].astype(np.float64), seconds, same_track, angle=True
+    )
+
+    return Kinematics(speed=speed, acceleration=acceleration, yaw_rate=yaw_rate)
+
+
+def _derivative(
+    values: np.ndarray, seconds: np.ndarray, same_track: np.ndarray, angle=False
+) -> np.ndarray:
+    """
+    Differentiate values sampled along the tracks, averaging the differences to the previous
+    and next rows of the same track, or taking the one that exists at either end.
+    """
+    delta = values[1:] - values[:-1]
+    if angle:
+        delta = np.angle(np.exp(1j * delta))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = np.where(same_track, delta / (seconds[1:] - seconds[:-1]), np.nan)
+
+    forward = np.append(slope, np.nan)
+    backward = np.insert(slope, 0, np.nan)
+    both = np.stack([forward, backward])
+    counts = np.sum(~np.isnan(both), axis=0)
+    with np.errstate(invalid="ignore"):
+        return np.where(counts > 0, np.nansum(both, axis=0) / counts, np.nan)
@@ -0,0 +1,185 @@
+import hashlib
+import os
+import pathlib
+import shutil
+import tempfile
+from dataclasses import fields
+from typing import Callable, Optional, Union
+
+import numpy as np
+
+from interactionviz.maps import Map, MapMesh, load_map_xml
+from interactionviz.tracks import TrackStore, load_tracks_files
+
+# Bump this whenever the layout of cache entries changes, to invalidate old entries.
+FORMAT_VERSION = 5
+
+PathLike = Union[str, pathlib.Path]
+
+
+def default_cache_dir() -> pathlib.Path:
+    """
+    The user cache dir, following the XDG convention.
+    """
+    root = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return pathlib.Path(root).joinpath("interactionviz")
+
+
+class Cache:
+    """
+    Cache is an on-disk cache of parsed tracks and maps.
+
+    Each entry is a directory of .npy files, which are memory-mapped when loaded.
+    Entries are keyed by the path, size, mtime and content hash of the source files,
+    so editing a source file transparently invalidates its entry.
+    """
+
+    def __init__(self, root: Optional[PathLike] = None, rebuild: bool = False):
+        self.root = pathlib.Path(root) if root is not None else default_cache_dir()
+        self.rebuild = rebuild
+
+    def load_tracks(self, *trackfiles: PathLike) -> TrackStore:
+        return self._load(
+            "tracks",
+            trackfiles,
+            build=lambda: load_tracks_files(*trackfiles),
+            save=_save_tracks,
+            load=_load_tracks,
+        )
+
+    def load_map(self, path: PathLike) -> Map:
+        return self._load(
+            "map",
+            [path],
+            build=lambda: load_map_xml(path),
+            save=_save_map,
+            load=_load_map,
+        )
+
+    def _load(
+        self, kind: str, sources, build: Callable, save: Callable, load: Callable
+    ):
+        prefix = f"{kind}-{_path_digest(sources)}-"
+        entry = self.root.joinpath(prefix + _content_digest(sources))
+
+        if entry.exists() and not self.rebuild:
+            return load(entry)
+
+        value = build()
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = pathlib.Path(tempfile.mkdtemp(dir=self.root, prefix=".tmp-"))
+        try:
+            save(value, tmp)
+            if self.rebuild:
+                _discard(entry)
+            try:
+                os.rename(tmp, entry)
+            except OSError:
+                # Another process built the same entry first, which is as good as ours.
+                if not entry.exists():
+                    raise
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+        # Remove entries built from older versions of the same source files.
+        for stale in self.root.glob(prefix + "*"):
+            if stale != entry:
+                _discard(stale)
+
+        return load(entry)
+
+
+def _discard(entry: pathlib.Path) -> None:
+    """
+    Remove an entry, first renaming it out of the way, so no other process
+    finds it half deleted. Processes that memory-mapped its files keep them.
+    """
+    trash = pathlib.Path(tempfile.mkdtemp(dir=entry.parent, prefix=".tmp-"))
+    try:
+        os.rename(entry, trash.joinpath(entry.name))
+    except FileNotFoundError:
+        pass
+    finally:
+        shutil.rmtree(trash, ignore_errors=True)
+
+
+def _path_digest(sources) -> str:
+    h = hashlib.blake2b(digest_size=8)
+    for p in sources:
+        h.update(str(pathlib.Path(p).resolve()).encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _content_digest(sources) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"v{FORMAT_VERSION}".encode())
+    for p in sources:
+        p = pathlib.Path(p)
+        stat = p.stat()
+        h.update(f"{p.resolve()}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+        with p.open("rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    return h.hexdigest()
+
+
+def _save_arrays(directory: pathlib.Path, **arrays) -> None:
+    for name, array in arrays.items():
+        np.save(directory.joinpath(f"{name}.npy"), np.asarray(array))
+
+
+def _load_array(directory: pathlib.Path, name: str) -> np.ndarray:
+    return np.load(directory.joinpath(f"{name}.npy"), mmap_mode="r")
+
+
+def _save_tracks(tracks: TrackStore, directory: pathlib.Path) -> None:
+    _save_arrays(
+        directory,
+        **{f.name: np.asarray(getattr(tracks, f.name)) for f in fields(tracks)},
+    )
+
+
+def _load_tracks(directory: pathlib.Path) -> TrackStore:
+    columns = {f.name: _load_array(directory, f.name) for f in fields(TrackStore)}
+    columns["track_ids"] = columns["track_ids"].tolist()
+    return TrackStore(**columns)
+
+
+def _save_map(interaction_map: Map, directory: pathlib.Path) -> None:
+    _save_arrays(
+        directory,
+        **{
+            f.name: np.asarray(getattr(interaction_map, f.name))
+            for f in fields(interaction_map)
+            if not f.name.startswith("_")
+        },
+    )
+    _save_arrays(
+        directory,
+        **{
+            f"mesh.{name}": array
+            for name, array in interaction_map.mesh.to_arrays().items()
+        },
+    )
+
+
+def _load_map(directory: pathlib.Path) -> Map:
+    arrays = {
+        f.name: _load_array(directory, f.name)
+        for f in fields(Map)
+        if not f.name.startswith("_")
+    }
+    for name in ("node_ids", "way_ids", "lane_ids"):
+        arrays[name] = arrays[name].tolist()
+
+    mesh = MapMesh.from_arrays(
+        {
+            p.stem[len("mesh.") :]: np.load(p, mmap_mode="r")
+            for p in directory.glob("mesh.*.npy")
+        }
+    )
+    return Map(_mesh=mesh, **arrays)
@@ -0,0 +1,74 @@
+import pathlib
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Union
+
+from interactionviz.cache import Cache
+from interactionviz.maps import Map, load_map_xml
+from interactionviz.tracks import LazyTracks, Tracks, load_tracks_files
+
+_TRACKFILE = re.compile(r"^(vehicle|pedestrian)_tracks_(\d+)\.csv$")
+
+
+@dataclass
+class Dataset:
+    """
+    The map of a dataset, and the trackfiles of each of its recorded sessions.
+    """
+
+    name: str
+    map_path: pathlib.Path
+    sessions: Dict[int, List[pathlib.Path]] = field(default_factory=dict)
+
+
+class Catalog:
+    """
+    Catalog indexes the maps and recorded trackfiles under the root of the interaction dataset,
+
+        <root>/maps/<dataset>.osm_xy
+        <root>/recorded_trackfiles/<dataset>/{vehicle,pedestrian}_tracks_<session>.csv
+
+    Only the directory listings are read, maps and tracks are loaded on request.
+    """
+
+    def __init__(
+        self,
+        root: Union[str, pathlib.Path],
+        cache: Optional[Cache] = None,
+        lazy: bool = False,
+    ):
+        self.root = pathlib.Path(root)
+        self.cache = cache
+        self.lazy = lazy
+        self.datasets: Dict[str, Dataset] = {}
+
+        for map_path in sorted(self.root.joinpath("maps").glob("*.osm_xy")):
+            dataset = Dataset(name=map_path.stem, map_path=map_path)
+            tracks_dir = self.root.joinpath("recorded_trackfiles", dataset.name)
+            for path in sorted(tracks_dir.glob("*_tracks_*.csv")):
+                match = _TRACKFILE.match(path.name)
+                if match is not None:
+                    dataset.sessions.setdefault(int(match.group(2)), []).append(path)
+            self.datasets[dataset.name] = dataset
+
+    def dataset(self, name: str) -> Dataset:
+        if name not in self.datasets:
+            raise KeyError(f"no map found for dataset {name} in {self.root}")
+        return self.datasets[name]
+
+    def load_map(self, dataset: str) -> Map:
+        map_path = self.dataset(dataset).map_path
+        if self.cache is not None:
+            return self.cache.load_map(map_path)
+        return load_map_xml(map_path)
+
+    def load_tracks(self, dataset: str, session: int) -> Tracks:
+        paths = self.dataset(dataset).sessions.get(session)
+        if not paths:
+            raise KeyError(f"no tracks found for session {session} of {dataset}")
+
+        if self.lazy:
+            return LazyTracks(*paths)
+        if self.cache is not None:
+            return self.cache.load_tracks(*paths)
+        return load_tracks_files(*paths)
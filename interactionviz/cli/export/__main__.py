@@ -0,0 +1,120 @@
+import os
+import pathlib
+import sys
+import time
+
+import click
+from typing import Optional, Tuple
+
+from interactionviz.cache import Cache
+from interactionviz.catalog import Catalog
+from interactionviz.gifwriter import export_gifs, plan_exports
+from interactionviz.gifwriter.export import FAILED, SKIPPED
+from interactionviz.gifwriter.gifwriter import (
+    BACKENDS,
+    DEFAULT_BACKEND,
+    DEFAULT_HEIGHT,
+    DEFAULT_WIDTH,
+)
+
+
+@click.command()
+@click.option(
+    "--root-dir",
+    required=True,
+    type=click.Path(exists=True, dir_okay=True, file_okay=False),
+    help="Root directory of the interaction dataset.",
+)
+@click.option(
+    "--output-dir",
+    required=True,
+    type=click.Path(dir_okay=True, file_okay=False),
+    help="Where to write <dataset>/<session>.gif for every session.",
+)
+@click.option(
+    "--dataset",
+    multiple=True,
+    help="Only export these datasets, defaults to all of them.",
+)
+@click.option("--width", type=int, default=DEFAULT_WIDTH)
+@click.option("--height", type=int, default=DEFAULT_HEIGHT)
+@click.option("--step", type=int, default=1, help="Render every step-th frame.")
+@click.option(
+    "--workers",
+    type=int,
+    default=os.cpu_count(),
+    help="Sessions rendered at once, defaults to one per CPU.",
+)
+@click.option(
+    "--backend",
+    type=click.Choice(BACKENDS),
+    default=DEFAULT_BACKEND,
+    help="Rasterize frames with NumPy, or draw them with PIL.",
+)
+@click.option(
+    "--force", is_flag=True, help="Export sessions whose GIFs are up to date too."
+)
+@click.option(
+    "--cache-dir",
+    type=click.Path(dir_okay=True, file_okay=False),
+    help="Where to cache parsed maps and tracks, defaults to the user cache dir.",
+)
+@click.option("--no-cache", is_flag=True, help="Always parse the map and tracks.")
+def main(
+    root_dir: str,
+    output_dir: str,
+    dataset: Tuple[str, ...],
+    width: int,
+    height: int,
+    step: int,
+    workers: int,
+    backend: str,
+    force: bool,
+    cache_dir: Optional[str],
+    no_cache: bool,
+):
+    catalog = Catalog(root_dir, cache=None if no_cache else Cache(cache_dir))
+    jobs = plan_exports(catalog, pathlib.Path(output_dir), dataset)
+
+    start = time.perf_counter()
+    results = []
+    for result in export_gifs(
+        catalog,
+        jobs,
+        workers=workers,
+        force=force,
+        width=width,
+        height=height,
+        step=step,
+        backend=backend,
+    ):
+        results.append(result)
+        job = result.job
+        print(
+            f"[{len(results)}/{len(jobs)}] {job.dataset} {job.session}: {result.status}"
+        )
+    elapsed = time.perf_counter() - start
+
+    print()
+    print(f"{'dataset':30s} {'session':>7s} {'status':>8s} {'frames':>7s} {'time':>8s}")
+    for result in sorted(results, key=lambda r: (r.job.dataset, r.job.session)):
+        job = result.job
+        print(
+            f"{job.dataset:30s} {job.session:7d} {result.status:>8s} "
+            f"{result.num_frames:7d} {result.seconds:7.1f}s"
+        )
+        if result.error is not None:
+            print(f"    {result.error}")
+
+    failed = sum(r.status == FAILED for r in results)
+    skipped = sum(r.status == SKIPPED for r in results)
+    print(
+        f"\nexported {len(results) - failed - skipped} sessions, "
+        f"skipped {skipped} up to date, {failed} failed, in {elapsed:.1f}s"
+    )
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
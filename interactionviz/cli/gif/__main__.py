@@ -0,0 +1,101 @@
+import os
+import time
+
+import click
+from typing import Optional
+
+from interactionviz.cache import Cache
+from interactionviz.catalog import Catalog
+from interactionviz.gifwriter import write_gif
+from interactionviz.gifwriter.gifwriter import (
+    BACKENDS,
+    DEFAULT_BACKEND,
+    DEFAULT_HEIGHT,
+    DEFAULT_WIDTH,
+    DEFAULT_WINDOW,
+)
+
+
+@click.command()
+@click.option(
+    "--root-dir",
+    required=True,
+    type=click.Path(exists=True, dir_okay=True, file_okay=False),
+    help="Root directory of the interaction dataset.",
+)
+@click.option("--dataset", default="DR_CHN_Merging_ZS")
+@click.option("--session", type=int, default=0, help="session to load for tracks")
+@click.option(
+    "--output",
+    required=True,
+    type=click.Path(dir_okay=False, writable=True),
+    help="Where to write the gif.",
+)
+@click.option("--width", type=int, default=DEFAULT_WIDTH)
+@click.option("--height", type=int, default=DEFAULT_HEIGHT)
+@click.option("--step", type=int, default=1, help="Render every step-th frame.")
+@click.option(
+    "--workers",
+    type=int,
+    default=os.cpu_count(),
+    help="Processes rendering frames, defaults to one per CPU.",
+)
+@click.option(
+    "--window",
+    type=int,
+    default=DEFAULT_WINDOW,
+    help="Frames rendered ahead of the writer, which bounds memory use.",
+)
+@click.option(
+    "--backend",
+    type=click.Choice(BACKENDS),
+    default=DEFAULT_BACKEND,
+    help="Rasterize frames with NumPy, or draw them with PIL.",
+)
+@click.option(
+    "--cache-dir",
+    type=click.Path(dir_okay=True, file_okay=False),
+    help="Where to cache parsed maps and tracks, defaults to the user cache dir.",
+)
+@click.option("--no-cache", is_flag=True, help="Always parse the map and tracks.")
+def main(
+    root_dir: str,
+    dataset: str,
+    session: int,
+    output: str,
+    width: int,
+    height: int,
+    step: int,
+    workers: int,
+    window: int,
+    backend: str,
+    cache_dir: Optional[str],
+    no_cache: bool,
+):
+    catalog = Catalog(root_dir, cache=None if no_cache else Cache(cache_dir))
+    interaction_map = catalog.load_map(dataset)
+    tracks = catalog.load_tracks(dataset, session)
+
+    start = time.perf_counter()
+    with open(output, "wb") as f:
+        num_frames = write_gif(
+            tracks,
+            interaction_map,
+            f,
+            width=width,
+            height=height,
+            step=step,
+            workers=workers,
+            window=window,
+            backend=backend,
+        )
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"wrote {num_frames} frames to {output} in {elapsed:.1f}s "
+        f"({num_frames / elapsed:.1f} frames/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,11 @@
-import os
-import pathlib
-
 import click
-from interactionviz.maps import load_map_xml
+from typing import Optional
+
+from interactionviz import analysis
+from interactionviz.cache import Cache
+from interactionviz.catalog import Catalog
 from interactionviz.viewers import ArcadeViewer, WebViewer
-from interactionviz.tracks import Tracks, load_tracks_files
+from interactionviz.viewers import framecache, sessions
 
 
 @click.command()
@@ -21,38 +22,76 @@ from interactionviz.tracks import Tracks, load_tracks_files
     type=click.Choice(["web", "native"], case_sensitive=False),
 )
 @click.option("--session", type=int, default=0, help="session to load for tracks")
-def main(viewer_kind: str, root_dir: str, dataset: str, session: int):
-    root = pathlib.Path(root_dir)
-    map_path = root.joinpath("maps", f"{dataset}.osm_xy")
+@click.option(
+    "--cache-dir",
+    type=click.Path(dir_okay=True, file_okay=False),
+    help="Where to cache parsed maps and tracks, defaults to the user cache dir.",
+)
+@click.option("--no-cache", is_flag=True, help="Always parse the map and tracks.")
+@click.option(
+    "--rebuild-cache",
+    is_flag=True,
+    help="Parse the map and tracks again, and cache them.",
+)
+@click.option(
+    "--lazy",
+    is_flag=True,
+    help="Decode frames from the trackfiles on demand, instead of loading them up front.",
+)
+@click.option(
+    "--frame-cache-mb",
+    type=int,
+    default=framecache.DEFAULT_MAX_BYTES // (1024 * 1024),
+    help="Memory for encoded frames shared by web viewer clients, 0 disables it.",
+)
+@click.option(
+    "--memory-mb",
+    type=int,
+    default=sessions.DEFAULT_MAX_BYTES // (1024 * 1024),
+    help="Memory for the maps and tracks the web viewer keeps loaded.",
+)
+@click.option(
+    "--interactions",
+    is_flag=True,
+    help="Show pairs of agents close to colliding, in the native viewer.",
+)
+def main(
+    viewer_kind: str,
+    root_dir: str,
+    dataset: str,
+    session: int,
+    cache_dir: Optional[str],
+    no_cache: bool,
+    rebuild_cache: bool,
+    lazy: bool,
+    frame_cache_mb: int,
+    memory_mb: int,
+    interactions: bool,
+):
+    if viewer_kind != "web" and interactions and lazy:
+        raise click.UsageError("--interactions needs the tracks loaded up front")
 
-    interaction_map = load_map_xml(map_path)
+    cache = None if no_cache else Cache(cache_dir, rebuild=rebuild_cache)
+    catalog = Catalog(root_dir, cache=cache, lazy=lazy)
 
-    tracks = _load_tracks(root, dataset, session)
     if viewer_kind == "web":
-        viewer = WebViewer(interaction_map, tracks=tracks)
+        # Other datasets and sessions can be opened from the browser.
+        viewer = WebViewer(
+            catalog=catalog,
+            dataset=dataset,
+            session=session,
+            frame_cache=framecache.FrameCache(max_bytes=frame_cache_mb * 1024 * 1024),
+            max_bytes=memory_mb * 1024 * 1024,
+        )
     else:
-        viewer = ArcadeViewer(interaction_map, tracks=tracks)
+        tracks = catalog.load_tracks(dataset, session)
+        viewer = ArcadeViewer(
+            catalog.load_map(dataset),
+            tracks=tracks,
+            interactions=analysis.interactions(tracks) if interactions else None,
+        )
     viewer.run()
 
 
-def _load_tracks(root: pathlib.Path, dataset: str, session: int) -> Tracks:
-    paths = []
-    tracks_dir = root.joinpath("recorded_trackfiles", dataset)
-
-    vehicles = tracks_dir.joinpath(f"pedestrian_tracks_{session:03d}.csv")
-    pedestrians = tracks_dir.joinpath(f"vehicle_tracks_{session:03d}.csv")
-
-    if vehicles.exists():
-        paths.append(vehicles)
-
-    if pedestrians.exists():
-        paths.append(pedestrians)
-
-    if len(paths) == 0:
-        raise ValueError(f"no tracks found at {vehicles} or {pedestrians}")
-
-    return load_tracks_files(*paths)
-
-
 if __name__ == "__main__":
     main()
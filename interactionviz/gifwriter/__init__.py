@@ -1 +1,2 @@
 from .gifwriter import write_gif
+from .export import ExportJob, ExportResult, export_gifs, plan_exports
@@ -0,0 +1,117 @@
+from typing import Optional, Sequence
+
+import numpy as np
+from PIL import GifImagePlugin, Image
+
+# Leave each frame in place, so the next frame only needs to cover what changed.
+_DISPOSAL_NONE = 1
+
+
+class Palette:
+    """
+    Palette is the global color table shared by every frame of a GIF,
+    so frames are mapped to indices directly instead of each being quantized on its own.
+
+    The last entry is kept free, to mark pixels that are unchanged from the previous frame.
+    """
+
+    def __init__(self, colors: np.ndarray):
+        if len(colors) > 255:
+            raise ValueError(f"a GIF palette has at most 255 colors, got {len(colors)}")
+        self.colors = colors.astype(np.uint8)
+        self.keys = _keys(self.colors)
+        order = np.argsort(self.keys)
+        self.keys, self.colors = self.keys[order], self.colors[order]
+        self.transparency = len(self.colors)
+
+    @classmethod
+    def build(cls, background: np.ndarray, colors: Sequence[tuple]) -> "Palette":
+        """
+        A palette with the colors of the (H, W, 3) background, and the given colors.
+        """
+        extra = np.array(colors, dtype=np.uint8).reshape(-1, 3)
+        background_colors = np.unique(background.reshape(-1, 3), axis=0)
+        limit = 255 - len(extra)
+
+        if len(background_colors) > limit:
+            img = Image.fromarray(background).quantize(limit)
+            background_colors = np.array(img.getpalette()[: 3 * limit]).reshape(-1, 3)
+
+        return cls(np.unique(np.concatenate([background_colors, extra]), axis=0))
+
+    def index(self, rgb: np.ndarray) -> np.ndarray:
+        """
+        The palette index of each pixel of an (..., 3) image, the nearest color if it isn't in the palette.
+        """
+        keys = _keys(rgb)
+        rows = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        missing = self.keys[rows] != keys
+
+        if missing.any():
+            unknown, inverse = np.unique(rgb[missing], axis=0, return_inverse=True)
+            distances = (
+                (unknown[:, None, :].astype(np.int32) - self.colors[None, :, :]) ** 2
+            ).sum(axis=-1)
+            rows[missing] = distances.argmin(axis=1)[inverse.reshape(-1)]
+
+        return rows.astype(np.uint8)
+
+    def header(self, width: int, height: int, loop: Optional[int] = None) -> bytes:
+        """
+        The GIF header, with this palette as the global color table.
+        """
+        img = Image.new("P", (width, height))
+        img.putpalette(self.colors.reshape(-1).tolist() + [0, 0, 0])
+        info = dict(loop=loop) if loop is not None else {}
+        # A transparency index marks the file as GIF89a, which the frames need.
+        info.update(transparency=self.transparency)
+        blocks, _ = GifImagePlugin.getheader(img, info=info)
+        return b"".join(blocks)
+
+
+def encode_frame(
+    indices: np.ndarray,
+    previous: Optional[np.ndarray],
+    palette: Palette,
+    duration: int,
+) -> bytes:
+    """
+    Encode a frame of palette indices, as the bounding box of the pixels that changed
+    since the previous frame, with the unchanged pixels in the box left transparent.
+    """
+    if previous is None:
+        return _encode_region(indices, (0, 0), palette, duration)
+
+    changed = indices != previous
+    rows = np.flatnonzero(changed.any(axis=1))
+    cols = np.flatnonzero(changed.any(axis=0))
+
+    if len(rows) == 0:
+        # Nothing moved, a single transparent pixel keeps the frame's timing.
+        pixel = np.full((1, 1), palette.transparency, dtype=np.uint8)
+        return _encode_region(pixel, (0, 0), palette, duration)
+
+    y0, y1, x0, x1 = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+    region = indices[y0:y1, x0:x1].copy()
+    region[~changed[y0:y1, x0:x1]] = palette.transparency
+    return _encode_region(region, (int(x0), int(y0)), palette, duration)
+
+
+def _encode_region(
+    region: np.ndarray, offset: tuple, palette: Palette, duration: int
+) -> bytes:
+    height, width = region.shape
+    img = Image.frombytes("P", (width, height), np.ascontiguousarray(region).tobytes())
+    data = GifImagePlugin.getdata(
+        img,
+        offset=offset,
+        duration=duration,
+        disposal=_DISPOSAL_NONE,
+        transparency=palette.transparency,
+    )
+    return b"".join(data)
+
+
+def _keys(rgb: np.ndarray) -> np.ndarray:
+    rgb = np.asarray(rgb).astype(np.int32)
+    return (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
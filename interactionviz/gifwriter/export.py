@@ -0,0 +1,177 @@
+import os
+import pathlib
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from interactionviz.catalog import Catalog
+from interactionviz.maps import Map
+
+from .gifwriter import write_gif
+
+WRITTEN = "written"
+SKIPPED = "skipped"
+FAILED = "failed"
+
+
+@dataclass
+class ExportJob:
+    """
+    A session to render to a GIF, from the map and trackfiles it depends on.
+    """
+
+    dataset: str
+    session: int
+    output: pathlib.Path
+    sources: List[pathlib.Path] = field(default_factory=list)
+
+    def up_to_date(self) -> bool:
+        """
+        Whether the output exists, and is newer than all of its sources.
+        """
+        if not self.output.exists():
+            return False
+        mtime = self.output.stat().st_mtime
+        return all(s.stat().st_mtime <= mtime for s in self.sources)
+
+    @property
+    def size(self) -> int:
+        return sum(s.stat().st_size for s in self.sources)
+
+
+@dataclass
+class ExportResult:
+    job: ExportJob
+    status: str
+    num_frames: int = 0
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+
+def plan_exports(
+    catalog: Catalog, output_dir: pathlib.Path, datasets: Sequence[str] = ()
+) -> List[ExportJob]:
+    """
+    A job for every session of every dataset in the catalog (or only the given datasets),
+    writing <output_dir>/<dataset>/<session>.gif.
+    """
+    jobs = []
+    for name in datasets or catalog.datasets:
+        dataset = catalog.dataset(name)
+        for session, trackfiles in sorted(dataset.sessions.items()):
+            jobs.append(
+                ExportJob(
+                    dataset=name,
+                    session=session,
+                    output=output_dir.joinpath(name, f"{session}.gif"),
+                    sources=[dataset.map_path] + list(trackfiles),
+                )
+            )
+    return jobs
+
+
+def export_gifs(
+    catalog: Catalog,
+    jobs: Sequence[ExportJob],
+    workers: int = 1,
+    force: bool = False,
+    **gif_options,
+) -> Iterator[ExportResult]:
+    """
+    Render each job to its output with write_gif, yielding results as jobs finish.
+
+    Jobs run one per worker process, largest first so the pool finishes evenly.
+    Each map is loaded and triangulated once, here, and handed to every worker.
+    Outputs are written to a temporary file and renamed into place, so an interrupted
+    export never leaves a partial GIF, and outputs that are up to date are skipped
+    unless force is set, so running the export again resumes it.
+    """
+    pending = []
+    for job in jobs:
+        if not force and job.up_to_date():
+            yield ExportResult(job, SKIPPED)
+        else:
+            pending.append(job)
+    pending.sort(key=lambda job: job.size, reverse=True)
+
+    maps, errors = _load_maps(catalog, {job.dataset for job in pending})
+    for job in pending:
+        if job.dataset in errors:
+            yield ExportResult(job, FAILED, error=errors[job.dataset])
+    pending = [job for job in pending if job.dataset in maps]
+
+    if workers <= 1:
+        _init_worker(catalog, maps)
+        for job in pending:
+            yield _export(job, gif_options)
+        return
+
+    with ProcessPoolExecutor(
+        workers, initializer=_init_worker, initargs=(catalog, maps)
+    ) as pool:
+        futures = [pool.submit(_export, job, gif_options) for job in pending]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def _load_maps(
+    catalog: Catalog, datasets: Iterable[str]
+) -> Tuple[Dict[str, Map], Dict[str, str]]:
+    """
+    Load and triangulate the map of each dataset, returning the maps,
+    and the errors of those that failed to load.
+    """
+    maps, errors = {}, {}
+    for dataset in sorted(datasets):
+        try:
+            maps[dataset] = catalog.load_map(dataset)
+            # Built once here, rather than by every worker rendering the dataset.
+            maps[dataset].mesh
+        except Exception as e:
+            errors[dataset] = repr(e)
+    return maps, errors
+
+
+# The catalog of each worker process, and the maps of every dataset being exported.
+_worker = {}
+
+
+def _init_worker(catalog: Catalog, maps: Dict[str, Map]):
+    _worker.update(catalog=catalog, maps=maps)
+
+
+def _export(job: ExportJob, gif_options: dict) -> ExportResult:
+    start = time.perf_counter()
+    try:
+        interaction_map = _worker["maps"][job.dataset]
+        tracks = _worker["catalog"].load_tracks(job.dataset, job.session)
+        num_frames = _write_atomic(job.output, tracks, interaction_map, gif_options)
+    except Exception as e:
+        return ExportResult(
+            job, FAILED, seconds=time.perf_counter() - start, error=repr(e)
+        )
+    return ExportResult(job, WRITTEN, num_frames, time.perf_counter() - start)
+
+
+def _write_atomic(output: pathlib.Path, tracks, interaction_map, gif_options) -> int:
+    output.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=output.parent, prefix=".tmp-", suffix=".gif")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            num_frames = write_gif(tracks, interaction_map, f, **gif_options)
+        # mkstemp makes the file private, give it the mode open() would have.
+        os.chmod(tmp, 0o666 & ~_umask())
+        os.replace(tmp, output)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return num_frames
+
+
+def _umask() -> int:
+    # The umask can only be read by setting it.
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
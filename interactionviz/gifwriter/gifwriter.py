@@ -1,29 +1,39 @@
+import itertools
 import logging
 import numpy as np
-import math
-from interactionviz.tracks import Tracks
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from interactionviz.maps import WayKind, Map
-from interactionviz.tracks import AgentKind, Tracks, Frame
+from interactionviz.tracks import FRAME_INTERVAL_MS, AgentKind, Tracks, Frame
 from interactionviz.viewers import Viewport, viewport_for_map
-from typing import IO
+from interactionviz.viewers.agents import (
+    AGENT_COLORS,
+    FrameArrays,
+    agent_colors,
+    agent_footprints,
+    frame_arrays,
+)
+from typing import IO, Iterator, List, Optional, Tuple
 
 from PIL import Image, ImageDraw
 
-AGENT_COLORS = [
-    (161, 201, 244),
-    (255, 180, 130),
-    (141, 229, 161),
-    (255, 159, 155),
-    (208, 187, 255),
-    (222, 187, 155),
-    (250, 176, 228),
-    (207, 207, 207),
-    (255, 254, 163),
-    (185, 242, 240),
-]
+from . import raster
+from .encoder import Palette, encode_frame
+
 BACKGROUND_COLOR = (15, 125, 45)
 DEFAULT_WIDTH = 800
 DEFAULT_HEIGHT = 600
+# Frames rendered ahead of the writer, which bounds memory use.
+DEFAULT_WINDOW = 64
+CHUNK_FRAMES = 8
+# Frames are rasterized with NumPy, or drawn shape by shape with PIL.
+BACKENDS = ("numpy", "pil")
+DEFAULT_BACKEND = "numpy"
+
+_LANE_COLOR = (140, 140, 140)
+_STOP_LINE_COLOR = (252, 186, 3)
+_BOUNDARY_COLOR = (240, 240, 240)
+_BOUNDARY_THICKNESS = {WayKind.ThickLine: 2, WayKind.DashedLine: 2}
 
 
 def write_gif(
@@ -32,100 +42,243 @@ def write_gif(
     fileobj: IO,
     width: int = DEFAULT_WIDTH,
     height: int = DEFAULT_HEIGHT,
-    step: int = 1):
+    step: int = 1,
+    workers: int = 1,
+    window: int = DEFAULT_WINDOW,
+    backend: str = DEFAULT_BACKEND,
+) -> int:
+    """
+    Render every step-th frame of the tracks to a GIF, returning the number of frames written.
+
+    Frames are rendered and encoded in chunks by a pool of worker processes, and written to
+    fileobj in order as they complete. At most window frames are in flight at once,
+    so memory use doesn't grow with the length of the recording.
 
+    Every frame is mapped to one palette, built from the map and the agent colors,
+    and only the region that changed since the previous frame is encoded.
+    """
+    _check_backend(backend)
     viewport = viewport_for_map(width, height, interaction_map)
+    map_img = _render_map(viewport, interaction_map, backend)
+    palette = Palette.build(np.asarray(map_img), AGENT_COLORS)
+    duration = FRAME_INTERVAL_MS * step
+
+    frames = (frame_arrays(tracks[i]) for i in range(0, len(tracks), step))
+    fileobj.write(palette.header(width, height, loop=1))
+
+    num_frames = 0
+    renderer = _Renderer(viewport, map_img, palette, duration, backend)
+    for encoded in _encode_frames(renderer, frames, workers, window):
+        fileobj.write(encoded)
+        num_frames += 1
+
+    fileobj.write(b";")  # GIF trailer
+    return num_frames
+
+
+def draw_frame(
+    viewport: Viewport,
+    map_img: Image,
+    frame: Frame,
+    width: int,
+    height: int,
+    backend: str = DEFAULT_BACKEND,
+) -> Image:
+    _check_backend(backend)
+    agents = frame_arrays(frame)
+    if backend == "pil":
+        return _draw_agents(viewport, map_img, agents)
+
+    rgb = np.array(map_img)
+    raster.draw_agents(rgb, viewport, agents, _colors(agents))
+    _warn_pedestrians(agents)
+    return Image.fromarray(rgb)
+
+
+def _encode_frames(
+    renderer: "_Renderer",
+    frames: Iterator[FrameArrays],
+    workers: int,
+    window: int,
+) -> Iterator[bytes]:
+    """
+    Render and encode the frames, yielding the encoded GIF frames in order.
+    """
+    chunks = _chunks(frames, max(1, min(CHUNK_FRAMES, window // max(workers, 1))))
+
+    if workers <= 1:
+        for previous, chunk in chunks:
+            yield from renderer.encode(previous, chunk)
+        return
+
+    with ProcessPoolExecutor(
+        workers, initializer=_init_worker, initargs=(renderer,)
+    ) as pool:
+        pending = deque()
+        for previous, chunk in chunks:
+            pending.append(pool.submit(_encode_chunk, previous, chunk))
+            # Keep window frames in flight, counting the chunk just submitted.
+            while len(pending) * len(chunk) > window:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def _chunks(
+    frames: Iterator[FrameArrays], size: int
+) -> Iterator[Tuple[Optional[FrameArrays], List[FrameArrays]]]:
+    """
+    Split the frames into chunks, each with the frame before it, which its first frame is encoded against.
+    """
+    frames = iter(frames)
+    previous = None
+    while True:
+        chunk = list(itertools.islice(frames, size))
+        if not chunk:
+            return
+        yield previous, chunk
+        previous = chunk[-1]
+
+
+class _Renderer:
+    """
+    Renders frames onto the map, and encodes them as GIF frames.
+    """
+
+    def __init__(
+        self,
+        viewport: Viewport,
+        map_img: Image,
+        palette: Palette,
+        duration: int,
+        backend: str = DEFAULT_BACKEND,
+    ):
+        self.viewport = viewport
+        self.map_img = map_img
+        self.palette = palette
+        self.duration = duration
+        self.backend = backend
+        self.map_rgb = np.asarray(map_img)
+        self.map_indices = palette.index(self.map_rgb)
+
+    def indices(self, agents: FrameArrays) -> np.ndarray:
+        if self.backend == "numpy":
+            # Agents are rasterized straight into palette indices, so there's no RGB to look up.
+            indices = self.map_indices.copy()
+            values = self.palette.index(_colors(agents))
+            raster.draw_agents(indices, self.viewport, agents, values)
+            _warn_pedestrians(agents)
+            return indices
+
+        rgb = np.asarray(_draw_agents(self.viewport, self.map_img, agents))
+        # Only the pixels agents were drawn over need looking up in the palette.
+        drawn = (rgb != self.map_rgb).any(axis=-1)
+        indices = self.map_indices.copy()
+        indices[drawn] = self.palette.index(rgb[drawn])
+        return indices
+
+    def encode(
+        self, previous: Optional[FrameArrays], chunk: List[FrameArrays]
+    ) -> List[bytes]:
+        last = None if previous is None else self.indices(previous)
+        result = []
+        for agents in chunk:
+            indices = self.indices(agents)
+            result.append(encode_frame(indices, last, self.palette, self.duration))
+            last = indices
+        return result
 
-    map_img = _render_map(viewport, interaction_map)
-    imgs = [
-        draw_frame(viewport, map_img, f, width, height)
-        for i, f in enumerate(tracks) if i % step == 0
-    ]
 
-    imgs[0].save(fp=fileobj, format="GIF", append_images=imgs, save_all=True, duration=len(imgs), loop=1)
+# The renderer of each worker process, set once by _init_worker.
+_worker = {}
 
 
-def draw_frame(viewport: Viewport, map_img: Image, frame: Frame, width: int, height: int) -> Image:
+def _init_worker(renderer: _Renderer):
+    _worker.update(renderer=renderer)
+
+
+def _encode_chunk(
+    previous: Optional[FrameArrays], chunk: List[FrameArrays]
+) -> List[bytes]:
+    return _worker["renderer"].encode(previous, chunk)
+
+
+def _draw_agents(viewport: Viewport, map_img: Image, agents: FrameArrays) -> Image:
     img = map_img.copy()
     ctx = ImageDraw.Draw(img)
-    _render_obstacles(ctx, viewport, frame)
+    _render_obstacles(ctx, viewport, agents)
     return img
 
 
+def _check_backend(backend: str) -> None:
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown backend {backend}, expected one of {BACKENDS}")
 
-def _render_map(viewport: Viewport, interaction_map: Map) -> Image:
-    img = Image.new("RGB", (viewport.screen_width, viewport.screen_height), BACKGROUND_COLOR)
-    ctx = ImageDraw.Draw(img)
 
-    to_draw = {
-        WayKind.SolidLine,
-        WayKind.ThickLine,
-        WayKind.DashedLine,
-        WayKind.GuardRail,
-    }
-
-    for osm_id, lane in interaction_map.lanes.items():
-        triangles = lane.to_triangles()
-        for triangle in triangles:
-            triangle = viewport.project(triangle)
-            ctx.polygon(to_tuples(triangle), (140, 140, 140))
-
-    for osm_id, way in interaction_map.ways.items():
-        if way.kind is WayKind.StopLine:
-            ps = viewport.project(
-                [interaction_map.nodes[n.osm_id].position for n in way.nodes]
+def _colors(agents: FrameArrays) -> np.ndarray:
+    return np.array(agent_colors(agents.track_ids), dtype=np.uint8).reshape(-1, 3)
+
+
+# Set once pedestrians have been skipped, so long exports warn once rather than every frame.
+_warned = {}
+
+
+def _warn_pedestrians(agents: FrameArrays) -> None:
+    if not _warned and not agents.has_footprint.all():
+        logging.warning("not implemented: rendering pedestrians to gif")
+        _warned.update(pedestrians=True)
+
+
+def _render_map(
+    viewport: Viewport, interaction_map: Map, backend: str = DEFAULT_BACKEND
+) -> Image:
+    if backend == "numpy":
+        return Image.fromarray(
+            raster.render_map(
+                viewport,
+                interaction_map,
+                background=BACKGROUND_COLOR,
+                lane_color=_LANE_COLOR,
+                stop_line_color=_STOP_LINE_COLOR,
+                boundary_color=_BOUNDARY_COLOR,
+                boundary_thickness=_BOUNDARY_THICKNESS,
             )
-            ctx.line(to_tuples(ps), (252, 186, 3), width=5)
-
-    for osm_id, lane in interaction_map.lanes.items():
-        left_ps = [n.position for n in lane.left_way.nodes]
-        right_ps = [n.position for n in lane.right_way.nodes]
-
-        left_ps = viewport.project(left_ps)
-        right_ps = viewport.project(right_ps)
-
-        if lane.left_way.kind is not WayKind.Virtual:
-            thickness = 1.5
-            if lane.left_way.kind is WayKind.ThickLine:
-                thickness = 2
-            ctx.line(to_tuples(left_ps), (240, 240, 240), width=int(thickness))
-
-        if lane.right_way.kind is not WayKind.Virtual:
-            thickness = 1.5
-            if lane.right_way.kind is WayKind.ThickLine:
-                thickness = 2
-            elif lane.right_way.kind is WayKind.DashedLine:
-                thickness = 2
-            ctx.line(to_tuples(right_ps), (240, 240, 240), width=int(thickness))
-    
+        )
+
+    img = Image.new(
+        "RGB", (viewport.screen_width, viewport.screen_height), BACKGROUND_COLOR
+    )
+    ctx = ImageDraw.Draw(img)
+    mesh = interaction_map.mesh
+
+    for triangle in viewport.project(mesh.lane_triangles()):
+        ctx.polygon(to_tuples(triangle), _LANE_COLOR)
+
+    for ps in mesh.ways.get(WayKind.StopLine, []):
+        ctx.line(to_tuples(viewport.project(ps)), _STOP_LINE_COLOR, width=5)
+
+    for kind, polylines in mesh.lane_boundaries.items():
+        if kind is WayKind.Virtual:
+            continue
+
+        thickness = _BOUNDARY_THICKNESS.get(kind, 1)
+        for ps in polylines:
+            ctx.line(to_tuples(viewport.project(ps)), _BOUNDARY_COLOR, width=thickness)
+
     return img
 
 
-def _render_obstacles(ctx, viewport: Viewport, frame: Frame) -> None:
-    for agent in frame.agents:
-        color = AGENT_COLORS[hash(agent.track_id) % len(AGENT_COLORS)]
-        position = agent.position
-
-        if agent.extent is not None and agent.yaw is not None:
-            half_extent = 0.5 * agent.extent
-            sin_theta = math.sin(agent.yaw)
-            cos_theta = math.cos(agent.yaw)
-            rot = np.array([[cos_theta, -sin_theta], [sin_theta, cos_theta]])
-            offsets = [
-                half_extent * np.array([1, 1]),
-                half_extent * np.array([1.2, 0]),
-                half_extent * np.array([1, 1]),
-                half_extent * np.array([1, -1]),
-                half_extent * np.array([-1, -1]),
-                half_extent * np.array([-1, 1]),
-            ]
-            ps = [position + rot.dot(o) for o in offsets]
-            ps = viewport.project(ps)
-            ctx.polygon(to_tuples(ps), color)
-        else:
-            position = viewport.project([position])[0]
-            logging.warn("not implemented: rendering pedestrians to gif")
+def _render_obstacles(ctx, viewport: Viewport, agents: FrameArrays) -> None:
+    colors = agent_colors(agents.track_ids)
+    footprints = agent_footprints(
+        viewport, agents.positions, agents.yaws, agents.extents
+    )
+
+    for i in np.flatnonzero(agents.has_footprint):
+        ctx.polygon(to_tuples(footprints[i]), colors[i])
+
+    _warn_pedestrians(agents)
 
 
 def to_tuples(ps):
-    return [tuple(int(x) for x in p) for p in ps]
+    return [tuple(p) for p in np.asarray(ps).astype(int).tolist()]
@@ -0,0 +1,162 @@
+"""
+A headless rasterizer, filling batches of polygons and thick line segments straight into NumPy images.
+
+Each shape is expanded to the pixels of its bounding box, and all the pixels of a batch
+of shapes are tested at once: polygons with the even-odd rule, segments by their distance
+to the pixel. Pixels are sampled at integer coordinates, as with PIL.
+
+Images may be (H, W, 3) RGB buffers, or (H, W) buffers of e.g. palette indices.
+Where shapes overlap, later shapes are drawn over earlier ones.
+"""
+
+from typing import Iterator, Tuple, Union
+
+import numpy as np
+
+from interactionviz.maps import Map, WayKind
+from interactionviz.viewers import Viewport
+from interactionviz.viewers.agents import FrameArrays, agent_footprints
+
+# Pixels tested per batch, which bounds the memory used for large shapes.
+BATCH_PIXELS = 1 << 20
+
+Values = Union[np.ndarray, tuple, int]
+
+
+def fill_polygons(image: np.ndarray, polygons: np.ndarray, values: Values) -> None:
+    """
+    Fill the (N, K, 2) polygons, in pixel coordinates, with one value (or color) per polygon.
+    Polygons with NaN vertices are skipped.
+    """
+    polygons = np.asarray(polygons, dtype=np.float64)
+    values = _per_shape(values, len(polygons), image)
+    keep = ~np.isnan(polygons).any(axis=(1, 2))
+    polygons, values = polygons[keep], values[keep]
+
+    # The edges of each polygon, from a to b, and how far x moves along each per unit of y.
+    a, b = polygons, np.roll(polygons, -1, axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dxdy = (b[..., 0] - a[..., 0]) / (b[..., 1] - a[..., 1])
+
+    lower, upper = polygons.min(axis=1), polygons.max(axis=1)
+    for shape, y, x in _candidate_pixels(image, lower, upper):
+        ay, by = a[shape, :, 1], b[shape, :, 1]
+        y = y[:, None]
+        crosses = (ay > y) != (by > y)
+        with np.errstate(invalid="ignore"):
+            x_cross = a[shape, :, 0] + (y - ay) * dxdy[shape]
+        inside = (crosses & (x[:, None] < x_cross)).sum(axis=1) % 2 == 1
+        image[y[inside, 0], x[inside]] = values[shape[inside]]
+
+
+def draw_segments(
+    image: np.ndarray, segments: np.ndarray, width: float, values: Values
+) -> None:
+    """
+    Draw the (N, 2, 2) line segments, in pixel coordinates, width pixels thick.
+    """
+    segments = np.asarray(segments, dtype=np.float64)
+    values = _per_shape(values, len(segments), image)
+    radius = max(width / 2, 0.5)
+
+    a, b = segments[:, 0], segments[:, 1]
+    lower = np.minimum(a, b) - radius
+    upper = np.maximum(a, b) + radius
+    ab = b - a
+    length2 = np.maximum((ab**2).sum(axis=-1), 1e-12)
+
+    for shape, y, x in _candidate_pixels(image, lower, upper):
+        ap_x = x - a[shape, 0]
+        ap_y = y - a[shape, 1]
+        t = np.clip(
+            (ap_x * ab[shape, 0] + ap_y * ab[shape, 1]) / length2[shape], 0.0, 1.0
+        )
+        dx = ap_x - t * ab[shape, 0]
+        dy = ap_y - t * ab[shape, 1]
+        inside = dx * dx + dy * dy <= radius * radius
+        image[y[inside], x[inside]] = values[shape[inside]]
+
+
+def render_map(
+    viewport: Viewport,
+    interaction_map: Map,
+    background: tuple,
+    lane_color: tuple,
+    stop_line_color: tuple,
+    boundary_color: tuple,
+    boundary_thickness: dict,
+    default_thickness: float = 1,
+) -> np.ndarray:
+    """
+    Render the lanes, stop lines and lane boundaries of the map to an (H, W, 3) image.
+    """
+    image = np.empty((viewport.screen_height, viewport.screen_width, 3), np.uint8)
+    image[:] = background
+    mesh = interaction_map.mesh
+
+    fill_polygons(image, viewport.project(mesh.lane_triangles()), lane_color)
+
+    stop_lines = mesh.ways.get(WayKind.StopLine)
+    if stop_lines is not None:
+        draw_segments(
+            image, viewport.project(stop_lines.segments()), 5, stop_line_color
+        )
+
+    for kind, polylines in mesh.lane_boundaries.items():
+        if kind is WayKind.Virtual:
+            continue
+        thickness = boundary_thickness.get(kind, default_thickness)
+        segments = viewport.project(polylines.segments())
+        draw_segments(image, segments, thickness, boundary_color)
+
+    return image
+
+
+def draw_agents(
+    image: np.ndarray, viewport: Viewport, agents: FrameArrays, values: Values
+) -> None:
+    """
+    Fill the footprints of the agents, agents without one (pedestrians and bicycles) are skipped.
+    """
+    footprints = agent_footprints(
+        viewport, agents.positions, agents.yaws, agents.extents
+    )
+    fill_polygons(image, footprints, values)
+
+
+def _candidate_pixels(
+    image: np.ndarray, lower: np.ndarray, upper: np.ndarray
+) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Enumerate the pixels in the bounding box of each shape, clipped to the image,
+    as batches of flat (shape, y, x) arrays.
+    """
+    height, width = image.shape[:2]
+    x0 = np.clip(np.ceil(lower[:, 0]), 0, width).astype(np.int64)
+    y0 = np.clip(np.ceil(lower[:, 1]), 0, height).astype(np.int64)
+    x1 = np.clip(np.floor(upper[:, 0]) + 1, 0, width).astype(np.int64)
+    y1 = np.clip(np.floor(upper[:, 1]) + 1, 0, height).astype(np.int64)
+    box_width = np.maximum(x1 - x0, 0)
+    counts = box_width * np.maximum(y1 - y0, 0)
+
+    # Split the shapes into batches of about BATCH_PIXELS pixels, keeping their order.
+    ends = np.cumsum(counts)
+    batch = ends // BATCH_PIXELS
+    bounds = np.flatnonzero(np.diff(batch)) + 1
+    for shapes in np.split(np.arange(len(counts)), bounds):
+        shapes = shapes[counts[shapes] > 0]
+        if len(shapes) == 0:
+            continue
+        c = counts[shapes]
+        shape = np.repeat(shapes, c)
+        k = np.arange(c.sum()) - np.repeat(np.cumsum(c) - c, c)
+        w = box_width[shape]
+        yield shape, y0[shape] + k // w, x0[shape] + k % w
+
+
+def _per_shape(values: Values, n: int, image: np.ndarray) -> np.ndarray:
+    values = np.asarray(values, dtype=image.dtype)
+    channels = image.shape[2:]
+    if values.shape == channels:
+        values = np.broadcast_to(values, (n,) + channels)
+    return values
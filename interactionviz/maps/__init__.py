@@ -1,2 +1,3 @@
-from .map import WayKind, Way, Node, Map
+from .map import WayKind, Way, Node, Lane, Map, MapMesh, Polylines
+from .spatial import SpatialIndex
 from .xml_loader import load_map_xml
@@ -1,10 +1,13 @@
 from scipy.spatial import Delaunay
-from dataclasses import dataclass
-from typing import Dict, List
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Mapping, Optional
 from enum import Enum
 
 import numpy as np
 
+from .spatial import SpatialIndex
+
 
 class WayKind(Enum):
     SolidLine = 1
@@ -31,6 +34,12 @@ class Way:
     nodes: List
     kind: WayKind
 
+    @property
+    def positions(self) -> np.ndarray:
+        return np.array([n.position for n in self.nodes], dtype=np.float64).reshape(
+            -1, 2
+        )
+
 
 @dataclass
 class Lane:
@@ -38,61 +47,375 @@ class Lane:
     left_way: Way
     right_way: Way
 
-    def to_triangles(self) -> List[np.ndarray]:
+    def points(self) -> np.ndarray:
+        """
+        The points of the left boundary followed by the points of the right boundary.
+        """
+        return np.concatenate([self.left_way.positions, self.right_way.positions])
+
+    def triangle_indices(self) -> np.ndarray:
+        """
+        triangulate the lane so it can easily be rendered,
+        returning an (N, 3) array of indices into self.points().
         """
-        triangulate the lane so it can easily be rendered.
+        return zipper_triangulate(self.left_way.positions, self.right_way.positions)
 
-        Note(Ross): We do this by computing the Delaunay triangulation,
-        and then keeping all triangles that contain two points from one boundary,
-        and one point from the other.
+    def to_triangles(self) -> np.ndarray:
         """
-        left_ps = [n.position for n in self.left_way.nodes]
-        right_ps = [n.position for n in self.right_way.nodes]
+        triangulate the lane, returning an (N, 3, 2) array of triangles.
+        """
+        return self.points()[self.triangle_indices()]
+
+
+def zipper_triangulate(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """
+    Triangulate the strip between two polylines, returning an (N, 3) array of
+    counter-clockwise triangles, indexing into the left points followed by the right points.
+
+    Note: We walk along both boundaries at once. Each boundary is parameterized by
+    its normalized arc length, and each step advances whichever boundary has the next
+    vertex, adding a triangle made of the current edge and the current vertex on the other
+    boundary. Unlike a Delaunay triangulation of the points, this follows the
+    boundaries, so curved (non-convex) lanes are filled correctly.
+    If the boundaries run in opposite directions, the right one is walked backwards.
+    """
+    n, m = len(left), len(right)
+    if n == 0 or m == 0 or n + m < 3:
+        return np.zeros((0, 3), dtype=np.int64)
+
+    right_index = np.arange(m)
+    crossed = np.linalg.norm(left[0] - right[-1]) + np.linalg.norm(left[-1] - right[0])
+    straight = np.linalg.norm(left[0] - right[0]) + np.linalg.norm(left[-1] - right[-1])
+    if crossed < straight:
+        right_index = right_index[::-1]
+
+    # Merge the steps along both boundaries by arc length,
+    # on ties the left boundary steps first.
+    is_right = np.concatenate([np.zeros(n - 1, bool), np.ones(m - 1, bool)])
+    steps = np.concatenate(
+        [
+            _arc_length_parameters(left)[1:],
+            _arc_length_parameters(right[right_index])[1:],
+        ]
+    )
+    is_right = is_right[np.argsort(steps, kind="stable")]
+
+    # The current vertex on each boundary, before each step.
+    i = np.cumsum(~is_right) - ~is_right
+    j = np.cumsum(is_right) - is_right
+
+    triangles = np.stack(
+        [
+            i,
+            np.where(
+                is_right,
+                n + right_index[np.minimum(j + 1, m - 1)],
+                np.minimum(i + 1, n - 1),
+            ),
+            n + right_index[j],
+        ],
+        axis=-1,
+    )
+
+    ps = np.concatenate([left, right])[triangles]
+    u, v = ps[:, 1] - ps[:, 0], ps[:, 2] - ps[:, 0]
+    area = u[:, 0] * v[:, 1] - u[:, 1] * v[:, 0]
+    triangles[area < 0] = triangles[area < 0][:, [0, 2, 1]]
+
+    return triangles[area != 0]
+
+
+def _arc_length_parameters(ps: np.ndarray) -> np.ndarray:
+    """
+    The normalized arc length at each point of a polyline, from 0 to 1.
+    """
+    distance = np.concatenate(
+        [[0.0], np.cumsum(np.linalg.norm(np.diff(ps, axis=0), axis=-1))]
+    )
+    if distance[-1] == 0:
+        return np.linspace(0.0, 1.0, len(ps))
+    return distance / distance[-1]
+
+
+@dataclass
+class Polylines:
+    """
+    Polylines stores many polylines in flat buffers,
+    the i-th polyline is vertices[offsets[i]:offsets[i + 1]].
+    """
 
-        def is_left(idx):
-            return idx < len(left_ps)
+    vertices: np.ndarray  # (N, 2)
+    offsets: np.ndarray  # (K + 1,)
+    way_ids: List[str]
 
-        ps = left_ps + right_ps
-        tri = Delaunay(ps)
+    @classmethod
+    def from_ways(cls, ways: List[Way]) -> "Polylines":
+        positions = [w.positions for w in ways]
+        return cls(
+            vertices=np.concatenate(positions + [np.zeros((0, 2))]),
+            offsets=np.cumsum([0] + [len(p) for p in positions]).astype(np.int64),
+            way_ids=[w.osm_id for w in ways],
+        )
 
-        result = []
-        simplices = tri.simplices
-        for i in range(simplices.shape[0]):
-            num_left_points = sum(is_left(idx) for idx in simplices[i])
-            if num_left_points == 1 or num_left_points == 2:
-                triangle = [ps[idx] for idx in simplices[i]]
-                result.append(triangle)
+    def __len__(self) -> int:
+        return len(self.way_ids)
 
-        return result
+    def __getitem__(self, i: int) -> np.ndarray:
+        return self.vertices[self.offsets[i] : self.offsets[i + 1]]
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def segments(self) -> np.ndarray:
+        """
+        The segments between consecutive vertices of every polyline, as an (S, 2, 2) array.
+        """
+        polyline = np.repeat(np.arange(len(self)), np.diff(self.offsets))
+        same = polyline[1:] == polyline[:-1]
+        return np.stack([self.vertices[:-1], self.vertices[1:]], axis=1)[same]
 
 
 @dataclass
+class MapMesh:
+    """
+    MapMesh holds the geometry of a map, ready to be rendered:
+    the triangulated lanes, the triangulated map region,
+    and the polylines of the ways grouped by kind.
+    """
+
+    lane_ids: List[str]
+    lane_vertices: np.ndarray  # (N, 2)
+    lane_indices: np.ndarray  # (T, 3) into lane_vertices
+    lane_offsets: np.ndarray  # (L + 1,) the triangles of the i-th lane
+    region_vertices: np.ndarray  # (M, 2)
+    region_indices: np.ndarray  # (S, 3) into region_vertices
+    ways: Dict[WayKind, Polylines]
+    # The ways that bound a lane, a subset of ways.
+    lane_boundaries: Dict[WayKind, Polylines]
+
+    @classmethod
+    def build(cls, interaction_map: "Map") -> "MapMesh":
+        lanes = list(interaction_map.lanes.values())
+        points = [lane.points() for lane in lanes]
+        indices = [lane.triangle_indices() for lane in lanes]
+        vertex_offsets = np.cumsum([0] + [len(p) for p in points])
+
+        region_vertices = interaction_map.node_positions[interaction_map.way_nodes]
+
+        ways = list(interaction_map.ways.values())
+        boundaries = set(interaction_map.lane_ways.reshape(-1).tolist())
+
+        return cls(
+            lane_ids=[lane.osm_id for lane in lanes],
+            lane_vertices=np.concatenate(points + [np.zeros((0, 2))]),
+            lane_indices=np.concatenate(
+                [i + o for i, o in zip(indices, vertex_offsets)]
+                + [np.zeros((0, 3), dtype=np.int64)]
+            ),
+            lane_offsets=np.cumsum([0] + [len(i) for i in indices]).astype(np.int64),
+            region_vertices=region_vertices,
+            region_indices=Delaunay(region_vertices).simplices,
+            ways=_group_by_kind(ways),
+            lane_boundaries=_group_by_kind([ways[i] for i in sorted(boundaries)]),
+        )
+
+    def lane_triangles(self) -> np.ndarray:
+        """
+        All lane triangles as an (T, 3, 2) array.
+        """
+        return self.lane_vertices[self.lane_indices]
+
+    def region_triangles(self) -> np.ndarray:
+        return self.region_vertices[self.region_indices]
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Flatten the mesh to a dict of arrays, e.g. to be saved with np.save.
+        """
+        arrays = dict(
+            lane_ids=np.array(self.lane_ids, dtype=str),
+            lane_vertices=self.lane_vertices,
+            lane_indices=self.lane_indices,
+            lane_offsets=self.lane_offsets,
+            region_vertices=self.region_vertices,
+            region_indices=self.region_indices,
+        )
+        for group in ("ways", "lane_boundaries"):
+            for kind, polylines in getattr(self, group).items():
+                prefix = f"{group}.{kind.name}"
+                arrays[f"{prefix}.vertices"] = polylines.vertices
+                arrays[f"{prefix}.offsets"] = polylines.offsets
+                arrays[f"{prefix}.way_ids"] = np.array(polylines.way_ids, dtype=str)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "MapMesh":
+        groups = dict(ways={}, lane_boundaries={})
+        for name in arrays:
+            group, _, kind_field = name.partition(".")
+            if group in groups and kind_field.endswith(".vertices"):
+                kind = kind_field[: -len(".vertices")]
+                prefix = f"{group}.{kind}"
+                groups[group][WayKind[kind]] = Polylines(
+                    vertices=arrays[f"{prefix}.vertices"],
+                    offsets=arrays[f"{prefix}.offsets"],
+                    way_ids=arrays[f"{prefix}.way_ids"].tolist(),
+                )
+
+        return cls(
+            lane_ids=arrays["lane_ids"].tolist(),
+            lane_vertices=arrays["lane_vertices"],
+            lane_indices=arrays["lane_indices"],
+            lane_offsets=arrays["lane_offsets"],
+            region_vertices=arrays["region_vertices"],
+            region_indices=arrays["region_indices"],
+            **groups,
+        )
+
+
+def _group_by_kind(ways) -> Dict[WayKind, Polylines]:
+    by_kind = defaultdict(list)
+    for way in ways:
+        by_kind[way.kind].append(way)
+    return {kind: Polylines.from_ways(ways) for kind, ways in by_kind.items()}
+
+
+@dataclass(eq=False)
 class Map:
     """
     Map represents the data loaded from a lanelets XML file,
     as represented in the interactions dataset.
+
+    The map is stored as arrays: node positions are rows of one (N, 2) array,
+    and the nodes of each way are stored in CSR form, the nodes of the i-th way are
+    the rows way_nodes[way_offsets[i]:way_offsets[i + 1]].
+    The nodes, ways and lanes properties give views of the map as Node, Way and Lane objects,
+    keyed by osm id.
     """
 
-    ways: Dict[str, Way]
-    nodes: Dict[str, Node]
-    lanes: Dict[str, Lane]
+    node_ids: List[str]
+    node_positions: np.ndarray  # (N, 2) float64
+    way_ids: List[str]
+    way_kinds: np.ndarray  # (W,) WayKind values
+    way_offsets: np.ndarray  # (W + 1,) into way_nodes
+    way_nodes: np.ndarray  # node rows
+    lane_ids: List[str]
+    lane_ways: np.ndarray  # (L, 2) left and right way rows
+    _mesh: Optional[MapMesh] = field(default=None, repr=False)
+    _spatial_index: Optional[SpatialIndex] = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        self.node_rows = {osm_id: i for i, osm_id in enumerate(self.node_ids)}
+        self.way_rows = {osm_id: i for i, osm_id in enumerate(self.way_ids)}
+        self.lane_rows = {osm_id: i for i, osm_id in enumerate(self.lane_ids)}
 
-    def triangulate_map_region(self) -> List[np.ndarray]:
+    @property
+    def nodes(self) -> Mapping[str, Node]:
+        return _MapView(self.node_rows, self.node)
+
+    @property
+    def ways(self) -> Mapping[str, Way]:
+        return _MapView(self.way_rows, self.way)
+
+    @property
+    def lanes(self) -> Mapping[str, Lane]:
+        return _MapView(self.lane_rows, self.lane)
+
+    def node(self, row: int) -> Node:
+        return Node(osm_id=self.node_ids[row], position=self.node_positions[row])
+
+    def way(self, row: int) -> "WayView":
+        return WayView(self, row)
+
+    def lane(self, row: int) -> Lane:
+        left, right = self.lane_ways[row]
+        return Lane(
+            osm_id=self.lane_ids[row],
+            left_way=self.way(left),
+            right_way=self.way(right),
+        )
+
+    @property
+    def mesh(self) -> MapMesh:
+        """
+        The triangulated map, built on first use.
+        """
+        if self._mesh is None:
+            self._mesh = MapMesh.build(self)
+        return self._mesh
+
+    @property
+    def spatial_index(self) -> SpatialIndex:
+        """
+        A spatial index over the lanes and ways, built on first use.
+        """
+        if self._spatial_index is None:
+            self._spatial_index = SpatialIndex(self)
+        return self._spatial_index
+
+    def triangulate_map_region(self) -> np.ndarray:
         """
         Triangulate the map region, using the ways as the boundaries.
         """
-        points = []
-        way_ids = []
-        for way in self.ways.values():
-            for p in way.nodes:
-                points.append(p.position)
-                way_ids.append(way.osm_id)
-
-        triangles = Delaunay(points).simplices
-        result = []
-        for i in range(triangles.shape[0]):
-            triangle = triangles[i]
-            triangle_way_ids = [way_ids[j] for j in triangle]
-            result.append([points[j] for j in triangle])
-
-        return result
+        return self.mesh.region_triangles()
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The size of the map arrays, and of the mesh if it has been built.
+        """
+        arrays = [
+            getattr(self, name)
+            for name in self.__dataclass_fields__
+            if isinstance(getattr(self, name), np.ndarray)
+        ]
+        if self._mesh is not None:
+            arrays.extend(self._mesh.to_arrays().values())
+        return sum(a.nbytes for a in arrays)
+
+
+class WayView(Way):
+    """
+    WayView is a Way backed by the arrays of a Map.
+    """
+
+    def __init__(self, interaction_map: Map, row: int):
+        self.map = interaction_map
+        self.row = row
+        self.node_rows = interaction_map.way_nodes[
+            interaction_map.way_offsets[row] : interaction_map.way_offsets[row + 1]
+        ]
+
+    @property
+    def osm_id(self) -> str:
+        return self.map.way_ids[self.row]
+
+    @property
+    def kind(self) -> WayKind:
+        return WayKind(int(self.map.way_kinds[self.row]))
+
+    @property
+    def nodes(self) -> List[Node]:
+        return [self.map.node(i) for i in self.node_rows]
+
+    @property
+    def positions(self) -> np.ndarray:
+        return self.map.node_positions[self.node_rows]
+
+    def __repr__(self) -> str:
+        return f"WayView(osm_id={self.osm_id!r}, kind={self.kind}, num_nodes={len(self.node_rows)})"
+
+
+class _MapView(Mapping):
+    def __init__(self, rows: Dict[str, int], get: Callable[[int], Any]):
+        self._rows = rows
+        self._get = get
+
+    def __getitem__(self, osm_id: str):
+        return self._get(self._rows[osm_id])
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def __len__(self) -> int:
+        return len(self._rows)
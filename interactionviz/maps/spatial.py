@@ -0,0 +1,186 @@
+from typing import Tuple
+
+import numpy as np
+
+DEFAULT_CELL_SIZE = 10.0  # meters
+
+
+class UniformGrid:
+    """
+    UniformGrid bins items, given by their bounding boxes, into square cells.
+    The items overlapping the i-th cell are items[offsets[i]:offsets[i + 1]].
+    """
+
+    def __init__(
+        self, item_lower: np.ndarray, item_upper: np.ndarray, cell_size: float
+    ):
+        self.cell_size = cell_size
+        self.item_lower = item_lower
+        self.item_upper = item_upper
+
+        if len(item_lower) == 0:
+            self.origin = np.zeros(2)
+            self.shape = np.ones(2, dtype=np.int64)
+        else:
+            self.origin = item_lower.min(axis=0)
+            self.shape = self._cell(item_upper.max(axis=0)) + 1
+
+        first, last = self._cell(item_lower), self._cell(item_upper)
+        counts = last - first + 1
+        num_cells = counts[:, 0] * counts[:, 1]
+
+        # Enumerate every (item, cell) pair without a Python loop.
+        item = np.repeat(np.arange(len(item_lower)), num_cells)
+        k = np.arange(num_cells.sum()) - np.repeat(
+            np.cumsum(num_cells) - num_cells, num_cells
+        )
+        x = first[item, 0] + k % counts[item, 0]
+        y = first[item, 1] + k // counts[item, 0]
+        cell = self._cell_id(x, y)
+
+        order = np.argsort(cell, kind="stable")
+        self.items = item[order]
+        self.offsets = np.concatenate(
+            [[0], np.cumsum(np.bincount(cell, minlength=self.shape.prod()))]
+        )
+
+    def query_bbox(self, lower: np.ndarray, upper: np.ndarray) -> np.ndarray:
+        """
+        The sorted indices of the items whose bounding boxes overlap the given box.
+        """
+        first = np.clip(self._cell(np.asarray(lower)), 0, self.shape - 1)
+        last = np.clip(self._cell(np.asarray(upper)), 0, self.shape - 1)
+        x, y = np.meshgrid(
+            np.arange(first[0], last[0] + 1), np.arange(first[1], last[1] + 1)
+        )
+        cells = self._cell_id(x.reshape(-1), y.reshape(-1))
+
+        candidates = np.unique(
+            np.concatenate(
+                [self.items[self.offsets[c] : self.offsets[c + 1]] for c in cells]
+                + [np.zeros(0, dtype=np.int64)]
+            )
+        )
+        overlaps = np.all(
+            (self.item_lower[candidates] <= upper)
+            & (self.item_upper[candidates] >= lower),
+            axis=-1,
+        )
+        return candidates[overlaps]
+
+    def query_points(self, points: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the items whose cells contain each point,
+        returned as two arrays of (point index, item index) pairs.
+        """
+        cell = self._cell(points)
+        inside = np.all((cell >= 0) & (cell < self.shape), axis=-1)
+        point = np.flatnonzero(inside)
+        cell = self._cell_id(cell[inside, 0], cell[inside, 1])
+
+        starts, ends = self.offsets[cell], self.offsets[cell + 1]
+        counts = ends - starts
+        point = np.repeat(point, counts)
+        k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        item = self.items[np.repeat(starts, counts) + k]
+
+        return point, item
+
+    def _cell(self, points: np.ndarray) -> np.ndarray:
+        return np.floor((points - self.origin) / self.cell_size).astype(np.int64)
+
+    def _cell_id(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        return y * self.shape[0] + x
+
+
+class SpatialIndex:
+    """
+    SpatialIndex answers which lanes and ways are near a point or inside a box,
+    using uniform grids over the lane triangles and the way segments of a map.
+
+    e.g. to find the lane of every agent in a session,
+
+        rows = interaction_map.spatial_index.lanes_at(np.stack([tracks.x, tracks.y], axis=-1))
+    """
+
+    def __init__(self, interaction_map, cell_size: float = DEFAULT_CELL_SIZE):
+        mesh = interaction_map.mesh
+
+        self.triangles = mesh.lane_triangles()
+        self.triangle_lanes = np.repeat(
+            np.arange(len(mesh.lane_ids)), np.diff(mesh.lane_offsets)
+        )
+        self.lane_grid = UniformGrid(
+            self.triangles.min(axis=1), self.triangles.max(axis=1), cell_size
+        )
+
+        # Segments join consecutive nodes of the same way.
+        positions = interaction_map.node_positions[interaction_map.way_nodes]
+        way_of_node = np.repeat(
+            np.arange(len(interaction_map.way_ids)),
+            np.diff(interaction_map.way_offsets),
+        )
+        same_way = way_of_node[1:] == way_of_node[:-1]
+        self.segments = np.stack([positions[:-1], positions[1:]], axis=1)[same_way]
+        self.segment_ways = way_of_node[:-1][same_way]
+        self.way_grid = UniformGrid(
+            self.segments.min(axis=1), self.segments.max(axis=1), cell_size
+        )
+
+    def lanes_in_bbox(self, lower: np.ndarray, upper: np.ndarray) -> np.ndarray:
+        """
+        The rows of the lanes with a triangle overlapping the box, e.g. to cull a viewport.
+        """
+        triangles = self.lane_grid.query_bbox(lower, upper)
+        return np.unique(self.triangle_lanes[triangles])
+
+    def ways_in_bbox(self, lower: np.ndarray, upper: np.ndarray) -> np.ndarray:
+        """
+        The rows of the ways with a segment overlapping the box.
+        """
+        segments = self.way_grid.query_bbox(lower, upper)
+        return np.unique(self.segment_ways[segments])
+
+    def lane_pairs_at(self, points: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find every lane containing each of the (N, 2) points,
+        returned as two arrays of (point index, lane row) pairs.
+        """
+        point, triangle = self.lane_grid.query_points(points)
+        inside = _in_triangles(points[point], self.triangles[triangle])
+        pairs = np.unique(
+            np.stack(
+                [point[inside], self.triangle_lanes[triangle[inside]]], axis=-1
+            ).reshape(-1, 2),
+            axis=0,
+        )
+        return pairs[:, 0], pairs[:, 1]
+
+    def lanes_at(self, points: np.ndarray) -> np.ndarray:
+        """
+        The row of the lane containing each of the (N, 2) points, or -1 for points outside all lanes.
+        Where lanes overlap (e.g. in intersections), the lane with the lowest row is returned.
+        """
+        point, lane = self.lane_pairs_at(points)
+        result = np.full(len(points), -1, dtype=np.int64)
+        # Pairs are sorted, so the first pair of each point has its lowest lane row.
+        first = np.unique(point, return_index=True)[1]
+        result[point[first]] = lane[first]
+        return result
+
+
+def _in_triangles(points: np.ndarray, triangles: np.ndarray) -> np.ndarray:
+    """
+    Whether each point lies in the corresponding triangle, including its boundary.
+    """
+
+    def side(a, b):
+        return (b[:, 0] - a[:, 0]) * (points[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (
+            points[:, 0] - a[:, 0]
+        )
+
+    a, b, c = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+    d1, d2, d3 = side(a, b), side(b, c), side(c, a)
+    has_negative = (d1 < 0) | (d2 < 0) | (d3 < 0)
+    has_positive = (d1 > 0) | (d2 > 0) | (d3 > 0)
+    return ~(has_negative & has_positive)
@@ -1,22 +1,41 @@
 import xml.etree
 import xml.etree.ElementTree
-from typing import IO, Union
+from array import array
+from typing import IO, Dict, Union
 import pathlib
 
 import numpy as np
 
-from .map import Map, Way, WayKind, Node, Lane
+from .map import Map, WayKind
 
 
 def load_map_xml(infile: Union[pathlib.Path, IO]) -> Map:
-    tree = xml.etree.ElementTree.parse(infile)
-    root = tree.getroot()
+    """
+    Load a map from a lanelets XML file.
 
-    nodes = {}
-    ways = {}
-    lanes = {}
+    The file is streamed with iterparse, and each element is cleared once it has been read,
+    so the whole document is never held in memory.
+    """
+    node_ids = []
+    node_positions = array("d")
+    node_rows = {}
+
+    way_ids = []
+    way_kinds = array("i")
+    way_offsets = array("q", [0])
+    way_nodes = array("q")
+    way_rows = {}
+
+    lane_ids = []
+    lane_ways = array("q")
+
+    events = xml.etree.ElementTree.iterparse(infile, events=("start", "end"))
+    _, root = next(events)
+
+    for event, child in events:
+        if event != "end":
+            continue
 
-    for child in root:
         if child.tag == "relation":
             osm_id = child.attrib["id"]
             left_way_id, right_way_id = None, None
@@ -32,67 +51,75 @@ def load_map_xml(infile: Union[pathlib.Path, IO]) -> Map:
                     right_way_id = e.attrib.get("ref")
 
             if tags.get("type") == "lanelet":
-                lanes[osm_id] = Lane(
-                    osm_id=osm_id,
-                    left_way=ways[left_way_id],
-                    right_way=ways[right_way_id],
-                )
+                lane_ids.append(osm_id)
+                lane_ways.append(way_rows[left_way_id])
+                lane_ways.append(way_rows[right_way_id])
 
         elif child.tag == "node":
             osm_id = child.attrib["id"]
-            nodes[osm_id] = Node(
-                osm_id=osm_id,
-                position=np.array(
-                    [
-                        float(child.attrib["x"]),
-                        float(child.attrib["y"]),
-                    ]
-                ),
-            )
+            node_rows[osm_id] = len(node_ids)
+            node_ids.append(osm_id)
+            node_positions.append(float(child.attrib["x"]))
+            node_positions.append(float(child.attrib["y"]))
+
         elif child.tag == "way":
             way_id = child.attrib["id"]
-            way_nodes = []
             tags = {}
             for n in child:
                 if n.tag == "tag":
                     tags[n.attrib["k"]] = n.attrib["v"]
                 elif n.tag == "nd":
-                    way_nodes.append(nodes[n.attrib["ref"]])
-
-            way_type = tags.get("type")
-            way_sub_type = tags.get("subtype")
-
-            way_kind = None
-            if way_type == "road_border":
-                way_kind = WayKind.RoadBorder
-            elif way_type == "stop_line":
-                way_kind = WayKind.StopLine
-            elif way_type == "guard_rail":
-                way_kind = WayKind.GuardRail
-            elif way_type == "line_thin":
-                if way_sub_type == "dashed":
-                    way_kind = WayKind.DashedLine
-                elif way_sub_type in {"solid", "solid_solid"}:
-                    way_kind = WayKind.SolidLine
-                else:
-                    raise ValueError(f"unknown subkind {way_sub_type}")
-            elif way_type == "curbstone":
-                way_kind = WayKind.CurbStone
-            elif way_type == "virtual":
-                way_kind = WayKind.Virtual
-            elif way_type == "pedestrian_marking":
-                way_kind = WayKind.PedestrianMarking
-            elif way_type == "traffic_sign":
-                way_kind = WayKind.TrafficSign
-            elif way_type == "line_thick":
-                way_kind = WayKind.ThickLine
-            else:
-                raise ValueError(f"unknown way type {way_type}")
-
-            ways[way_id] = Way(osm_id=way_id, nodes=way_nodes, kind=way_kind)
+                    way_nodes.append(node_rows[n.attrib["ref"]])
+
+            way_rows[way_id] = len(way_ids)
+            way_ids.append(way_id)
+            way_kinds.append(_way_kind(tags).value)
+            way_offsets.append(len(way_nodes))
+
+        else:
+            continue
+
+        # Drop the elements that have been read.
+        root.clear()
 
     return Map(
-        ways=ways,
-        nodes=nodes,
-        lanes=lanes,
+        node_ids=node_ids,
+        node_positions=np.frombuffer(node_positions, dtype=np.float64).reshape(-1, 2),
+        way_ids=way_ids,
+        way_kinds=np.frombuffer(way_kinds, dtype=np.int32),
+        way_offsets=np.frombuffer(way_offsets, dtype=np.int64),
+        way_nodes=np.frombuffer(way_nodes, dtype=np.int64),
+        lane_ids=lane_ids,
+        lane_ways=np.frombuffer(lane_ways, dtype=np.int64).reshape(-1, 2),
     )
+
+
+def _way_kind(tags: Dict[str, str]) -> WayKind:
+    way_type = tags.get("type")
+    way_sub_type = tags.get("subtype")
+
+    if way_type == "road_border":
+        return WayKind.RoadBorder
+    elif way_type == "stop_line":
+        return WayKind.StopLine
+    elif way_type == "guard_rail":
+        return WayKind.GuardRail
+    elif way_type == "line_thin":
+        if way_sub_type == "dashed":
+            return WayKind.DashedLine
+        elif way_sub_type in {"solid", "solid_solid"}:
+            return WayKind.SolidLine
+        else:
+            raise ValueError(f"unknown subkind {way_sub_type}")
+    elif way_type == "curbstone":
+        return WayKind.CurbStone
+    elif way_type == "virtual":
+        return WayKind.Virtual
+    elif way_type == "pedestrian_marking":
+        return WayKind.PedestrianMarking
+    elif way_type == "traffic_sign":
+        return WayKind.TrafficSign
+    elif way_type == "line_thick":
+        return WayKind.ThickLine
+    else:
+        raise ValueError(f"unknown way type {way_type}")
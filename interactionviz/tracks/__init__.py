@@ -1 +1,13 @@
-from .tracks import Tracks, Frame, Agent, AgentKind, load_tracks_files
+from .tracks import (
+    FRAME_INTERVAL_MS,
+    Trajectory,
+    Tracks,
+    TrackStore,
+    Frame,
+    FrameView,
+    Agent,
+    AgentKind,
+    load_tracks_files,
+)
+from .lazy import LazyTracks
+from .query import QueryResult, TrackQuery
@@ -0,0 +1,195 @@
+import mmap
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Sequence, Union
+
+import numpy as np
+
+from .tracks import FrameView, TrackStore, _parse_header, _parse_rows
+
+DEFAULT_CACHE_SIZE = 256
+
+
+class LazyTracks(Sequence):
+    """
+    LazyTracks are Tracks that decode frames from the trackfiles on demand.
+
+    Opening the files makes a single vectorized pass over their bytes to find
+    the lines belonging to each frame_id, so the first frame can be shown without
+    parsing the whole recording. Decoded frames are kept in a bounded LRU.
+
+    Track ids are interned as frames are decoded, so FrameView.track_codes
+    are stable across frames.
+    """
+
+    def __init__(self, *trackfiles: Union[str, Path], cache_size=DEFAULT_CACHE_SIZE):
+        self.cache_size = cache_size
+        self.track_ids: List[str] = []
+        self._track_codes: Dict[str, int] = {}
+        self._frames = OrderedDict()
+        self._files = [_IndexedFile(Path(p)) for p in trackfiles]
+
+        file_index = np.concatenate(
+            [
+                np.full(len(f.frame_id), i, dtype=np.int32)
+                for i, f in enumerate(self._files)
+            ]
+        )
+        frame_id = np.concatenate([f.frame_id for f in self._files])
+
+        # Rows are (file, line) pairs, stably sorted by frame_id,
+        # so agents within a frame keep the order they have in the files.
+        rows = np.argsort(frame_id, kind="stable")
+        self._row_file = file_index[rows]
+        self._row_line = np.concatenate(
+            [np.arange(len(f.frame_id)) for f in self._files]
+        )[rows]
+        self.frame_ids, starts = np.unique(frame_id[rows], return_index=True)
+        self.frame_offsets = np.append(starts, len(rows))
+
+    def __len__(self) -> int:
+        return len(self.frame_ids)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The size of the line index and of the decoded frames, the mapped files aren't counted.
+        """
+        arrays = [self._row_file, self._row_line, self.frame_ids, self.frame_offsets]
+        for f in self._files:
+            arrays.extend([f.line_starts, f.line_ends, f.frame_id])
+        return sum(a.nbytes for a in arrays) + sum(
+            frame.store.nbytes for frame in self._frames.values()
+        )
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"frame index {index} out of range")
+
+        if index in self._frames:
+            self._frames.move_to_end(index)
+            return self._frames[index]
+
+        frame = self._decode(index)
+        self._frames[index] = frame
+        if len(self._frames) > self.cache_size:
+            self._frames.popitem(last=False)
+
+        return frame
+
+    def _decode(self, index: int) -> FrameView:
+        rows = slice(self.frame_offsets[index], self.frame_offsets[index + 1])
+        row_file = self._row_file[rows]
+        row_line = self._row_line[rows]
+
+        parts = []
+        for i, f in enumerate(self._files):
+            lines = row_line[row_file == i]
+            if len(lines) > 0:
+                parts.append(_parse_rows(f.header, f.lines(lines)))
+
+        columns = {
+            name: np.concatenate([p[name] for p in parts]) for name in parts[0].keys()
+        }
+        track = np.array(
+            [self._intern(t) for t in columns.pop("track_id")], dtype=np.int32
+        )
+
+        store = TrackStore(
+            frame_id=columns.pop("frame_id"),
+            track=track,
+            kind=columns.pop("kind"),
+            timestamp_ms=columns.pop("timestamp_ms"),
+            track_ids=self.track_ids,
+            frame_ids=self.frame_ids[index : index + 1].astype(np.int32),
+            frame_offsets=np.array([0, len(track)], dtype=np.int64),
+            **{name: values.astype(np.float32) for name, values in columns.items()},
+        )
+        return FrameView(store, 0)
+
+    def _intern(self, track_id: str) -> int:
+        code = self._track_codes.get(track_id)
+        if code is None:
+            code = self._track_codes[track_id] = len(self.track_ids)
+            self.track_ids.append(track_id)
+        return code
+
+
+class _IndexedFile:
+    """
+    A memory-mapped trackfile, with the byte range and frame_id of every line.
+    """
+
+    def __init__(self, path: Path):
+        with path.open("rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # Empty files can't be mapped, and have no lines.
+                self._buffer = b""
+                self.header = []
+                self.line_starts = self.line_ends = np.zeros(0, dtype=np.int64)
+                self.frame_id = np.zeros(0, dtype=np.int32)
+                return
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        data = np.frombuffer(self._buffer, dtype=np.uint8)
+        newlines = np.flatnonzero(data == ord("\n"))
+        header_end = newlines[0] if len(newlines) > 0 else len(data)
+        self.header = _parse_header(bytes(data[:header_end]).decode())
+
+        starts = np.append(0, newlines + 1)
+        ends = np.append(newlines, len(data))
+        ends -= data[np.maximum(ends - 1, 0)] == ord("\r")
+        nonempty = ends > starts
+        self.line_starts = starts[nonempty][1:]
+        self.line_ends = ends[nonempty][1:]
+
+        self.frame_id = _parse_int_field(
+            data,
+            self.line_starts,
+            self.line_ends,
+            self.header.index("frame_id"),
+            len(self.header),
+        )
+
+    def lines(self, indices: np.ndarray) -> List[str]:
+        return [
+            self._buffer[start:end].decode()
+            for start, end in zip(self.line_starts[indices], self.line_ends[indices])
+        ]
+
+
+def _parse_int_field(
+    data: np.ndarray,
+    line_starts: np.ndarray,
+    line_ends: np.ndarray,
+    column: int,
+    num_columns: int,
+) -> np.ndarray:
+    """
+    Parse the non-negative integer in the given column of every line,
+    without splitting the lines, by locating the commas around the field.
+    """
+    if len(line_starts) == 0:
+        return np.zeros(0, dtype=np.int32)
+
+    commas = np.flatnonzero(data[line_starts[0] :] == ord(",")) + line_starts[0]
+    if len(commas) != len(line_starts) * (num_columns - 1):
+        raise ValueError("trackfile lines do not all have the same number of columns")
+    commas = commas.reshape(len(line_starts), num_columns - 1)
+
+    starts = commas[:, column - 1] + 1 if column > 0 else line_starts
+    ends = commas[:, column] if column < num_columns - 1 else line_ends
+
+    widths = ends - starts
+    result = np.zeros(len(starts), dtype=np.int64)
+    for k in range(int(widths.max(initial=0))):
+        digits = data[np.minimum(starts + k, len(data) - 1)].astype(np.int64) - ord("0")
+        result = np.where(k < widths, result * 10 + digits, result)
+
+    return result.astype(np.int32)
@@ -0,0 +1,171 @@
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .tracks import TrackStore
+
+DEFAULT_CELL_SIZE = 10.0  # meters
+DEFAULT_BLOCK_FRAMES = 100
+
+
+@dataclass
+class QueryResult:
+    """
+    The rows of a TrackStore matching a query, in store (frame) order.
+    """
+
+    rows: np.ndarray  # (N,) into the store's columns
+    frame_ids: np.ndarray  # (N,)
+    tracks: np.ndarray  # (N,) into the store's track_ids
+    positions: np.ndarray  # (N, 2)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+
+class TrackQuery:
+    """
+    TrackQuery finds the rows of a TrackStore inside a box or polygon, within a window of frames.
+
+    Frames are grouped into blocks of block_frames, and the rows of each block are binned into
+    a uniform grid of square cells, sorted by (block, cell). The rows of block b and cell c are
+    rows[offsets[k]:offsets[k + 1]] with k = b * num_cells + c, so a query only reads the rows of
+    the cells and blocks it overlaps, before testing them exactly.
+    """
+
+    def __init__(
+        self,
+        store: TrackStore,
+        cell_size: float = DEFAULT_CELL_SIZE,
+        block_frames: int = DEFAULT_BLOCK_FRAMES,
+    ):
+        self.store = store
+        self.cell_size = cell_size
+        self.block_frames = block_frames
+        self.positions = np.stack([store.x, store.y], axis=-1).astype(np.float64)
+
+        if store.num_rows == 0:
+            self.origin = np.zeros(2)
+            self.shape = np.ones(2, dtype=np.int64)
+        else:
+            self.origin = self.positions.min(axis=0)
+            self.shape = self._cell(self.positions.max(axis=0)) + 1
+        self.num_cells = int(self.shape.prod())
+        self.num_blocks = max(-(-len(store) // block_frames), 1)
+
+        frame_index = np.repeat(np.arange(len(store)), np.diff(store.frame_offsets))
+        cell = self._cell(self.positions)
+        key = (frame_index // block_frames) * self.num_cells + self._cell_id(
+            cell[:, 0], cell[:, 1]
+        )
+
+        self.rows = np.argsort(key, kind="stable")
+        self.offsets = np.concatenate(
+            [
+                [0],
+                np.cumsum(np.bincount(key, minlength=self.num_blocks * self.num_cells)),
+            ]
+        )
+
+    def query(
+        self,
+        frames: Optional[Tuple[int, int]] = None,
+        bbox: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+        polygon: Optional[np.ndarray] = None,
+    ) -> QueryResult:
+        """
+        The rows with frame ids in [frames[0], frames[1]), and positions inside the
+        (lower, upper) bbox and the (K, 2) polygon. Leaving any of them out doesn't filter on it.
+        """
+        store = self.store
+        first, last = 0, len(store)
+        if frames is not None:
+            first, last = np.searchsorted(store.frame_ids, frames, side="left")
+        if first >= last:
+            return self._result(np.zeros(0, dtype=np.int64))
+
+        lower = np.full(2, -np.inf)
+        upper = np.full(2, np.inf)
+        if bbox is not None:
+            lower, upper = np.maximum(lower, bbox[0]), np.minimum(upper, bbox[1])
+        if polygon is not None:
+            polygon = np.asarray(polygon, dtype=np.float64)
+            lower = np.maximum(lower, polygon.min(axis=0))
+            upper = np.minimum(upper, polygon.max(axis=0))
+
+        row_lower, row_upper = store.frame_offsets[first], store.frame_offsets[last]
+        if bbox is None and polygon is None:
+            return self._result(np.arange(row_lower, row_upper))
+
+        rows = self._candidates(first, last, lower, upper)
+        positions = self.positions[rows]
+        inside = (
+            (rows >= row_lower)
+            & (rows < row_upper)
+            & np.all((positions >= lower) & (positions <= upper), axis=-1)
+        )
+        rows, positions = rows[inside], positions[inside]
+        if polygon is not None:
+            rows = rows[points_in_polygon(positions, polygon)]
+
+        return self._result(np.sort(rows))
+
+    def _candidates(
+        self, first: int, last: int, lower: np.ndarray, upper: np.ndarray
+    ) -> np.ndarray:
+        """
+        The rows of the blocks holding frames first:last, in the cells overlapping the box.
+        """
+        if np.any(lower > upper):
+            return np.zeros(0, dtype=np.int64)
+
+        cell_lower = np.clip(
+            self._cell(np.maximum(lower, self.origin)), 0, self.shape - 1
+        )
+        cell_upper = np.clip(
+            self._cell(np.minimum(upper, self.origin + self.shape * self.cell_size)),
+            0,
+            self.shape - 1,
+        )
+
+        # The cells of each row of the grid are consecutive keys, so each (block, grid row)
+        # pair is one slice of self.rows.
+        blocks = np.arange(
+            first // self.block_frames, (last - 1) // self.block_frames + 1
+        )
+        grid_rows = np.arange(cell_lower[1], cell_upper[1] + 1)
+        base = (
+            blocks[:, None] * self.num_cells + grid_rows[None, :] * self.shape[0]
+        ).reshape(-1)
+        starts = self.offsets[base + cell_lower[0]]
+        counts = self.offsets[base + cell_upper[0] + 1] - starts
+
+        k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return self.rows[np.repeat(starts, counts) + k]
+
+    def _result(self, rows: np.ndarray) -> QueryResult:
+        return QueryResult(
+            rows=rows,
+            frame_ids=self.store.frame_id[rows],
+            tracks=self.store.track[rows],
+            positions=self.positions[rows],
+        )
+
+    def _cell(self, points: np.ndarray) -> np.ndarray:
+        return np.floor((points - self.origin) / self.cell_size).astype(np.int64)
+
+    def _cell_id(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        return y * self.shape[0] + x
+
+
+def points_in_polygon(points: np.ndarray, polygon: np.ndarray) -> np.ndarray:
+    """
+    Whether each of the (N, 2) points is inside the (K, 2) polygon, by the even-odd rule.
+    """
+    a, b = polygon, np.roll(polygon, -1, axis=0)
+    x, y = points[:, 0:1], points[:, 1:2]
+    crosses = (a[:, 1] > y) != (b[:, 1] > y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_cross = a[:, 0] + (y - a[:, 1]) * (b[:, 0] - a[:, 0]) / (b[:, 1] - a[:, 1])
+    return (crosses & (x < x_cross)).sum(axis=1) % 2 == 1
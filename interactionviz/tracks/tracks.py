@@ -1,13 +1,17 @@
+import bisect
 from enum import Enum
-from csv import DictReader
 from collections import defaultdict
+from itertools import islice
 import os
 from pathlib import Path
-from typing import Dict, List, IO, Optional, Sequence
+from typing import Dict, List, IO, Optional, Sequence, Union
 from dataclasses import dataclass
 
 import numpy as np
 
+# The INTERACTION recordings are sampled at 10Hz.
+FRAME_INTERVAL_MS = 100
+
 
 class AgentKind(Enum):
     CAR = 0
@@ -17,6 +21,9 @@ class AgentKind(Enum):
     PEDESTRIAN = 3
 
 
+_KINDS = {k.value: k for k in AgentKind}
+
+
 @dataclass
 class Agent:
     """
@@ -36,60 +43,389 @@ class Frame:
     agents: List[Agent]
 
 
+@dataclass
+class Trajectory:
+    """
+    The rows of one track, in frame order.
+    """
+
+    track_id: str
+    kind: AgentKind
+    frame_ids: np.ndarray  # (T,)
+    timestamps_ms: np.ndarray  # (T,)
+    positions: np.ndarray  # (T, 2)
+    velocities: np.ndarray  # (T, 2)
+    yaws: np.ndarray  # (T,) NaN for pedestrians and bicycles
+    extents: np.ndarray  # (T, 2) length, width, NaN for pedestrians and bicycles
+
+    def __len__(self) -> int:
+        return len(self.frame_ids)
+
+
 # Tracks are simply ordered lists of frames with increasing frame_ids
 Tracks = Sequence[Frame]
 
+CHUNK_ROWS = 1 << 16
+
+# Maps the numeric csv columns to TrackStore columns.
+_NUMERIC_COLUMNS = {
+    "frame_id": "frame_id",
+    "timestamp_ms": "timestamp_ms",
+    "x": "x",
+    "y": "y",
+    "vx": "vx",
+    "vy": "vy",
+    "psi_rad": "psi",
+    "length": "length",
+    "width": "width",
+}
+
+
+@dataclass(eq=False)
+class TrackStore(Sequence):
+    """
+    TrackStore holds a whole recording as contiguous columns (struct-of-arrays)
+    sorted by frame_id, rather than as one Agent object per row.
+
+    The rows of the i-th frame are frame_offsets[i]:frame_offsets[i + 1] in every column.
+    Track ids are interned, the track column indexes into track_ids.
+
+    Indexing a TrackStore gives a FrameView, which behaves like a Frame,
+    so a TrackStore can be used anywhere Tracks are expected.
+
+    Alongside the frame index, track_rows lists the rows sorted by track then frame,
+    the rows of the i-th track are track_rows[track_offsets[i]:track_offsets[i + 1]].
+    """
+
+    frame_id: np.ndarray  # int32
+    track: np.ndarray  # int32, index into track_ids
+    kind: np.ndarray  # int32, AgentKind values
+    x: np.ndarray  # float32
+    y: np.ndarray  # float32
+    vx: np.ndarray  # float32
+    vy: np.ndarray  # float32
+    psi: np.ndarray  # float32, NaN for pedestrians and bicycles
+    length: np.ndarray  # float32, NaN for pedestrians and bicycles
+    width: np.ndarray  # float32, NaN for pedestrians and bicycles
+    timestamp_ms: np.ndarray  # int64
+    track_ids: List[str]
+    frame_ids: np.ndarray  # int32, sorted unique frame ids
+    frame_offsets: np.ndarray  # int64, len(frame_ids) + 1
+    track_rows: Optional[np.ndarray] = None  # int64, built on first use if None
+    track_offsets: Optional[np.ndarray] = None  # int64, len(track_ids) + 1
+
+    @classmethod
+    def from_columns(
+        cls,
+        frame_id: np.ndarray,
+        track_id: Sequence[str],
+        kind: np.ndarray,
+        x: np.ndarray,
+        y: np.ndarray,
+        vx: np.ndarray,
+        vy: np.ndarray,
+        psi: np.ndarray,
+        length: np.ndarray,
+        width: np.ndarray,
+        timestamp_ms: np.ndarray,
+    ) -> "TrackStore":
+        """
+        Build a store from unordered per-row columns.
+        Rows are stably sorted by frame_id, so agents within a frame keep their input order.
+        """
+        frame_id = np.asarray(frame_id, dtype=np.int32)
+        track_ids, track = np.unique(
+            np.asarray(track_id, dtype=str), return_inverse=True
+        )
+        order = np.argsort(frame_id, kind="stable")
+
+        frame_id = frame_id[order]
+        frame_ids, starts = np.unique(frame_id, return_index=True)
+
+        def column(values, dtype=np.float32):
+            return np.ascontiguousarray(np.asarray(values, dtype=dtype)[order])
+
+        store = cls(
+            frame_id=frame_id,
+            track=column(track.reshape(-1), np.int32),
+            kind=column(kind, np.int32),
+            x=column(x),
+            y=column(y),
+            vx=column(vx),
+            vy=column(vy),
+            psi=column(psi),
+            length=column(length),
+            width=column(width),
+            timestamp_ms=column(timestamp_ms, np.int64),
+            track_ids=track_ids.tolist(),
+            frame_ids=frame_ids.astype(np.int32),
+            frame_offsets=np.append(starts, len(frame_id)).astype(np.int64),
+        )
+        store.build_track_index()
+        return store
+
+    @property
+    def num_rows(self) -> int:
+        return len(self.frame_id)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            getattr(self, name).nbytes
+            for name in self.__dataclass_fields__
+            if isinstance(getattr(self, name), np.ndarray)
+        )
+
+    def frame_rows(self, index: int) -> slice:
+        """
+        The rows of the index-th frame.
+        """
+        return slice(int(self.frame_offsets[index]), int(self.frame_offsets[index + 1]))
+
+    def build_track_index(self) -> None:
+        """
+        Build track_rows and track_offsets, with one stable sort of the track column,
+        so the rows of each track stay in frame order.
+        """
+        self.track_rows = np.argsort(self.track, kind="stable").astype(np.int64)
+        counts = np.bincount(self.track, minlength=len(self.track_ids))
+        self.track_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+    def track_code(self, track_id: str) -> int:
+        """
+        The index of track_id in track_ids, which are sorted.
+        """
+        code = bisect.bisect_left(self.track_ids, track_id)
+        if code == len(self.track_ids) or self.track_ids[code] != track_id:
+            raise KeyError(f"no track {track_id}")
+        return code
+
+    def trajectory(self, track_id: str) -> Trajectory:
+        return self.trajectories([track_id])[0]
+
+    def trajectories(
+        self, track_ids: Optional[Sequence[str]] = None
+    ) -> List[Trajectory]:
+        """
+        The trajectories of the given tracks, or of every track,
+        gathered from the columns with one fancy index per column.
+        """
+        if self.track_rows is None:
+            self.build_track_index()
+
+        if track_ids is None:
+            track_ids = self.track_ids
+        codes = np.array([self.track_code(t) for t in track_ids], dtype=np.int64)
+
+        starts = self.track_offsets[codes]
+        counts = self.track_offsets[codes + 1] - starts
+        ends = np.cumsum(counts)
+        # The positions in track_rows of every row of every requested track.
+        index = np.arange(counts.sum()) + np.repeat(starts - (ends - counts), counts)
+        rows = self.track_rows[index]
+
+        def split(*columns):
+            values = np.stack([c[rows] for c in columns], axis=-1)
+            if len(columns) == 1:
+                values = values[:, 0]
+            return np.split(values, ends[:-1])
+
+        kinds = self.kind[self.track_rows[starts]]
+        return [
+            Trajectory(
+                track_id=track_id,
+                kind=_KINDS[int(kind)],
+                frame_ids=frame_ids,
+                timestamps_ms=timestamps_ms,
+                positions=positions,
+                velocities=velocities,
+                yaws=yaws,
+                extents=extents,
+            )
+            for track_id, kind, frame_ids, timestamps_ms, positions, velocities, yaws, extents in zip(
+                track_ids,
+                kinds,
+                split(self.frame_id),
+                split(self.timestamp_ms),
+                split(self.x, self.y),
+                split(self.vx, self.vy),
+                split(self.psi),
+                split(self.length, self.width),
+            )
+        ]
+
+    def __len__(self) -> int:
+        return len(self.frame_ids)
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"frame index {index} out of range")
+
+        return FrameView(self, index)
+
+
+class FrameView(Frame):
+    """
+    FrameView is a Frame backed by rows of a TrackStore.
+    The array properties read the columns directly,
+    Agent objects are only built when .agents is accessed.
+    """
+
+    def __init__(self, store: TrackStore, index: int):
+        self.store = store
+        self.index = index
+        self.rows = store.frame_rows(index)
+
+    @property
+    def frame_id(self) -> int:
+        return int(self.store.frame_ids[self.index])
+
+    @property
+    def num_agents(self) -> int:
+        return self.rows.stop - self.rows.start
+
+    @property
+    def track_codes(self) -> np.ndarray:
+        return self.store.track[self.rows]
+
+    @property
+    def track_ids(self) -> List[str]:
+        return [self.store.track_ids[t] for t in self.track_codes]
+
+    @property
+    def kinds(self) -> np.ndarray:
+        return self.store.kind[self.rows]
+
+    @property
+    def positions(self) -> np.ndarray:
+        return np.stack([self.store.x[self.rows], self.store.y[self.rows]], axis=-1)
+
+    @property
+    def velocities(self) -> np.ndarray:
+        return np.stack([self.store.vx[self.rows], self.store.vy[self.rows]], axis=-1)
+
+    @property
+    def yaws(self) -> np.ndarray:
+        return self.store.psi[self.rows]
+
+    @property
+    def extents(self) -> np.ndarray:
+        return np.stack(
+            [self.store.length[self.rows], self.store.width[self.rows]], axis=-1
+        )
+
+    @property
+    def agents(self) -> List[Agent]:
+        agents = []
+        for track, kind, position, extent, yaw in zip(
+            self.track_codes, self.kinds, self.positions, self.extents, self.yaws
+        ):
+            has_pose = not (np.isnan(yaw) or np.isnan(extent).any())
+            agents.append(
+                Agent(
+                    track_id=self.store.track_ids[track],
+                    kind=_KINDS[int(kind)],
+                    position=position.astype(np.float64),
+                    extent=extent.astype(np.float64) if has_pose else None,
+                    yaw=float(yaw) if has_pose else None,
+                )
+            )
+        return agents
+
+    def __repr__(self) -> str:
+        return f"FrameView(frame_id={self.frame_id}, num_agents={self.num_agents})"
+
 
-def load_tracks_files(*trackfiles: List[Path]) -> Tracks:
+def load_tracks_files(*trackfiles: List[Path]) -> TrackStore:
     """
     Load and merge several trackfiles together.
     It is assumed that the input files share the same id space for frames.
     """
-    tracks = []
-    all_frame_ids = set()
+    columns = defaultdict(list)
 
     for p in trackfiles:
-        with p.open() as f:
-            tracks_by_frame_id = _load_tracks_csv(f)
-            tracks.append(tracks_by_frame_id)
-            all_frame_ids |= set(tracks_by_frame_id.keys())
+        with Path(p).open() as f:
+            for name, values in _load_tracks_csv(f).items():
+                columns[name].append(values)
 
-    result = []
-    for frame_id in sorted(all_frame_ids):
-        agents = []
+    # Note: from_columns merges the files with a single stable sort on frame_id.
+    return TrackStore.from_columns(
+        **{name: np.concatenate(values) for name, values in columns.items()}
+    )
 
-        for t in tracks:
-            if frame_id in t:
-                agents.extend(t[frame_id])
 
-        result.append(Frame(frame_id=frame_id, agents=agents))
+def _load_tracks_csv(
+    csvfile: IO, chunk_rows: int = CHUNK_ROWS
+) -> Dict[str, np.ndarray]:
+    """
+    Parse a trackfile into columns, chunk_rows lines at a time.
+    """
+    header = _parse_header(csvfile.readline())
+    chunks = defaultdict(list)
 
-    return result
+    while True:
+        lines = list(islice(csvfile, chunk_rows))
+        if len(lines) == 0:
+            break
+
+        for name, values in _parse_rows(header, lines).items():
+            chunks[name].append(values)
 
+    if len(chunks) == 0:
+        return _parse_rows(header, [])
 
-def _load_tracks_csv(csvfile: IO) -> Dict[int, List[Agent]]:
-    agents_by_frame = defaultdict(list)
+    return {name: np.concatenate(values) for name, values in chunks.items()}
 
-    r = DictReader(csvfile)
-    for dct in r:
-        frame_id = int(dct["frame_id"])
 
-        if "length" in dct:
-            extent = np.array([float(dct["length"]), float(dct["width"])])
+def _parse_header(line: str) -> List[str]:
+    return [name.strip() for name in line.strip().split(",")]
+
+
+def _parse_rows(header: List[str], lines: List[str]) -> Dict[str, np.ndarray]:
+    """
+    Parse csv lines in bulk: every field is split out in a single pass, numeric columns are
+    converted to arrays in one go, and agent_type is mapped to AgentKind values through
+    a lookup table of its unique values.
+    """
+    numeric = [c for c in _NUMERIC_COLUMNS if c in header]
+    rows = [line for line in map(str.strip, lines) if line]
+    fields = ",".join(rows).split(",") if rows else []
+    width = len(header)
+    if len(fields) != len(rows) * width:
+        raise ValueError(f"trackfile rows should have {width} fields, like the header")
+
+    def column(name):
+        # An empty file has no header to look columns up in.
+        return fields[header.index(name) :: width] if rows else []
+
+    values = np.array([column(c) for c in numeric], dtype=np.float64).reshape(
+        len(numeric), len(rows)
+    )
+    agent_types, kind_index = np.unique(column("agent_type"), return_inverse=True)
+    kind_table = np.array(
+        [_kind_from_str(t).value for t in agent_types], dtype=np.int32
+    )
+
+    result = dict(
+        track_id=np.array(column("track_id"), dtype=str),
+        kind=kind_table[kind_index.reshape(-1)],
+    )
+    for name, column_name in _NUMERIC_COLUMNS.items():
+        if name in numeric:
+            result[column_name] = values[numeric.index(name)]
         else:
-            extent = None
-
-        agents_by_frame[frame_id].append(
-            Agent(
-                kind=_kind_from_str(dct["agent_type"]),
-                track_id=str(dct["track_id"]),
-                position=np.array([float(dct["x"]), float(dct["y"])]),
-                yaw=float(dct["psi_rad"]) if "psi_rad" in dct else None,
-                extent=extent,
-            )
-        )
+            result[column_name] = np.full(len(rows), np.nan)
+    result["frame_id"] = result["frame_id"].astype(np.int32)
+    if "timestamp_ms" not in numeric:
+        result["timestamp_ms"] = result["frame_id"] * FRAME_INTERVAL_MS
+    result["timestamp_ms"] = result["timestamp_ms"].astype(np.int64)
 
-    return dict(agents_by_frame)
+    return result
 
 
 def _kind_from_str(agent_type: str) -> AgentKind:
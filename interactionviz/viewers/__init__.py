@@ -1,3 +1,5 @@
+from .agents import FrameArrays, agent_footprints, frame_arrays
 from .arcade import ArcadeViewer
+from .playback import PlaybackClock, interpolate
 from .viewport import Viewport, viewport_for_map
 from .web import WebViewer
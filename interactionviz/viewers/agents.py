@@ -0,0 +1,110 @@
+import zlib
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+
+from interactionviz.tracks import Frame, FrameView
+from .viewport import Viewport
+
+AGENT_COLORS = [
+    (161, 201, 244),
+    (255, 180, 130),
+    (141, 229, 161),
+    (255, 159, 155),
+    (208, 187, 255),
+    (222, 187, 155),
+    (250, 176, 228),
+    (207, 207, 207),
+    (255, 254, 163),
+    (185, 242, 240),
+]
+
+# The outline of an agent, in units of its half extent, pointing along +x.
+FOOTPRINT = np.array(
+    [
+        [1, 1],
+        [1.2, 0],
+        [1, 1],
+        [1, -1],
+        [-1, -1],
+        [-1, 1],
+    ]
+)
+
+
+@dataclass
+class FrameArrays:
+    """
+    The agents of a frame as arrays.
+    yaws and extents are NaN for agents that don't have them (pedestrians and bicycles).
+    """
+
+    track_ids: List[str]
+    kinds: np.ndarray  # (N,) AgentKind values
+    positions: np.ndarray  # (N, 2)
+    yaws: np.ndarray  # (N,)
+    extents: np.ndarray  # (N, 2) length, width
+
+    @property
+    def has_footprint(self) -> np.ndarray:
+        return ~(np.isnan(self.yaws) | np.isnan(self.extents).any(axis=-1))
+
+
+def frame_arrays(frame: Frame) -> FrameArrays:
+    """
+    Get the agents of any Frame as arrays,
+    reading the columns directly when the frame is backed by a TrackStore.
+    """
+    if isinstance(frame, FrameView):
+        return FrameArrays(
+            track_ids=frame.track_ids,
+            kinds=frame.kinds,
+            positions=frame.positions,
+            yaws=frame.yaws,
+            extents=frame.extents,
+        )
+
+    agents = frame.agents
+    return FrameArrays(
+        track_ids=[a.track_id for a in agents],
+        kinds=np.array([a.kind.value for a in agents], dtype=np.int32),
+        positions=np.array([a.position for a in agents], dtype=np.float64).reshape(
+            -1, 2
+        ),
+        yaws=np.array(
+            [np.nan if a.yaw is None else a.yaw for a in agents], dtype=np.float64
+        ),
+        extents=np.array(
+            [[np.nan, np.nan] if a.extent is None else a.extent for a in agents],
+            dtype=np.float64,
+        ).reshape(-1, 2),
+    )
+
+
+def agent_footprints(
+    viewport: Viewport,
+    positions: np.ndarray,
+    yaws: np.ndarray,
+    extents: np.ndarray,
+) -> np.ndarray:
+    """
+    Compute the outlines of N agents, projected to the screen, as an (N, 6, 2) array.
+    Agents without a yaw or extent get NaN outlines.
+    """
+    offsets = 0.5 * extents[:, None, :] * FOOTPRINT[None, :, :]
+    cos_theta = np.cos(yaws)[:, None]
+    sin_theta = np.sin(yaws)[:, None]
+
+    outlines = np.empty(offsets.shape)
+    outlines[..., 0] = cos_theta * offsets[..., 0] - sin_theta * offsets[..., 1]
+    outlines[..., 1] = sin_theta * offsets[..., 0] + cos_theta * offsets[..., 1]
+    outlines += positions[:, None, :]
+
+    return viewport.project(outlines)
+
+
+def agent_colors(track_ids: List[str]) -> List[tuple]:
+    # str hashes are salted per process, so hash the bytes to give each track
+    # the same color in every process, e.g. the workers of write_gif.
+    return [AGENT_COLORS[zlib.crc32(t.encode()) % len(AGENT_COLORS)] for t in track_ids]
@@ -1,43 +1,58 @@
 import os
+
 try:
     import arcade
 except:
     pass
-import math
 import numpy as np
 
-from typing import Optional
+from typing import Dict, Optional
+from interactionviz.analysis import Interactions
 from interactionviz.maps import WayKind, Map
-from interactionviz.tracks import AgentKind, Tracks, Frame
+from interactionviz.tracks import Tracks
+from .agents import FrameArrays, agent_colors, frame_arrays
+from .playback import PlaybackClock, interpolate
 from .viewport import Viewport, viewport_for_map
 
-AGENT_COLORS = [
-    (161, 201, 244),
-    (255, 180, 130),
-    (141, 229, 161),
-    (255, 159, 155),
-    (208, 187, 255),
-    (222, 187, 155),
-    (250, 176, 228),
-    (207, 207, 207),
-    (255, 254, 163),
-    (185, 242, 240),
-]
 DEFAULT_WIDTH = 800
 DEFAULT_HEIGHT = 600
-DEFAULT_FRAMERATE = 1 / 10
+DRAW_INTERVAL = 1 / 60
+# Seconds skipped by the left and right arrow keys.
+SEEK_SECONDS = 5
+# Pairs of agents closer than these times to colliding are joined by a line.
+TTC_WARNING = 3.0
+TTC_CRITICAL = 1.5
+GRASS_TILE = 32
+PEDESTRIAN_RADIUS = 5
+
+_BOUNDARY_THICKNESS = {WayKind.ThickLine: 2, WayKind.DashedLine: 2}
 
 
 class ArcadeViewer:
+    """
+    ArcadeViewer plays back tracks over the map in a native window.
+
+    Playback follows the wall clock, skipping frames when drawing falls behind, and
+    interpolating agents between frames when drawing is faster than the recording.
+    Space pauses, the left and right arrows seek, and up and down change the speed.
+    Given the interactions of the tracks, pairs of agents heading for a collision are joined by lines.
+
+    The map is uploaded to the GPU once, as vertex buffers, and agents are sprites whose
+    positions and angles are updated in place each frame. Everything is laid out for a
+    width x height screen, and scaled to fit when the window is resized or made fullscreen (F).
+    """
+
     def __init__(
         self,
         interaction_map: Map,
         tracks: Optional[Tracks] = None,
         width=DEFAULT_WIDTH,
         height=DEFAULT_HEIGHT,
+        interactions: Optional[Interactions] = None,
     ):
         self.map = interaction_map
         self.tracks = tracks
+        self.interactions = interactions
         self.width = width
         self.height = height
         self.viewport = viewport_for_map(
@@ -45,113 +60,223 @@ class ArcadeViewer:
             screen_height=height,
             interaction_map=interaction_map,
         )
-        self._track_index = 0
-        self._cached_background = None
+        self.clock = PlaybackClock(len(tracks) if tracks is not None else 0)
+        self._frames: Dict[int, FrameArrays] = {}
+        self._window = None
+        self._projection = (0, width, 0, height)
+        self._map_shapes = None
+        self._background = None
+        self._agents = None
+        self._sprites: Dict[str, "arcade.Sprite"] = {}
 
     def run(self):
-        arcade.open_window(self.width, self.height, "Interaction Viz")
-
-        def closure(dt):
-            self._draw()
+        self._window = arcade.Window(
+            self.width,
+            self.height,
+            "Interaction Viz",
+            resizable=True,
+            update_rate=DRAW_INTERVAL,
+        )
+        self._map_shapes = _map_shapes(self.viewport, self.map)
+        self._agents = arcade.SpriteList()
+        self._background = _background(*self._projection)
 
-        arcade.schedule(closure, DEFAULT_FRAMERATE)
+        self._window.push_handlers(self)
         arcade.run()
 
-    def _draw(self):
+    def on_draw(self):
+        self._show_frame()
         arcade.start_render()
-        if self._cached_background is None:
-            _render_background(self.width, self.height)
-            _render_map(self.viewport, self.map)
+        arcade.set_viewport(*self._projection)
+        self._background.draw()
+        self._map_shapes.draw()
+        self._agents.draw()
+        self._draw_interactions()
 
-            self._cached_background = arcade.Texture(
-                "bg", arcade.get_image(), hit_box_algorithm="None"
-            )
+    def on_update(self, dt: float):
+        self.clock.advance(dt)
 
-        arcade.draw_lrwh_rectangle_textured(
-            0, 0, self.width, self.height, self._cached_background
+    def on_resize(self, width: int, height: int):
+        # Fit the width x height screen the map was laid out for inside the window.
+        scale = min(width / self.width, height / self.height)
+        half_width, half_height = width / (2 * scale), height / (2 * scale)
+        self._projection = (
+            self.width / 2 - half_width,
+            self.width / 2 + half_width,
+            self.height / 2 - half_height,
+            self.height / 2 + half_height,
         )
+        self._background = _background(*self._projection)
+
+    def on_key_press(self, symbol: int, modifiers: int):
+        seek = SEEK_SECONDS / self.clock.frame_interval
+        if symbol == arcade.key.F:
+            self._window.set_fullscreen(not self._window.fullscreen)
+        elif symbol == arcade.key.SPACE:
+            self.clock.toggle()
+        elif symbol == arcade.key.LEFT:
+            self.clock.seek(self.clock.position - seek)
+        elif symbol == arcade.key.RIGHT:
+            self.clock.seek(self.clock.position + seek)
+        elif symbol == arcade.key.UP:
+            self.clock.speed *= 2
+        elif symbol == arcade.key.DOWN:
+            self.clock.speed /= 2
+
+    def _show_frame(self):
+        if self.clock.num_frames == 0:
+            return
+
+        index = self.clock.index
+        # Keep the two frames being interpolated between, dropping any skipped over.
+        self._frames = {
+            i: f for i, f in self._frames.items() if index <= i <= index + 1
+        }
+        agents = self._frame(index)
+        if self.clock.alpha > 0 and index + 1 < self.clock.num_frames:
+            agents = interpolate(agents, self._frame(index + 1), self.clock.alpha)
+        _update_agents(self._agents, self._sprites, self.viewport, agents)
+
+    def _draw_interactions(self):
+        if self.interactions is None or self.clock.num_frames == 0:
+            return
+
+        pairs = self.interactions.in_frame(self.tracks[self.clock.index].frame_id)
+        ttc = self.interactions.ttc[pairs]
+        # Interactions are computed from a TrackStore, their rows index its columns.
+        first = self.tracks.track[self.interactions.first[pairs]]
+        second = self.tracks.track[self.interactions.second[pairs]]
+
+        for limit, color in [
+            (TTC_WARNING, arcade.color.AMBER),
+            (TTC_CRITICAL, arcade.color.RED),
+        ]:
+            points = []
+            for a, b in zip(first[ttc < limit], second[ttc < limit]):
+                sprite_a = self._sprites.get(self.tracks.track_ids[a])
+                sprite_b = self._sprites.get(self.tracks.track_ids[b])
+                if sprite_a is not None and sprite_b is not None:
+                    points += [sprite_a.position, sprite_b.position]
+            if points:
+                arcade.draw_lines(points, color, 2)
+
+    def _frame(self, index: int) -> FrameArrays:
+        if index not in self._frames:
+            self._frames[index] = frame_arrays(self.tracks[index])
+        return self._frames[index]
 
-        if self.tracks is not None and self._track_index < len(self.tracks):
-            frame = self.tracks[self._track_index]
-            _render_obstacles(self.viewport, frame)
-            self._track_index += 1
-
-
-def _render_map(viewport: Viewport, interaction_map: Map) -> None:
-    to_draw = {
-        WayKind.SolidLine,
-        WayKind.ThickLine,
-        WayKind.DashedLine,
-        WayKind.GuardRail,
-    }
-
-    for osm_id, lane in interaction_map.lanes.items():
-        triangles = lane.to_triangles()
-        for triangle in triangles:
-            triangle = viewport.project(triangle)
-            arcade.draw_polygon_filled(triangle, (140, 140, 140))
-
-    for osm_id, way in interaction_map.ways.items():
-        if way.kind is WayKind.StopLine:
-            ps = viewport.project(
-                [interaction_map.nodes[n.osm_id].position for n in way.nodes]
-            )
-            arcade.draw_line_strip(ps, arcade.color.AMBER, 5)
 
-    for osm_id, lane in interaction_map.lanes.items():
-        left_ps = [n.position for n in lane.left_way.nodes]
-        right_ps = [n.position for n in lane.right_way.nodes]
+def _map_shapes(viewport: Viewport, interaction_map: Map) -> "arcade.ShapeElementList":
+    """
+    Build the lanes, stop lines and lane boundaries of the map into vertex buffers,
+    one shape for each color and thickness.
+    """
+    mesh = interaction_map.mesh
+    layers = [(viewport.project(mesh.lane_triangles()), (140, 140, 140))]
 
-        left_ps = viewport.project(left_ps)
-        right_ps = viewport.project(right_ps)
+    stop_lines = mesh.ways.get(WayKind.StopLine)
+    if stop_lines is not None:
+        segments = viewport.project(stop_lines.segments())
+        layers.append((_thick_segments(segments, 5), arcade.color.AMBER))
 
-        if lane.left_way.kind is not WayKind.Virtual:
-            thickness = 1.5
-            if lane.left_way.kind is WayKind.ThickLine:
-                thickness = 2
-            arcade.draw_line_strip(left_ps, (240, 240, 240), thickness)
+    for kind, polylines in mesh.lane_boundaries.items():
+        if kind is WayKind.Virtual:
+            continue
 
-        if lane.right_way.kind is not WayKind.Virtual:
-            thickness = 1.5
-            if lane.right_way.kind is WayKind.ThickLine:
-                thickness = 2
-            elif lane.right_way.kind is WayKind.DashedLine:
-                thickness = 2
-            arcade.draw_line_strip(right_ps, (240, 240, 240), thickness)
+        thickness = _BOUNDARY_THICKNESS.get(kind, 1.5)
+        segments = viewport.project(polylines.segments())
+        layers.append((_thick_segments(segments, thickness), (240, 240, 240)))
 
+    shapes = arcade.ShapeElementList()
+    for triangles, color in layers:
+        if len(triangles) == 0:
+            continue
+        points = _triangle_strip(triangles)
+        shapes.append(
+            arcade.create_triangles_filled_with_colors(
+                points.tolist(), [color] * len(points)
+            )
+        )
+    return shapes
 
-def _render_background(width: int, height: int) -> None:
+
+def _background(left, right, bottom, top) -> "arcade.SpriteList":
     dir_path = os.path.dirname(os.path.realpath(__file__))
     grass = os.path.join(dir_path, "static", "grass.png")
-    background = arcade.load_texture(grass)
-
-    for i in range(0, width, 32):
-        for j in range(0, height, 32):
-            arcade.draw_lrwh_rectangle_textured(i, j, 32, 32, background)
-
-
-def _render_obstacles(viewport: Viewport, frame: Frame) -> None:
-    for agent in frame.agents:
-        # color = AGENT_COLORS[agent.track_id % len(AGENT_COLORS)]
-        color = AGENT_COLORS[hash(agent.track_id) % len(AGENT_COLORS)]
-        position = agent.position
-
-        if agent.extent is not None and agent.yaw is not None:
-            half_extent = 0.5 * agent.extent
-            sin_theta = math.sin(agent.yaw)
-            cos_theta = math.cos(agent.yaw)
-            rot = np.array([[cos_theta, -sin_theta], [sin_theta, cos_theta]])
-            offsets = [
-                half_extent * np.array([1, 1]),
-                half_extent * np.array([1.2, 0]),
-                half_extent * np.array([1, 1]),
-                half_extent * np.array([1, -1]),
-                half_extent * np.array([-1, -1]),
-                half_extent * np.array([-1, 1]),
-            ]
-            ps = [position + rot.dot(o) for o in offsets]
-            ps = viewport.project(ps)
-            arcade.draw_polygon_filled(ps, color)
-        else:
-            position = viewport.project([position])[0]
-            arcade.draw_circle_filled(*position, 5, color=color)
+    scale = GRASS_TILE / arcade.load_texture(grass).width
+
+    # Tile the part of the screen that's in view, which grows as the window does.
+    tiles = arcade.SpriteList(is_static=True)
+    x0 = GRASS_TILE * np.floor(left / GRASS_TILE)
+    y0 = GRASS_TILE * np.floor(bottom / GRASS_TILE)
+    for x in np.arange(x0, right, GRASS_TILE):
+        for y in np.arange(y0, top, GRASS_TILE):
+            tiles.append(
+                arcade.Sprite(
+                    grass,
+                    scale=scale,
+                    center_x=x + GRASS_TILE / 2,
+                    center_y=y + GRASS_TILE / 2,
+                )
+            )
+    return tiles
+
+
+def _update_agents(
+    sprites: "arcade.SpriteList",
+    by_track: Dict[str, "arcade.Sprite"],
+    viewport: Viewport,
+    agents: FrameArrays,
+) -> None:
+    """
+    Move the sprites of the agents, adding sprites for agents that appeared,
+    and removing those of agents that left.
+    """
+    positions = viewport.project(agents.positions)
+    angles = np.degrees(agents.yaws)
+    # The viewport scales uniformly, without rotating.
+    sizes = np.maximum(np.round(agents.extents * viewport.transform[0, 0]), 1)
+    has_footprint = agents.has_footprint
+
+    current = set(agents.track_ids)
+    for track_id in [t for t in by_track if t not in current]:
+        by_track.pop(track_id).remove_from_sprite_lists()
+
+    for i, (track_id, color) in enumerate(
+        zip(agents.track_ids, agent_colors(agents.track_ids))
+    ):
+        sprite = by_track.get(track_id)
+        if sprite is None:
+            if has_footprint[i]:
+                length, width = sizes[i]
+                sprite = arcade.SpriteSolidColor(int(length), int(width), color)
+            else:
+                sprite = arcade.SpriteCircle(PEDESTRIAN_RADIUS, color)
+            by_track[track_id] = sprite
+            sprites.append(sprite)
+
+        sprite.center_x, sprite.center_y = positions[i]
+        if has_footprint[i]:
+            sprite.angle = angles[i]
+
+
+def _thick_segments(segments: np.ndarray, width: float) -> np.ndarray:
+    """
+    The (2S, 3, 2) triangles covering the (S, 2, 2) segments, width thick.
+    """
+    a, b = segments[:, 0], segments[:, 1]
+    direction = b - a
+    length = np.linalg.norm(direction, axis=-1, keepdims=True)
+    normal = np.stack([-direction[:, 1], direction[:, 0]], axis=-1)
+    normal *= (width / 2) / np.maximum(length, 1e-12)
+
+    corners = np.stack([a + normal, a - normal, b - normal, b + normal], axis=1)
+    return np.concatenate([corners[:, [0, 1, 2]], corners[:, [0, 2, 3]]])
+
+
+def _triangle_strip(triangles: np.ndarray) -> np.ndarray:
+    """
+    Join separate (T, 3, 2) triangles into one triangle strip, repeating the first and last
+    vertex of each so the triangles joining them have no area.
+    """
+    return triangles[:, [0, 0, 1, 2, 2]].reshape(-1, 2)
@@ -0,0 +1,49 @@
+from collections import OrderedDict
+from typing import Callable, Hashable, Union
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+Message = Union[str, bytes]
+
+
+class FrameCache:
+    """
+    FrameCache is an LRU of encoded frame messages shared by every client of a server,
+    so each frame is serialized once however many clients are watching it.
+
+    Keys are e.g. (session, frame index, encoding), entries are evicted once their
+    total size exceeds max_bytes. A max_bytes of 0 disables the cache.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, build: Callable[[], Message]) -> Message:
+        """
+        Get the message for key, calling build to encode it if it isn't cached.
+        """
+        message = self._entries.get(key)
+        if message is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return message
+
+        self.misses += 1
+        message = build()
+        if len(message) > self.max_bytes:
+            return message
+
+        self._entries[key] = message
+        self.nbytes += len(message)
+        while self.nbytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= len(evicted)
+
+        return message
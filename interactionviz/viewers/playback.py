@@ -0,0 +1,106 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from interactionviz.tracks import FRAME_INTERVAL_MS
+from .agents import FrameArrays
+
+
+@dataclass
+class PlaybackClock:
+    """
+    PlaybackClock follows a position in a recording of num_frames frames, in seconds,
+    advanced by the wall-clock time between redraws and scaled by speed.
+
+    Frames that fall between two redraws are skipped, and the fraction of the way to the
+    next frame is kept, so poses can be interpolated when redraws are faster than frames.
+    Playback pauses on the last frame.
+    """
+
+    num_frames: int
+    frame_interval: float = FRAME_INTERVAL_MS / 1000
+    speed: float = 1.0
+    playing: bool = True
+    time: float = 0.0
+
+    @property
+    def duration(self) -> float:
+        return max(self.num_frames - 1, 0) * self.frame_interval
+
+    @property
+    def position(self) -> float:
+        """
+        The fractional index of the current frame.
+        """
+        return self.time / self.frame_interval
+
+    @property
+    def index(self) -> int:
+        return min(int(self.position), max(self.num_frames - 1, 0))
+
+    @property
+    def alpha(self) -> float:
+        """
+        How far playback is from the current frame towards the next one, in [0, 1).
+        """
+        return min(max(self.position - self.index, 0.0), 1.0)
+
+    @property
+    def ended(self) -> bool:
+        return self.time >= self.duration
+
+    def advance(self, dt: float) -> None:
+        if not self.playing:
+            return
+        self.time = min(self.time + dt * self.speed, self.duration)
+        if self.ended:
+            self.playing = False
+
+    def seek(self, index: float) -> None:
+        self.time = min(max(index * self.frame_interval, 0.0), self.duration)
+
+    def play(self) -> None:
+        if self.ended:
+            self.time = 0.0
+        self.playing = True
+
+    def pause(self) -> None:
+        self.playing = False
+
+    def toggle(self) -> None:
+        if self.playing:
+            self.pause()
+        else:
+            self.play()
+
+
+def interpolate(a: FrameArrays, b: FrameArrays, alpha: float) -> FrameArrays:
+    """
+    The agents of frame a, moved alpha of the way to their poses in frame b.
+    Agents that aren't in frame b keep their poses from frame a.
+    """
+    if alpha <= 0:
+        return a
+
+    _, in_a, in_b = np.intersect1d(
+        np.array(a.track_ids, dtype=str),
+        np.array(b.track_ids, dtype=str),
+        assume_unique=True,
+        return_indices=True,
+    )
+
+    positions = a.positions.copy()
+    positions[in_a] += alpha * (b.positions[in_b] - a.positions[in_a])
+
+    # Turn the shorter way round, so yaws wrapping past +-pi don't spin.
+    yaws = a.yaws.copy()
+    turn = np.angle(np.exp(1j * (b.yaws[in_b] - a.yaws[in_a])))
+    yaws[in_a] += alpha * turn
+
+    return FrameArrays(
+        track_ids=a.track_ids,
+        kinds=a.kinds,
+        positions=positions,
+        yaws=yaws,
+        extents=a.extents,
+    )
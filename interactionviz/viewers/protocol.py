@@ -0,0 +1,248 @@
+"""
+The binary frame protocol used by the WebViewer.
+
+A client opts in by sending {"action": "hello", "encodings": ["binary", "json"]},
+the server answers with the encoding it picked. Frames are then sent as binary messages,
+all little-endian and 4-byte aligned,
+
+    header:  u8 version, u8 frame type, u16 reserved,
+             u32 frame index, u32 max index, u32 num removed, u32 num changed
+    removed: u32[num removed] track codes
+    changed: u32[num changed] track codes
+    state:   f32[num changed][3] x, y, yaw (yaw is NaN for pedestrians and bicycles)
+
+A KEYFRAME holds every agent in the frame, the client drops all agents it knows about first.
+A DELTA is relative to the previous frame of the recording: it lists the agents that left,
+and the agents that are new or have moved.
+
+Agents are referred to by track codes, the track ids, kinds, colors and extents
+for each code are sent once, in a JSON "tracks" message, before the first frame using them.
+"""
+
+import struct
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from interactionviz.tracks import AgentKind, FrameView, Tracks
+from .agents import agent_colors
+from .framecache import FrameCache
+from .viewport import Viewport
+
+VERSION = 1
+KEYFRAME = 0
+DELTA = 1
+
+BINARY = "binary"
+JSON = "json"
+
+HEADER = struct.Struct("<BBHIIII")
+
+
+def supports_binary(tracks: Optional[Tracks]) -> bool:
+    """
+    The binary encoding needs frames with track codes, i.e. frames backed by a TrackStore.
+    """
+    return tracks is not None and len(tracks) > 0 and isinstance(tracks[0], FrameView)
+
+
+def negotiate(tracks: Optional[Tracks], encodings: List[str]) -> str:
+    if BINARY in encodings and supports_binary(tracks):
+        return BINARY
+    return JSON
+
+
+@dataclass
+class FrameState:
+    """
+    The track codes of the agents in a frame, and their projected state.
+    """
+
+    codes: np.ndarray  # (N,) uint32, sorted
+    state: np.ndarray  # (N, 3) float32, x, y, yaw
+
+    @classmethod
+    def from_frame(cls, viewport: Viewport, frame: FrameView) -> "FrameState":
+        codes = frame.track_codes.astype(np.uint32)
+        order = np.argsort(codes)
+        state = np.empty((len(codes), 3), dtype=np.float32)
+        state[:, :2] = viewport.project(frame.positions)
+        state[:, 2] = frame.yaws
+        return cls(codes=codes[order], state=state[order])
+
+
+def encode_keyframe(index: int, max_index: int, current: FrameState) -> bytes:
+    return b"".join(
+        [
+            HEADER.pack(VERSION, KEYFRAME, 0, index, max_index, 0, len(current.codes)),
+            current.codes.tobytes(),
+            current.state.tobytes(),
+        ]
+    )
+
+
+def encode_delta(
+    index: int, max_index: int, previous: FrameState, current: FrameState
+) -> bytes:
+    removed = np.setdiff1d(previous.codes, current.codes, assume_unique=True)
+
+    moved = np.ones(len(current.codes), bool)
+    if len(previous.codes) > 0:
+        # Both code arrays are sorted, find each current agent in the previous frame.
+        at = np.searchsorted(previous.codes, current.codes)
+        at = np.minimum(at, len(previous.codes) - 1)
+        existed = previous.codes[at] == current.codes
+        before = previous.state[at]
+        # NaN yaws compare unequal, treat two NaNs as unchanged.
+        same = (before == current.state) | (np.isnan(before) & np.isnan(current.state))
+        moved = ~(existed & same.all(axis=-1))
+
+    return b"".join(
+        [
+            HEADER.pack(
+                VERSION, DELTA, 0, index, max_index, len(removed), int(moved.sum())
+            ),
+            removed.astype(np.uint32).tobytes(),
+            current.codes[moved].tobytes(),
+            current.state[moved].tobytes(),
+        ]
+    )
+
+
+def decode(message: bytes) -> Dict:
+    """
+    Decode a binary frame message, the inverse of encode_keyframe and encode_delta.
+    """
+    version, frame_type, _, index, max_index, num_removed, num_changed = (
+        HEADER.unpack_from(message)
+    )
+    if version != VERSION:
+        raise ValueError(f"unsupported frame version {version}")
+
+    offset = HEADER.size
+    removed = np.frombuffer(message, np.uint32, num_removed, offset)
+    offset += removed.nbytes
+    codes = np.frombuffer(message, np.uint32, num_changed, offset)
+    offset += codes.nbytes
+    state = np.frombuffer(message, np.float32, 3 * num_changed, offset)
+
+    return dict(
+        frame_type=frame_type,
+        index=index,
+        max_index=max_index,
+        removed=removed,
+        codes=codes,
+        state=state.reshape(-1, 3),
+    )
+
+
+def track_entries(frame: FrameView, codes: np.ndarray) -> Dict:
+    """
+    The payload of a "tracks" message, describing the given codes of the frame.
+    """
+    frame_codes = frame.track_codes
+    rows = [int(np.flatnonzero(frame_codes == c)[0]) for c in codes]
+    track_ids = [frame.store.track_ids[c] for c in codes]
+    extents = frame.extents[rows]
+    kinds = frame.kinds[rows]
+
+    return dict(
+        codes=[int(c) for c in codes],
+        track_ids=track_ids,
+        kinds=[AgentKind(int(k)).name for k in kinds],
+        colors=agent_colors(track_ids),
+        extents=[None if np.isnan(e).any() else e.tolist() for e in extents],
+    )
+
+
+class FrameEncoder:
+    """
+    FrameEncoder encodes the frames of a recording for one client,
+    keeping track of which track codes and frames the client has already seen.
+
+    Deltas are always relative to the previous frame of the recording, so encoded frames
+    don't depend on the client, and can be shared between clients through a FrameCache.
+    """
+
+    def __init__(
+        self,
+        viewport: Viewport,
+        tracks: Tracks,
+        cache: Optional[FrameCache] = None,
+        session: str = "",
+    ):
+        self.viewport = viewport
+        self.tracks = tracks
+        self.cache = cache
+        self.session = session
+        self._states: Dict[int, FrameState] = {}
+        self.reset()
+
+    def reset(self):
+        """
+        Forget what the client has seen, e.g. after frames were dropped,
+        so the next frame is a keyframe and its tracks are sent again.
+        """
+        self.last_index: Optional[int] = None
+        self._known_codes = np.zeros(0, dtype=bool)
+
+    def new_tracks(self, frame: FrameView) -> Optional[Dict]:
+        """
+        The "tracks" payload for agents in the frame the client hasn't seen yet, if any.
+        """
+        codes = frame.track_codes
+        if len(codes) == 0:
+            return None
+
+        if codes.max() >= len(self._known_codes):
+            known = np.zeros(codes.max() + 1, dtype=bool)
+            known[: len(self._known_codes)] = self._known_codes
+            self._known_codes = known
+
+        new = np.unique(codes[~self._known_codes[codes]])
+        if len(new) == 0:
+            return None
+
+        self._known_codes[new] = True
+        return track_entries(frame, new)
+
+    def encode(self, index: int) -> bytes:
+        """
+        Encode the index-th frame, as a delta if the client has the previous frame.
+        """
+        if self.last_index is not None and self.last_index == index - 1:
+            frame_type = DELTA
+        else:
+            frame_type = KEYFRAME
+
+        self.last_index = index
+        return self.encode_as(index, frame_type)
+
+    def encode_as(self, index: int, frame_type: int) -> bytes:
+        """
+        Encode the index-th frame as a KEYFRAME, or a DELTA from the frame before it.
+        """
+        if self.cache is None:
+            return self._encode(index, frame_type)
+        return self.cache.get(
+            (self.session, index, BINARY, frame_type),
+            lambda: self._encode(index, frame_type),
+        )
+
+    def _encode(self, index: int, frame_type: int) -> bytes:
+        max_index = len(self.tracks)
+        if frame_type == KEYFRAME:
+            return encode_keyframe(index, max_index, self._state(index))
+        return encode_delta(
+            index, max_index, self._state(index - 1), self._state(index)
+        )
+
+    def _state(self, index: int) -> FrameState:
+        state = self._states.get(index)
+        if state is None:
+            state = FrameState.from_frame(self.viewport, self.tracks[index])
+            # Deltas only ever need the current and previous frames.
+            self._states = {i: s for i, s in self._states.items() if i == index - 1}
+            self._states[index] = state
+        return state
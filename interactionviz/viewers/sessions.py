@@ -0,0 +1,60 @@
+import asyncio
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, Hashable, TypeVar
+
+DEFAULT_MAX_BYTES = 4 * 1024 * 1024 * 1024
+
+T = TypeVar("T")
+
+
+class AsyncLRU(Generic[T]):
+    """
+    AsyncLRU holds values that are slow to load, e.g. the maps and tracks of recorded sessions,
+    within a memory budget given by the values' nbytes.
+
+    Values are loaded in a thread, so the event loop keeps serving other clients, and
+    concurrent requests for the same key share a single load. Once the budget is exceeded,
+    the least recently used values are dropped (clients holding them keep them alive).
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.num_loads = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._loading: Dict[Hashable, asyncio.Future] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    async def get(self, key: Hashable, load: Callable[[], T]) -> T:
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        task = self._loading.get(key)
+        if task is None:
+            task = self._loading[key] = asyncio.ensure_future(self._load(key, load))
+
+        # Shielded, so one client going away doesn't cancel the load for the others.
+        return await asyncio.shield(task)
+
+    async def _load(self, key: Hashable, load: Callable[[], T]) -> T:
+        try:
+            value = await asyncio.get_event_loop().run_in_executor(None, load)
+        finally:
+            del self._loading[key]
+
+        self.num_loads += 1
+        self._entries[key] = value
+        self.nbytes += _nbytes(value)
+
+        while self.nbytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= _nbytes(evicted)
+
+        return value
+
+
+def _nbytes(value) -> int:
+    return getattr(value, "nbytes", 0)
@@ -1,23 +1,98 @@
+async function loadMap(url) {
+    const response = await fetch(url);
+    const map_data = await response.json();
+    renderMap(map_data.payload);
+}
+
+function openSession(dataset, session) {
+    socket.send(JSON.stringify({ action: "open_session", dataset: dataset, session: session }));
+}
+
+// Drop everything shown for the previous session.
+function resetSession() {
+    while (map_group.children.length > 0) {
+        map_group.remove(map_group.children[0]);
+    }
+    for (k in visible_obstacles) {
+        scene.remove(visible_obstacles[k]);
+    }
+    visible_obstacles = {};
+    tracks_by_code = {};
+    agent_states.clear();
+    current_index = 0;
+    paused = true;
+    updatePlayBotton();
+}
+
+function renderSessions(payload) {
+    var list = document.getElementById("sessions");
+    list.innerHTML = "";
+    for (const dataset of payload.datasets) {
+        var title = document.createElement("div");
+        title.className = "dataset";
+        title.textContent = dataset.name;
+        list.appendChild(title);
+
+        for (const session of dataset.sessions) {
+            var link = document.createElement("a");
+            link.href = "javascript:void(0)";
+            link.textContent = "session " + session;
+            link.onclick = function() { openSession(dataset.name, session); };
+            list.appendChild(link);
+        }
+    }
+}
+
 function initSocket() {
+    socket.binaryType = "arraybuffer";
+
     socket.onopen = function(e) {
         console.log("successfully connected to websocket")
+        socket.send(JSON.stringify({ action: "hello", encodings: ["binary", "json"] }));
     };
 
     socket.onmessage = function(event) {
+        if (event.data instanceof ArrayBuffer) {
+            showFrame(decodeFrame(event.data));
+            return
+        }
+
         const response = JSON.parse(event.data);
+        if (response.action == "hello") {
+            console.log("using encoding", response.encoding);
+            socket.send(JSON.stringify({ action: "list_sessions" }));
+        }
+
+        if (response.action == "sessions") {
+            renderSessions(response.payload);
+        }
+
+        if (response.action == "session") {
+            resetSession();
+            document.getElementById("playbar").max = response.payload.max_index;
+            loadMap(response.payload.map_url);
+            seek(0);
+        }
+
+        if (response.action == "error") {
+            console.log("error from server:", response.message);
+        }
+
+        if (response.action == "tracks") {
+            addTracks(response.payload);
+        }
+
         if (response.action == "map_data") {
             renderMap(response.payload);
         }
 
         if (response.action == "frame") {
-            if (paused) {
-                return
-            }
+            showFrame(response.payload);
+        }
 
-            document.getElementById("playbar").value = response.payload.current_index;
-            document.getElementById("playbar").min = 0;
-            document.getElementById("playbar").max = response.payload.max_index;
-            renderFrame(response.payload);
+        if (response.action == "ended") {
+            paused = true;
+            updatePlayBotton();
         }
     };
 
@@ -32,12 +107,99 @@ function initSocket() {
     };
 }
 
-async function requestFrame(i) {
-    const request = {
-        action: "request_frame",
-        index: i,
+// Binary frames, see interactionviz/viewers/protocol.py for the layout.
+const KEYFRAME = 0;
+const HEADER_SIZE = 20;
+
+function addTracks(payload) {
+    for (let i = 0; i < payload.codes.length; i++) {
+        tracks_by_code[payload.codes[i]] = {
+            track_id: payload.track_ids[i],
+            kind: payload.kinds[i],
+            color: payload.colors[i],
+            extent: payload.extents[i],
+        };
+    }
+}
+
+function decodeFrame(buffer) {
+    const header = new DataView(buffer, 0, HEADER_SIZE);
+    const frame_type = header.getUint8(1);
+    const index = header.getUint32(4, true);
+    const max_index = header.getUint32(8, true);
+    const num_removed = header.getUint32(12, true);
+    const num_changed = header.getUint32(16, true);
+
+    const removed = new Uint32Array(buffer, HEADER_SIZE, num_removed);
+    const codes = new Uint32Array(buffer, HEADER_SIZE + 4 * num_removed, num_changed);
+    const state = new Float32Array(buffer, HEADER_SIZE + 4 * (num_removed + num_changed), 3 * num_changed);
+
+    if (frame_type == KEYFRAME) {
+        agent_states.clear();
+    }
+    for (const code of removed) {
+        agent_states.delete(code);
+    }
+    for (let i = 0; i < num_changed; i++) {
+        agent_states.set(codes[i], [state[3 * i], state[3 * i + 1], state[3 * i + 2]]);
+    }
+
+    var agents = [];
+    for (const [code, s] of agent_states) {
+        const track = tracks_by_code[code];
+        if (track === undefined) {
+            console.log("frame", index, "has an unknown track code", code);
+            continue;
+        }
+        var agent = {
+            track_id: track.track_id,
+            kind: track.kind,
+            color: track.color,
+            position: [s[0], s[1]],
+        };
+        if (track.extent !== null) {
+            agent.extent = track.extent;
+            agent.yaw = s[2];
+        }
+        agents.push(agent);
+    }
+
+    return { current_index: index, max_index: max_index, agents: agents };
+}
+
+function showFrame(payload) {
+    current_index = payload.current_index;
+    if (before_change_slider === null) {
+        document.getElementById("playbar").value = payload.current_index;
+    }
+    document.getElementById("playbar").min = 0;
+    document.getElementById("playbar").max = payload.max_index;
+    renderFrame(payload);
+}
+
+// The server pushes frames while playing, see interactionviz/viewers/streaming.py.
+const PLAYBACK_RATE = 10;
+
+function play(from) {
+    socket.send(JSON.stringify({ action: "play", from: from, rate: PLAYBACK_RATE }));
+}
+
+function pause() {
+    socket.send(JSON.stringify({ action: "pause" }));
+}
+
+function seek(i) {
+    socket.send(JSON.stringify({ action: "seek", index: i }));
+}
+
+function togglePlaying() {
+    paused = !paused;
+    if (paused) {
+        pause();
+    } else {
+        play(current_index + 1);
     }
-    socket.send(JSON.stringify(request));
+    updatePlayBotton();
 }
 
 function drawTriangles2D(triangles_2D, color, height) {
@@ -68,7 +230,7 @@ function drawTriangles2D(triangles_2D, color, height) {
     }
 
     geom.computeFaceNormals();
-    scene.add(new THREE.Mesh(geom, roadMaterial));
+    map_group.add(new THREE.Mesh(geom, roadMaterial));
 }
 
 function renderGround() {
@@ -247,7 +409,7 @@ function renderPolyLine(points, thickness, color) {
     }
 
     geom.computeFaceNormals();
-    scene.add(new THREE.Mesh(geom, material));
+    map_group.add(new THREE.Mesh(geom, material));
 }
 
 function playbarChanged() {
@@ -257,13 +419,6 @@ function playbarChanged() {
 function animate() {
     requestAnimationFrame(animate);
     renderer.render(scene, camera);
-    if (animation_index % 6 == 0) {
-        if (!paused) {
-            requestFrame(current_index);
-            current_index += 1;
-        }
-    }
-    animation_index += 1;
 }
 
 console.log("connecting to", window.location.host);
@@ -275,6 +430,8 @@ var camera = new THREE.PerspectiveCamera(75, window.innerWidth / window.innerHei
 var controls = new THREE.OrbitControls(camera, renderer.domElement);
 
 scene.add(camera);
+var map_group = new THREE.Group();
+scene.add(map_group);
 scene.background = new THREE.Color(0x9ed8ff);
 container.appendChild(renderer.domElement);
 
@@ -284,8 +441,9 @@ camera.position.x = 0;
 camera.lookAt(new THREE.Vector3(0, 0, 0));
 
 var visible_obstacles = {};
+var tracks_by_code = {};
+var agent_states = new Map();
 var current_index = 0;
-var animation_index = 0;
 var paused = true;
 var before_change_slider = null;
 
@@ -320,28 +478,32 @@ var playbutton = document.getElementById("playbutton");
 document.body.onkeyup = function(e) {
     // spacebar
     if (e.keyCode == 32) {
-        paused = !paused;
-        updatePlayBotton();
+        togglePlaying();
     }
 }
 
-playbutton.addEventListener("click", function() {
-    paused = !paused;
-    updatePlayBotton();
-}, false);
+playbutton.addEventListener("click", togglePlaying, false);
 
 playbar.addEventListener("input", function() {
     if (before_change_slider === null) {
         before_change_slider = paused;
+        if (!paused) {
+            pause();
+        }
     }
     paused = true;
+    seek(+playbar.value);
 }, false);
 
 playbar.addEventListener("change", function() {
-    current_index = +playbar.value;
     paused = before_change_slider;
-    updatePlayBotton();
     before_change_slider = null;
+    if (paused) {
+        seek(+playbar.value);
+    } else {
+        play(+playbar.value);
+    }
+    updatePlayBotton();
 }, false);
 
 updatePlayBotton();
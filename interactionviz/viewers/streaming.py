@@ -0,0 +1,142 @@
+"""
+Server-push playback for the WebViewer.
+
+Rather than the client requesting every frame, a Player serializes frames ahead of the playhead
+into a bounded queue, and sends them to the client at the playback rate.
+When the client falls behind (sends block, or serializing is slow), frames that are
+already late are coalesced: only the newest due frame is sent, as a keyframe.
+"""
+
+import asyncio
+import json
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, List, Optional
+
+from interactionviz.tracks import FRAME_INTERVAL_MS
+from .framecache import Message
+
+DEFAULT_RATE = 1000 / FRAME_INTERVAL_MS  # frames per second
+QUEUE_FRAMES = 32
+
+
+@dataclass
+class QueuedFrame:
+    """
+    A frame serialized ahead of the playhead.
+    """
+
+    index: int
+    frame: Message
+    # Messages the client needs before the frame (e.g. new tracks), sent even if the frame is dropped.
+    preamble: List[Message] = field(default_factory=list)
+
+
+class Player:
+    """
+    Player pushes frames to one client, using a producer task that serializes frames
+    into a bounded queue, and a consumer task that paces and sends them.
+
+    serializer must provide serialize(index) -> QueuedFrame, keyframe(QueuedFrame) -> Message,
+    and reset(), which forgets what the client has been sent.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[Message], Awaitable[None]],
+        serializer,
+        num_frames: int,
+        queue_frames: int = QUEUE_FRAMES,
+    ):
+        self.send = send
+        self.serializer = serializer
+        self.num_frames = num_frames
+        self.queue_frames = queue_frames
+        self.rate = DEFAULT_RATE
+        self.index = 0  # The next frame to play.
+        self.num_dropped = 0
+        self._tasks: List[asyncio.Task] = []
+        # Frames serialized by the producer that haven't been sent yet.
+        self._unsent = 0
+
+    @property
+    def playing(self) -> bool:
+        return any(not t.done() for t in self._tasks)
+
+    async def play(self, start: Optional[int] = None, rate: Optional[float] = None):
+        await self.pause()
+        if start is not None:
+            self.index = start
+        if rate:
+            self.rate = rate
+        if not 0 <= self.index < self.num_frames:
+            self.index = 0
+
+        queue = asyncio.Queue(maxsize=self.queue_frames)
+        self._tasks = [
+            asyncio.ensure_future(self._produce(queue, self.index)),
+            asyncio.ensure_future(self._consume(queue, self.index)),
+        ]
+
+    async def pause(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._unsent:
+            # Queued frames are gone, so the client may lack the frames deltas would refer to.
+            self.serializer.reset()
+            self._unsent = 0
+
+    async def seek(self, index: int):
+        """
+        Move the playhead, sending the frame at index straight away if paused.
+        """
+        if self.playing:
+            await self.play(start=index)
+            return
+
+        await self.pause()
+        if self.num_frames == 0:
+            return
+        index = min(max(index, 0), self.num_frames - 1)
+        await self._send_frame(self.serializer.serialize(index), keyframe=False)
+
+    async def _produce(self, queue: asyncio.Queue, start: int):
+        for index in range(start, self.num_frames):
+            frame = self.serializer.serialize(index)
+            self._unsent += 1
+            await queue.put(frame)
+
+    async def _consume(self, queue: asyncio.Queue, start: int):
+        loop = asyncio.get_event_loop()
+        started = loop.time()
+        interval = 1.0 / self.rate
+
+        while self.index < self.num_frames:
+            frame = await queue.get()
+            preamble = list(frame.preamble)
+            dropped = False
+            coalesced = 1
+
+            # Coalesce frames that are already due, keeping only the newest.
+            deadline = started + (frame.index - start) * interval
+            while not queue.empty() and loop.time() >= deadline + interval:
+                frame = queue.get_nowait()
+                preamble.extend(frame.preamble)
+                deadline += interval
+                self.num_dropped += 1
+                dropped = True
+                coalesced += 1
+
+            await asyncio.sleep(max(0.0, deadline - loop.time()))
+            frame.preamble = preamble
+            await self._send_frame(frame, keyframe=dropped)
+            self._unsent -= coalesced
+
+        await self.send(json.dumps(dict(action="ended", index=self.num_frames - 1)))
+
+    async def _send_frame(self, frame: QueuedFrame, keyframe: bool):
+        for message in frame.preamble:
+            await self.send(message)
+        await self.send(self.serializer.keyframe(frame) if keyframe else frame.frame)
+        self.index = frame.index + 1
@@ -1,47 +1,95 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import numpy as np
-from typing import List, Optional
+from typing import List, Optional, Union
 
 from interactionviz.maps import Map
 
 
 @dataclass
 class Viewport:
+    """
+    Viewport maps world coordinates to screen coordinates.
+    The map is scaled uniformly to fit the screen and centered.
+    If the screen size is None, points are only centered.
+
+    Note: the affine transform is computed when the viewport is created,
+    make a new viewport rather than changing the ranges of an existing one.
+    """
+
     screen_width: Optional[float]
     screen_height: Optional[float]
     viewport_x_range: np.ndarray
     viewport_y_range: np.ndarray
+    transform: np.ndarray = field(init=False, repr=False)  # 2x3 affine
 
-    def project(self, points: List[np.ndarray]) -> List[np.ndarray]:
-        result = []
-
+    def __post_init__(self):
         width = self.viewport_x_range[1] - self.viewport_x_range[0]
         height = self.viewport_y_range[1] - self.viewport_y_range[0]
+        center = np.array(
+            [
+                self.viewport_x_range[0] + width / 2,
+                self.viewport_y_range[0] + height / 2,
+            ]
+        )
 
         if self.screen_width is None or self.screen_height is None:
-            offset = np.array(
-                [
-                    self.viewport_x_range[0] + width / 2,
-                    self.viewport_y_range[0] + height / 2,
-                ]
-            )
-            return [p - offset for p in points]
-
-        for p in points:
-            # v moves to a unit box centered at 0.
-            v = p - np.array(
-                [
-                    self.viewport_x_range[0] + width / 2,
-                    self.viewport_y_range[0] + height / 2,
-                ]
+            scale = 1.0
+            screen_center = np.zeros(2)
+        else:
+            # Move to a unit box centered at 0, then to the screen.
+            scale = min(self.screen_height, self.screen_width) / max(width, height)
+            screen_center = np.array([self.screen_width / 2, self.screen_height / 2])
+
+        self.transform = np.zeros((2, 3))
+        self.transform[:, :2] = scale * np.eye(2)
+        self.transform[:, 2] = screen_center - scale * center
+
+    def project(
+        self, points: Union[np.ndarray, List[np.ndarray]]
+    ) -> Union[np.ndarray, List[np.ndarray]]:
+        """
+        Project world points to the screen.
+        points may be an array of shape (..., 2), in which case an array of the same shape is returned,
+        or a list of points, in which case a list of points is returned.
+        """
+        return _apply(self.transform, points)
+
+    def unproject(
+        self, points: Union[np.ndarray, List[np.ndarray]]
+    ) -> Union[np.ndarray, List[np.ndarray]]:
+        """
+        Map screen points back to world coordinates, the inverse of project.
+        """
+        linear = np.linalg.inv(self.transform[:, :2])
+        inverse = np.hstack([linear, -linear.dot(self.transform[:, 2:])])
+        return _apply(inverse, points)
+
+    def world_bounds(self):
+        """
+        The lower and upper corners of the world box visible on the screen,
+        e.g. to query a map's spatial index for what's in view.
+        """
+        if self.screen_width is None or self.screen_height is None:
+            return (
+                np.array([self.viewport_x_range[0], self.viewport_y_range[0]]),
+                np.array([self.viewport_x_range[1], self.viewport_y_range[1]]),
             )
-            v = v / max(width, height)
-            # now move to the viewport
-            v = v * min(self.screen_height, self.screen_width)
-            v = v + np.array([self.screen_width / 2, self.screen_height / 2])
-            result.append(v)
 
-        return result
+        corners = self.unproject(
+            np.array([[0.0, 0.0], [self.screen_width, self.screen_height]])
+        )
+        return corners.min(axis=0), corners.max(axis=0)
+
+
+def _apply(transform: np.ndarray, points):
+    if isinstance(points, np.ndarray):
+        return points.dot(transform[:, :2].T) + transform[:, 2]
+
+    if len(points) == 0:
+        return []
+    return list(
+        np.asarray(points, dtype=np.float64).dot(transform[:, :2].T) + transform[:, 2]
+    )
 
 
 def viewport_for_map_no_scaling(interaction_map):
@@ -50,46 +98,30 @@ def viewport_for_map_no_scaling(interaction_map):
 
     This is useful for rendering on a 3D canvas where we want the units to be equal to meters.
     """
-    min_x, min_y, max_x, max_y = None, None, None, None
-
-    for n in interaction_map.nodes.values():
-        x, y = n.position[0], n.position[1]
-        if min_x is None:
-            min_x = max_x = x
-            min_y = max_y = y
-        else:
-            min_x = min(min_x, x)
-            min_y = min(min_y, y)
-            max_x = max(max_x, x)
-            max_y = max(max_y, y)
+    x_range, y_range = _map_bounds(interaction_map)
 
     return Viewport(
         screen_width=None,
         screen_height=None,
-        viewport_x_range=np.array([min_x, max_x]),
-        viewport_y_range=np.array([min_y, max_y]),
+        viewport_x_range=x_range,
+        viewport_y_range=y_range,
     )
 
 
 def viewport_for_map(
     screen_width: float, screen_height: float, interaction_map: Map
 ) -> Viewport:
-    min_x, min_y, max_x, max_y = None, None, None, None
-
-    for n in interaction_map.nodes.values():
-        x, y = n.position[0], n.position[1]
-        if min_x is None:
-            min_x = max_x = x
-            min_y = max_y = y
-        else:
-            min_x = min(min_x, x)
-            min_y = min(min_y, y)
-            max_x = max(max_x, x)
-            max_y = max(max_y, y)
+    x_range, y_range = _map_bounds(interaction_map)
 
     return Viewport(
         screen_width=screen_width,
         screen_height=screen_height,
-        viewport_x_range=np.array([min_x, max_x]),
-        viewport_y_range=np.array([min_y, max_y]),
+        viewport_x_range=x_range,
+        viewport_y_range=y_range,
     )
+
+
+def _map_bounds(interaction_map: Map):
+    positions = interaction_map.node_positions
+    lower, upper = positions.min(axis=0), positions.max(axis=0)
+    return np.array([lower[0], upper[0]]), np.array([lower[1], upper[1]])
@@ -1,15 +1,26 @@
 import logging
+import gzip
+import hashlib
 import http
+import itertools
 import json
 import asyncio
+import mimetypes
 import websockets
 import os
 import math
+import urllib.parse
 import numpy as np
 
+from dataclasses import dataclass
+
 from typing import Optional
+from interactionviz.catalog import Catalog, Dataset
 from interactionviz.maps import WayKind, Map
 from interactionviz.tracks import AgentKind, Tracks, Frame, Agent
+from . import protocol, sessions, streaming
+from .agents import agent_colors, frame_arrays
+from .framecache import FrameCache
 from .viewport import Viewport, viewport_for_map_no_scaling
 
 from typing import Dict, List, Union, Any
@@ -20,146 +31,449 @@ STATIC_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "static")
 
 JSON = Dict[str, Any]
 
-AGENT_COLORS = [
-    (161, 201, 244),
-    (255, 180, 130),
-    (141, 229, 161),
-    (255, 159, 155),
-    (208, 187, 255),
-    (222, 187, 155),
-    (250, 176, 228),
-    (207, 207, 207),
-    (255, 254, 163),
-    (185, 242, 240),
-]
-
 
 class WebViewer:
+    """
+    WebViewer serves a THREE.js viewer for the maps and recordings of a dataset.
+
+    Given a map and tracks, it serves just those. Given a Catalog, clients can open any
+    dataset and session in it, which are loaded on first use and kept within max_bytes.
+    """
+
     def __init__(
         self,
-        interaction_map: Map,
+        interaction_map: Optional[Map] = None,
         tracks: Optional[Tracks] = None,
+        frame_cache: Optional[FrameCache] = None,
+        catalog: Optional[Catalog] = None,
+        dataset: Optional[str] = None,
+        session: Optional[int] = None,
+        max_bytes: int = sessions.DEFAULT_MAX_BYTES,
     ):
-        logging.warn("This feature is a very early preview, YMMV")
-        self.map = interaction_map
-        self.tracks = tracks
-        self.viewport = viewport_for_map_no_scaling(
-            interaction_map=interaction_map,
-        )
-        self._track_index = 0
-        self._cached_background = None
+        logging.warning("This feature is a very early preview, YMMV")
+        if catalog is None:
+            catalog = _SingleSession(interaction_map, tracks)
+        self.catalog = catalog
+        # Encoded frames, shared by every client.
+        self.frame_cache = frame_cache if frame_cache is not None else FrameCache()
+        # Maps and tracks, loaded on first use, and shared by every client.
+        self.loaded = sessions.AsyncLRU(max_bytes)
+        self._generations = itertools.count()
+
+        if dataset is None:
+            dataset = next(iter(catalog.datasets), None)
+        elif dataset not in catalog.datasets:
+            raise ValueError(f"no map found for dataset {dataset}")
+        if session is None and dataset is not None:
+            session = next(iter(catalog.dataset(dataset).sessions), None)
+        self.dataset = dataset
+        self.session = session
+
+        self._static_files = _load_static_files(STATIC_DIR)
 
-    def run(self):
-        start_server = websockets.serve(
+    def run(self, host: str = "0.0.0.0", port: int = DEFAULT_PORT):
+        logging.info(f"Starting server at localhost:{port}...")
+        print(f"Open http://localhost:{port}/viewer in your browser to see the viewer")
+        asyncio.get_event_loop().run_until_complete(self.serve(host, port))
+        asyncio.get_event_loop().run_forever()
+
+    def serve(self, host: str, port: int):
+        """
+        Start serving on the current event loop, await the result to get the server.
+        """
+        return websockets.serve(
             self._socket_server,
-            # "localhost",
-            "0.0.0.0",
-            DEFAULT_PORT,
+            host,
+            port,
             process_request=self._serve_static,
+            compression="deflate",
         )
-        logging.info(f"Starting server at localhost:{DEFAULT_PORT}...")
-        print(
-            f"Open http://localhost:{DEFAULT_PORT}/viewer in your browser to see the viewer"
+
+    def sessions_payload(self) -> JSON:
+        return dict(
+            datasets=[
+                dict(name=d.name, sessions=list(d.sessions))
+                for d in self.catalog.datasets.values()
+            ],
+            default=dict(dataset=self.dataset, session=self.session),
+        )
+
+    async def load_map(self, dataset: str) -> "_LoadedMap":
+        self.catalog.dataset(dataset)
+        return await self.loaded.get(
+            ("map", dataset), lambda: _LoadedMap.load(self.catalog, dataset)
+        )
+
+    async def load_tracks(
+        self, dataset: str, session: Optional[int]
+    ) -> Optional["_LoadedTracks"]:
+        if session is None:
+            return None
+        return await self.loaded.get(
+            ("tracks", dataset, session),
+            lambda: _LoadedTracks(
+                self.catalog.load_tracks(dataset, session), next(self._generations)
+            ),
         )
-        asyncio.get_event_loop().run_until_complete(start_server)
-        asyncio.get_event_loop().run_forever()
 
     async def _serve_static(self, path, headers):
+        path, _, query = path.partition("?")
         if path == "/":
             return None
+        if path == "/map":
+            dataset = urllib.parse.parse_qs(query).get("dataset", [self.dataset])[0]
+            try:
+                loaded = await self.load_map(dataset)
+            except KeyError:
+                return http.HTTPStatus.NOT_FOUND, {}, b"unknown dataset"
+            return loaded.payload.response(headers)
         if path == "/viewer" or path == "/viewer/":
-            local_file = os.path.join(STATIC_DIR, "index.html")
-        else:
-            local_file = os.path.join(STATIC_DIR, path[1:])
+            path = "/index.html"
 
-        if os.path.exists(local_file):
-            with open(local_file, "rb") as infile:
-                import mimetypes
-
-                content_type = mimetypes.guess_type(local_file)
-                return (
-                    http.HTTPStatus.OK,
-                    {"Content-type": content_type[0]},
-                    bytes(infile.read()),
-                )
+        static_file = self._static_files.get(path[1:])
+        if static_file is None:
+            return http.HTTPStatus.NOT_FOUND, {}, b"not found"
+        return static_file.response(headers)
 
     async def _socket_server(self, websocket, path):
-        map_data = _serialize_map(self.viewport, self.map)
-        await websocket.send(json.dumps(map_data))
+        connection = _Connection(self, websocket)
+        try:
+            async for message in websocket:
+                try:
+                    await connection.handle(json.loads(message))
+                except KeyError as e:
+                    # e.g. an unknown dataset or session.
+                    await websocket.send(
+                        json.dumps(dict(action="error", message=str(e)))
+                    )
+        finally:
+            await connection.close()
 
-        while True:
-            request = json.loads(await websocket.recv())
 
-            if "action" in request and request["action"] == "request_frame":
-                idx = request["index"]
-                response = dict(
-                    action="frame",
-                    payload=dict(
-                        current_index=idx,
-                        max_index=len(self.tracks),
-                        agents=_serialize_agents(self.viewport, self.tracks[idx]),
-                    ),
-                )
+class _Connection:
+    """
+    The state of one client: the session it has open, and its playback.
+    """
 
-                await websocket.send(json.dumps(response))
+    def __init__(self, viewer: WebViewer, websocket):
+        self.viewer = viewer
+        self.websocket = websocket
+        self.encodings: List[str] = []
+        self.dataset: Optional[str] = None
+        self.session: Optional[int] = None
+        self.serializer: Optional[_FrameSerializer] = None
+        self.player: Optional[streaming.Player] = None
 
+    async def handle(self, request: JSON):
+        action = request.get("action")
 
-def _serialize_agents(viewport: Viewport, frame: Frame) -> JSON:
-    return [_serialize_agent(viewport, a) for a in frame.agents]
+        if action == "hello":
+            self.encodings = request.get("encodings", [])
+            await self._ensure_open()
+            encoding = self.serializer.negotiate(self.encodings)
+            await self._send(dict(action="hello", encoding=encoding))
 
+        elif action == "list_sessions":
+            await self._send(
+                dict(action="sessions", payload=self.viewer.sessions_payload())
+            )
 
-def _serialize_agent(viewport: Viewport, agent: Agent):
-    if agent.kind is AgentKind.CAR or agent.kind is AgentKind.TRUCK:
-        return dict(
-            kind=agent.kind.name,
-            track_id=agent.track_id,
-            position=viewport.project([agent.position])[0].tolist(),
-            extent=agent.extent.tolist(),
-            yaw=agent.yaw,
-            color=AGENT_COLORS[hash(agent.track_id) % len(AGENT_COLORS)],
+        elif action == "open_session":
+            await self.open(request["dataset"], request.get("session"))
+
+        elif action == "request_map":
+            # Clients fetch the map from /map, this is kept for older clients.
+            await self._ensure_open()
+            loaded = await self.viewer.load_map(self.dataset)
+            await self.websocket.send(loaded.payload.text)
+
+        elif action == "play":
+            await self._ensure_open()
+            await self.player.play(start=request.get("from"), rate=request.get("rate"))
+
+        elif action == "pause":
+            if self.player is not None:
+                await self.player.pause()
+
+        elif action == "seek" or action == "request_frame":
+            await self._ensure_open()
+            await self.player.seek(request["index"])
+
+    async def open(self, dataset: str, session: Optional[int]):
+        """
+        Switch to a session, loading it if no other client has.
+        """
+        loaded = await self.viewer.load_map(dataset)
+        loaded_tracks = await self.viewer.load_tracks(dataset, session)
+        tracks = loaded_tracks.tracks if loaded_tracks is not None else None
+        generation = loaded_tracks.generation if loaded_tracks is not None else None
+
+        await self.close()
+        self.dataset, self.session = dataset, session
+        self.serializer = _FrameSerializer(
+            loaded.viewport,
+            tracks,
+            self.viewer.frame_cache,
+            session=f"{dataset}/{session}/{generation}",
         )
-    else:
-        return dict(
-            kind=agent.kind.name,
-            track_id=agent.track_id,
-            position=viewport.project([agent.position])[0].tolist(),
-            color=AGENT_COLORS[hash(agent.track_id) % len(AGENT_COLORS)],
+        self.serializer.negotiate(self.encodings)
+        self.player = streaming.Player(
+            self.websocket.send, self.serializer, len(tracks) if tracks else 0
         )
 
+        await self._send(
+            dict(
+                action="session",
+                payload=dict(
+                    dataset=dataset,
+                    session=session,
+                    map_url="/map?" + urllib.parse.urlencode(dict(dataset=dataset)),
+                    max_index=self.player.num_frames,
+                ),
+            )
+        )
+
+    async def close(self):
+        if self.player is not None:
+            await self.player.pause()
+
+    async def _ensure_open(self):
+        if self.player is None:
+            await self.open(self.viewer.dataset, self.viewer.session)
+
+    async def _send(self, response: JSON):
+        await self.websocket.send(json.dumps(response))
+
+
+@dataclass
+class _LoadedMap:
+    """
+    A map, with its viewport and its serialized payload.
+    """
+
+    map: Map
+    viewport: Viewport
+    payload: "_Payload"
+
+    @classmethod
+    def load(cls, catalog: Catalog, dataset: str) -> "_LoadedMap":
+        interaction_map = catalog.load_map(dataset)
+        viewport = viewport_for_map_no_scaling(interaction_map=interaction_map)
+        # Serialized once, and shared by every client.
+        payload = _Payload.from_json(_serialize_map(viewport, interaction_map))
+        return cls(interaction_map, viewport, payload)
+
+    @property
+    def nbytes(self) -> int:
+        return self.map.nbytes + len(self.payload.body) + len(self.payload.compressed)
+
+
+@dataclass
+class _LoadedTracks:
+    """
+    The tracks of a session, numbered by load. Lazily loaded tracks number their agents
+    in the order they're decoded, so frames encoded from one load of a session can't be
+    shared with clients of another.
+    """
+
+    tracks: Optional[Tracks]
+    generation: int
+
+    @property
+    def nbytes(self) -> int:
+        return getattr(self.tracks, "nbytes", 0)
 
-def _serialize_map(viewport: Viewport, interaction_map: Map) -> JSON:
-    triangulated_lanes = []
 
-    for osm_id, lane in interaction_map.lanes.items():
-        lane_triangles = []
-        triangles = lane.to_triangles()
-        for triangle in triangles:
-            lane_triangles.append([p.tolist() for p in viewport.project(triangle)])
-        triangulated_lanes.append(lane_triangles)
+class _SingleSession:
+    """
+    A catalog of one map, and optionally one recording, given up front.
+    """
 
-    region_triangles = [
-        [point.tolist() for point in viewport.project(triangle)]
-        for triangle in interaction_map.triangulate_map_region()
-    ]
+    DATASET = "map"
+
+    def __init__(self, interaction_map: Map, tracks: Optional[Tracks]):
+        self.map = interaction_map
+        self.tracks = tracks
+        sessions = {0: []} if tracks is not None else {}
+        self.datasets = {
+            self.DATASET: Dataset(name=self.DATASET, map_path=None, sessions=sessions)
+        }
+
+    def dataset(self, name: str) -> Dataset:
+        if name not in self.datasets:
+            raise KeyError(f"unknown dataset {name}")
+        return self.datasets[name]
+
+    def load_map(self, dataset: str) -> Map:
+        return self.map
+
+    def load_tracks(self, dataset: str, session: int) -> Optional[Tracks]:
+        return self.tracks
+
+
+@dataclass
+class _Payload:
+    """
+    A response body prepared once, with its gzipped bytes and an ETag for revalidation.
+    """
+
+    content_type: str
+    body: bytes
+    compressed: bytes
+    etag: str
+
+    @classmethod
+    def from_bytes(cls, content_type: str, body: bytes) -> "_Payload":
+        return cls(
+            content_type=content_type,
+            body=body,
+            compressed=gzip.compress(body),
+            etag='"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"',
+        )
+
+    @classmethod
+    def from_json(cls, data: JSON) -> "_Payload":
+        return cls.from_bytes("application/json", json.dumps(data).encode())
+
+    @property
+    def text(self) -> str:
+        return self.body.decode()
+
+    def response(self, headers):
+        response_headers = {
+            "Content-Type": self.content_type,
+            "ETag": self.etag,
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+        if headers.get("If-None-Match") == self.etag:
+            return http.HTTPStatus.NOT_MODIFIED, response_headers, b""
+
+        if "gzip" in headers.get("Accept-Encoding", ""):
+            response_headers["Content-Encoding"] = "gzip"
+            return http.HTTPStatus.OK, response_headers, self.compressed
+        return http.HTTPStatus.OK, response_headers, self.body
+
+
+def _load_static_files(root: str) -> Dict[str, _Payload]:
+    """
+    Read every static file up front, so serving them never blocks the event loop.
+    """
+    result = {}
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            local_file = os.path.join(directory, filename)
+            with open(local_file, "rb") as infile:
+                body = infile.read()
+            content_type = mimetypes.guess_type(local_file)[0]
+            name = os.path.relpath(local_file, root).replace(os.sep, "/")
+            result[name] = _Payload.from_bytes(
+                content_type or "application/octet-stream", body
+            )
+    return result
+
+
+class _FrameSerializer:
+    """
+    Serializes the frames sent to one client, in the encoding it negotiated.
+    Encoded frames are shared with other clients through the cache.
+    """
+
+    def __init__(
+        self,
+        viewport: Viewport,
+        tracks: Tracks,
+        cache: Optional[FrameCache] = None,
+        session: str = "",
+    ):
+        self.viewport = viewport
+        self.tracks = tracks
+        self.cache = cache if cache is not None else FrameCache(max_bytes=0)
+        self.session = session
+        self.encoding = protocol.JSON
+        self.encoder = protocol.FrameEncoder(viewport, tracks, self.cache, session)
+
+    def negotiate(self, encodings: List[str]) -> str:
+        self.encoding = protocol.negotiate(self.tracks, encodings)
+        return self.encoding
+
+    def serialize(self, index: int) -> streaming.QueuedFrame:
+        if self.encoding == protocol.BINARY:
+            preamble = []
+            new_tracks = self.encoder.new_tracks(self.tracks[index])
+            if new_tracks is not None:
+                preamble.append(json.dumps(dict(action="tracks", payload=new_tracks)))
+            return streaming.QueuedFrame(index, self.encoder.encode(index), preamble)
+
+        frame = self.cache.get(
+            (self.session, index, protocol.JSON), lambda: self._serialize_json(index)
+        )
+        return streaming.QueuedFrame(index, frame)
+
+    def keyframe(self, frame: streaming.QueuedFrame) -> streaming.Message:
+        if self.encoding == protocol.BINARY:
+            return self.encoder.encode_as(frame.index, protocol.KEYFRAME)
+        return frame.frame
+
+    def reset(self):
+        self.encoder.reset()
+
+    def _serialize_json(self, index: int) -> str:
+        response = dict(
+            action="frame",
+            payload=dict(
+                current_index=index,
+                max_index=len(self.tracks),
+                agents=_serialize_agents(self.viewport, self.tracks[index]),
+            ),
+        )
+        return json.dumps(response)
+
+
+def _serialize_agents(viewport: Viewport, frame: Frame) -> JSON:
+    agents = frame_arrays(frame)
+    colors = agent_colors(agents.track_ids)
+    positions = viewport.project(agents.positions).tolist()
+    extents = agents.extents.tolist()
+    yaws = agents.yaws.tolist()
+
+    result = []
+    for i, track_id in enumerate(agents.track_ids):
+        kind = AgentKind(int(agents.kinds[i]))
+        agent = dict(
+            kind=kind.name,
+            track_id=track_id,
+            position=positions[i],
+            color=colors[i],
+        )
+        if kind is AgentKind.CAR or kind is AgentKind.TRUCK:
+            agent.update(extent=extents[i], yaw=yaws[i])
+        result.append(agent)
+
+    return result
+
+
+def _serialize_map(viewport: Viewport, interaction_map: Map) -> JSON:
+    mesh = interaction_map.mesh
+    lane_triangles = viewport.project(mesh.lane_triangles()).tolist()
 
     return dict(
         action="map_data",
         payload=dict(
-            triangulated_lanes=triangulated_lanes,
-            triangulated_region=region_triangles,
+            triangulated_lanes=[
+                lane_triangles[start:end]
+                for start, end in zip(mesh.lane_offsets[:-1], mesh.lane_offsets[1:])
+            ],
+            triangulated_region=viewport.project(mesh.region_triangles()).tolist(),
             ways=_serialize_ways(viewport, interaction_map),
         ),
     )
 
 
 def _serialize_ways(viewport: Viewport, interaction_map: Map) -> JSON:
-    return [
-        dict(
-            points=[
-                p.tolist()
-                for p in viewport.project([node.position for node in way.nodes])
-            ],
-            kind=way.kind.name,
-        )
-        for way in interaction_map.ways.values()
-    ]
+    result = []
+    for kind, polylines in interaction_map.mesh.ways.items():
+        vertices = viewport.project(polylines.vertices).tolist()
+        for start, end in zip(polylines.offsets[:-1], polylines.offsets[1:]):
+            result.append(dict(points=vertices[start:end], kind=kind.name))
+    return result
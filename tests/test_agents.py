@@ -0,0 +1,47 @@
+import math
+
+import numpy as np
+
+from interactionviz.tracks import Agent, AgentKind, Frame
+from interactionviz.viewers import Viewport, agent_footprints, frame_arrays
+
+
+def test_agent_footprints_match_per_agent_rotation():
+    viewport = Viewport(
+        screen_width=800,
+        screen_height=600,
+        viewport_x_range=np.array([0.0, 100.0]),
+        viewport_y_range=np.array([0.0, 50.0]),
+    )
+    frame = Frame(
+        frame_id=1,
+        agents=[
+            Agent(
+                "1", AgentKind.CAR, np.array([10.0, 20.0]), np.array([4.0, 2.0]), 0.3
+            ),
+            Agent(
+                "2", AgentKind.CAR, np.array([50.0, 5.0]), np.array([5.0, 2.5]), -2.0
+            ),
+            Agent("P1", AgentKind.PEDESTRIAN, np.array([1.0, 1.0]), None, None),
+        ],
+    )
+
+    agents = frame_arrays(frame)
+    footprints = agent_footprints(
+        viewport, agents.positions, agents.yaws, agents.extents
+    )
+
+    assert footprints.shape == (3, 6, 2)
+    assert agents.has_footprint.tolist() == [True, True, False]
+    assert np.isnan(footprints[2]).all()
+
+    for agent, footprint in zip(frame.agents[:2], footprints):
+        c, s = math.cos(agent.yaw), math.sin(agent.yaw)
+        rot = np.array([[c, -s], [s, c]])
+        offsets = (
+            0.5
+            * agent.extent
+            * np.array([[1, 1], [1.2, 0], [1, 1], [1, -1], [-1, -1], [-1, 1]])
+        )
+        expected = viewport.project([agent.position + rot.dot(o) for o in offsets])
+        np.testing.assert_allclose(footprint, np.array(expected))
@@ -0,0 +1,110 @@
+import numpy as np
+
+from interactionviz.analysis import (
+    interactions,
+    kinematics,
+    post_encroachment,
+    time_to_collision,
+)
+from interactionviz.tracks import FRAME_INTERVAL_MS, TrackStore
+
+
+def _store(rows):
+    """
+    A store from (track_id, frame_id, x, y, vx, vy, psi) rows of 2m wide cars.
+    """
+    track_id, frame_id, x, y, vx, vy, psi = zip(*rows)
+    n = len(rows)
+    return TrackStore.from_columns(
+        frame_id=frame_id,
+        track_id=track_id,
+        kind=np.zeros(n),
+        x=x,
+        y=y,
+        vx=vx,
+        vy=vy,
+        psi=psi,
+        length=np.full(n, 4.0),
+        width=np.full(n, 2.0),
+        timestamp_ms=np.array(frame_id) * FRAME_INTERVAL_MS,
+    )
+
+
+def test_kinematics_differentiate_along_tracks():
+    store = _store(
+        [
+            ("a", 1, 0, 0, 1, 0, 0.0),
+            ("a", 2, 0, 0, 2, 0, 0.1),
+            ("a", 3, 0, 0, 4, 0, 0.2),
+            ("b", 2, 9, 9, 3, 4, 3.1),
+            ("b", 3, 9, 9, 3, 4, -3.1),
+        ]
+    )
+    motion = kinematics(store)
+
+    a = store.track == store.track_code("a")
+    b = ~a
+    np.testing.assert_allclose(motion.speed[b], [5, 5])
+    np.testing.assert_allclose(motion.acceleration[a], [10, 15, 20])
+    np.testing.assert_allclose(motion.yaw_rate[a], [1, 1, 1], rtol=1e-5)
+    # Yaw wraps round through pi rather than turning back.
+    assert np.all(motion.yaw_rate[b] > 0) and np.all(motion.yaw_rate[b] < 1)
+
+
+def test_interactions_pair_agents_in_the_same_frame():
+    store = _store(
+        [
+            ("a", 1, 0, 0, 5, 0, 0.0),
+            ("b", 1, 10, 0, -5, 0, np.pi),
+            ("c", 1, 100, 0, 0, 0, 0.0),
+            ("c", 2, 0, 0, 0, 0, 0.0),
+            ("a", 3, 50, 0, 0, 0, 0.0),
+        ]
+    )
+    pairs = interactions(store, radius=20)
+
+    assert len(pairs) == 1
+    assert pairs.frame_ids.tolist() == [1]
+    np.testing.assert_allclose(pairs.distance, [10])
+    # Closing at 10m/s from 10m apart, touching at 2m.
+    np.testing.assert_allclose(pairs.ttc, [0.8])
+    assert pairs.in_frame(1) == slice(0, 1) and pairs.in_frame(2) == slice(1, 1)
+
+    # c passes where a was, but they were never near each other at the same time.
+    assert len(post_encroachment(store, pairs).pet) == 0
+
+
+def test_time_to_collision():
+    ttc = time_to_collision(
+        np.array([[10.0, 0], [10, 0], [1, 0]]),
+        np.array([[-2.0, 0], [2, 0], [0, 0]]),
+        np.array([2.0, 2, 2]),
+    )
+    np.testing.assert_allclose(ttc, [4, np.inf, 0])
+
+
+def test_post_encroachment_of_crossing_paths():
+    store = _store(
+        [("a", f, f, 0, 10, 0, 0.0) for f in range(-5, 6)]
+        + [("b", f, 0, f - 3, 0, 10, 1.57) for f in range(-2, 9)]
+    )
+    pet = post_encroachment(store, interactions(store, radius=20))
+
+    assert (pet.first.tolist(), pet.second.tolist()) == ([0], [1])
+    # a crossed the origin in frame 0, b in frame 3.
+    np.testing.assert_allclose(pet.pet, [0.3])
+    np.testing.assert_allclose(pet.positions, [[0, 0]])
+
+
+def test_post_encroachment_takes_the_closest_time_not_the_closest_point():
+    # b comes within 1m of where a crossed the origin in frame 3,
+    # then creeps closer, reaching the origin itself in frame 30.
+    store = _store(
+        [("a", f, f, 0, 10, 0, 0.0) for f in range(-5, 6)]
+        + [("b", f, 0, f - 3.9, 0, 10, 1.57) for f in range(-2, 4)]
+        + [("b", f, 0, -0.9 + (f - 3) / 30, 0, 0.3, 1.57) for f in range(4, 31)]
+    )
+    pet = post_encroachment(store, interactions(store, radius=20))
+
+    np.testing.assert_allclose(pet.pet, [0.3])
+    np.testing.assert_allclose(pet.positions, [[0, 0]])
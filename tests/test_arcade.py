@@ -0,0 +1,20 @@
+import numpy as np
+
+from interactionviz.viewers.arcade import _thick_segments, _triangle_strip
+
+
+def test_thick_segments_cover_the_segment():
+    triangles = _thick_segments(np.array([[[0.0, 0.0], [4.0, 0.0]]]), 2)
+    assert triangles.shape == (2, 3, 2)
+    assert triangles[..., 0].min() == 0 and triangles[..., 0].max() == 4
+    assert triangles[..., 1].min() == -1 and triangles[..., 1].max() == 1
+
+
+def test_triangle_strip_only_adds_degenerate_triangles():
+    triangles = np.array([[[0, 0], [1, 0], [0, 1]], [[5, 5], [6, 5], [5, 7]]], float)
+    strip = _triangle_strip(triangles)
+
+    joined = [strip[i : i + 3] for i in range(len(strip) - 2)]
+    with_area = [t for t in joined if len(np.unique(t, axis=0)) == 3]
+    assert len(with_area) == 2
+    np.testing.assert_array_equal(with_area, triangles)
@@ -0,0 +1,81 @@
+import multiprocessing
+
+import numpy as np
+
+from interactionviz.cache import Cache
+from interactionviz.tracks import load_tracks_files
+
+from .test_maps import MAP
+
+TRACKS = """track_id,frame_id,timestamp_ms,agent_type,x,y,vx,vy,psi_rad,length,width
+1,1,100,car,1.0,2.0,0.5,0.0,0.1,4.5,1.8
+2,1,100,car,10.0,20.0,0.0,1.0,1.5,4.0,2.0
+"""
+
+
+def test_cached_tracks_roundtrip(tmp_path):
+    path = tmp_path / "vehicle_tracks_000.csv"
+    path.write_text(TRACKS)
+    cache = Cache(tmp_path / "cache")
+
+    first = cache.load_tracks(path)
+    second = cache.load_tracks(path)
+
+    assert isinstance(second.x, np.memmap)
+    assert second.track_ids == first.track_ids == ["1", "2"]
+    np.testing.assert_array_equal(second.x, load_tracks_files(path).x)
+    assert len(list((tmp_path / "cache").iterdir())) == 1
+
+
+def test_cache_invalidated_on_change(tmp_path):
+    path = tmp_path / "vehicle_tracks_000.csv"
+    path.write_text(TRACKS)
+    cache = Cache(tmp_path / "cache")
+    cache.load_tracks(path)
+
+    path.write_text(TRACKS.replace("10.0,20.0", "11.0,20.0"))
+    tracks = cache.load_tracks(path)
+
+    assert tracks.x[1] == 11.0
+    assert len(list((tmp_path / "cache").iterdir())) == 1
+
+
+def test_cached_map_roundtrip(tmp_path):
+    path = tmp_path / "map.osm_xy"
+    path.write_text(MAP)
+    cache = Cache(tmp_path / "cache")
+
+    cache.load_map(path)
+    interaction_map = cache.load_map(path)
+
+    lane = interaction_map.lanes["20"]
+    assert [n.osm_id for n in lane.left_way.nodes] == ["3", "5", "4"]
+    assert lane.right_way.kind.name == "Virtual"
+    np.testing.assert_array_equal(interaction_map.nodes["4"].position, [10.0, 3.0])
+    assert isinstance(interaction_map.mesh.lane_vertices, np.memmap)
+    np.testing.assert_array_equal(
+        interaction_map.mesh.lane_triangles(), lane.to_triangles()
+    )
+
+
+def _load_cached_x(cache_dir, path):
+    return Cache(cache_dir).load_tracks(path).x.tolist()
+
+
+def test_processes_share_an_entry_built_concurrently(tmp_path):
+    # Many rows, so building the entry takes long enough for the processes to race.
+    path = tmp_path / "vehicle_tracks_000.csv"
+    rows = [
+        f"{t},{f},{100 * f},car,{f}.0,0.0,0.0,0.0,0.0,4.0,2.0\n"
+        for t in range(3, 50)
+        for f in range(1, 200)
+    ]
+    path.write_text(TRACKS + "".join(rows))
+    expected = load_tracks_files(path).x.tolist()
+
+    with multiprocessing.get_context("spawn").Pool(4) as pool:
+        for trial in range(4):
+            cache_dir = tmp_path / f"cache-{trial}"
+            results = pool.starmap(_load_cached_x, [(cache_dir, path)] * 4)
+            assert all(x == expected for x in results)
+            assert len(list(cache_dir.iterdir())) == 1
@@ -0,0 +1,42 @@
+from interactionviz.catalog import Catalog
+from interactionviz.tracks import LazyTracks, TrackStore
+
+from .test_maps import MAP
+from .test_tracks import PEDESTRIANS, VEHICLES
+
+
+def _write_root(root):
+    (root / "maps").mkdir()
+    for dataset in ("DR_A", "DR_B"):
+        (root / "maps" / f"{dataset}.osm_xy").write_text(MAP)
+
+    tracks_dir = root / "recorded_trackfiles" / "DR_A"
+    tracks_dir.mkdir(parents=True)
+    (tracks_dir / "vehicle_tracks_000.csv").write_text(VEHICLES)
+    (tracks_dir / "pedestrian_tracks_000.csv").write_text(PEDESTRIANS)
+    (tracks_dir / "vehicle_tracks_002.csv").write_text(VEHICLES)
+    (tracks_dir / "notes.txt").write_text("")
+    return root
+
+
+def test_catalog_indexes_datasets_and_sessions(tmp_path):
+    catalog = Catalog(_write_root(tmp_path))
+
+    assert list(catalog.datasets) == ["DR_A", "DR_B"]
+    assert list(catalog.dataset("DR_A").sessions) == [0, 2]
+    assert [p.name for p in catalog.dataset("DR_A").sessions[0]] == [
+        "pedestrian_tracks_000.csv",
+        "vehicle_tracks_000.csv",
+    ]
+    assert catalog.dataset("DR_B").sessions == {}
+
+
+def test_catalog_loads_on_request(tmp_path):
+    catalog = Catalog(_write_root(tmp_path))
+
+    assert isinstance(catalog.load_tracks("DR_A", 0), TrackStore)
+    assert len(catalog.load_tracks("DR_A", 0)) == 4
+    assert "20" in catalog.load_map("DR_B").lanes
+
+    lazy = Catalog(tmp_path, lazy=True)
+    assert isinstance(lazy.load_tracks("DR_A", 2), LazyTracks)
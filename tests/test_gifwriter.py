@@ -0,0 +1,170 @@
+import functools
+import io
+import multiprocessing
+import os
+
+import numpy as np
+from PIL import Image
+
+from interactionviz.catalog import Catalog
+from interactionviz.gifwriter import (
+    export_gifs,
+    gifwriter,
+    plan_exports,
+    raster,
+    write_gif,
+)
+from interactionviz.gifwriter.encoder import Palette
+from interactionviz.gifwriter.gifwriter import _render_map, draw_frame
+from interactionviz.maps import load_map_xml
+from interactionviz.tracks import FRAME_INTERVAL_MS, load_tracks_files
+from interactionviz.viewers import viewport_for_map
+
+from .test_catalog import _write_root
+from .test_maps import MAP
+from .test_tracks import _write_tracks
+
+
+def test_write_gif_streams_every_frame(tmp_path, monkeypatch):
+    # Spawned workers don't inherit the parent's hash seed, so nothing may depend on it.
+    monkeypatch.setattr(
+        gifwriter,
+        "ProcessPoolExecutor",
+        functools.partial(
+            gifwriter.ProcessPoolExecutor,
+            mp_context=multiprocessing.get_context("spawn"),
+        ),
+    )
+    tracks = load_tracks_files(*_write_tracks(tmp_path))
+    interaction_map = load_map_xml(io.StringIO(MAP))
+
+    serial = io.BytesIO()
+    assert write_gif(tracks, interaction_map, serial, width=80, height=60) == 4
+
+    with Image.open(io.BytesIO(serial.getvalue())) as img:
+        assert img.size == (80, 60)
+        assert img.n_frames == 4
+
+    parallel = io.BytesIO()
+    write_gif(tracks, interaction_map, parallel, 80, 60, workers=2, window=2)
+    assert parallel.getvalue() == serial.getvalue()
+
+    stepped = io.BytesIO()
+    assert write_gif(tracks, interaction_map, stepped, 80, 60, step=2) == 2
+
+
+def test_gif_frames_match_rendered_frames(tmp_path):
+    tracks = load_tracks_files(*_write_tracks(tmp_path))
+    interaction_map = load_map_xml(io.StringIO(MAP))
+    viewport = viewport_for_map(80, 60, interaction_map)
+    map_img = _render_map(viewport, interaction_map)
+
+    out = io.BytesIO()
+    write_gif(tracks, interaction_map, out, width=80, height=60)
+
+    with Image.open(io.BytesIO(out.getvalue())) as img:
+        for i, frame in enumerate(tracks):
+            img.seek(i)
+            assert img.info["duration"] == FRAME_INTERVAL_MS
+            expected = draw_frame(viewport, map_img, frame, 80, 60)
+            np.testing.assert_array_equal(
+                np.asarray(img.convert("RGB")), np.asarray(expected)
+            )
+
+
+def test_palette_maps_unknown_colors_to_the_nearest():
+    background = np.array([[[0, 0, 0], [200, 200, 200]]], dtype=np.uint8)
+    palette = Palette.build(background, [(255, 0, 0)])
+
+    indices = palette.index(np.array([[0, 0, 0], [250, 10, 0], [190, 190, 200]]))
+    assert palette.colors[indices].tolist() == [[0, 0, 0], [255, 0, 0], [200, 200, 200]]
+    assert palette.transparency == 3
+
+
+def test_raster_fills_polygons_and_segments():
+    image = np.zeros((6, 8), dtype=np.uint8)
+    squares = np.array(
+        [[[1, 1], [4, 1], [4, 4], [1, 4]], [[3, 3], [9, 3], [9, 9], [3, 9]]]
+    )
+    raster.fill_polygons(image, squares, [1, 2])
+    assert (image[1:3, 1:4] == 1).all()
+    assert (image[3:, 3:] == 2).all()
+    assert image[0].sum() == 0 and image[:, 0].sum() == 0
+
+    image = np.zeros((5, 5, 3), dtype=np.uint8)
+    raster.draw_segments(image, np.array([[[0, 2], [4, 2]]]), 1, (9, 9, 9))
+    assert (image[2] == 9).all()
+    assert image.sum() == 5 * 3 * 9
+
+
+def test_numpy_backend_matches_pil(tmp_path):
+    tracks = load_tracks_files(*_write_tracks(tmp_path))
+    interaction_map = load_map_xml(io.StringIO(MAP))
+    viewport = viewport_for_map(80, 60, interaction_map)
+
+    pil_map = np.asarray(_render_map(viewport, interaction_map, "pil"))
+    numpy_map = np.asarray(_render_map(viewport, interaction_map, "numpy"))
+    assert (pil_map == numpy_map).all(axis=-1).mean() > 0.9
+
+    map_img = Image.fromarray(pil_map)
+    for frame in tracks:
+        pil = np.asarray(draw_frame(viewport, map_img, frame, 80, 60, "pil"))
+        rasterized = np.asarray(draw_frame(viewport, map_img, frame, 80, 60))
+        assert (pil == rasterized).all(axis=-1).mean() > 0.95
+
+    out = io.BytesIO()
+    assert write_gif(tracks, interaction_map, out, 80, 60, backend="pil") == 4
+
+
+def test_export_writes_every_session_and_resumes(tmp_path):
+    (tmp_path / "root").mkdir()
+    catalog = Catalog(_write_root(tmp_path / "root"))
+    jobs = plan_exports(catalog, tmp_path / "out")
+    assert [(j.dataset, j.session) for j in jobs] == [("DR_A", 0), ("DR_A", 2)]
+
+    results = list(export_gifs(catalog, jobs, width=80, height=60))
+    assert {r.job.session: (r.status, r.num_frames) for r in results} == {
+        0: ("written", 4),
+        2: ("written", 3),
+    }
+    with Image.open(tmp_path / "out" / "DR_A" / "2.gif") as img:
+        assert img.n_frames == 3
+    umask = os.umask(0)
+    os.umask(umask)
+    assert (
+        tmp_path / "out" / "DR_A" / "2.gif"
+    ).stat().st_mode & 0o777 == 0o666 & ~umask
+    assert sorted(p.name for p in (tmp_path / "out" / "DR_A").iterdir()) == [
+        "0.gif",
+        "2.gif",
+    ]
+
+    # Outputs older than their sources are exported again, the rest are skipped.
+    os.utime(jobs[1].output, (0, 0))
+    results = list(export_gifs(catalog, jobs, workers=2, width=80, height=60))
+    assert {(r.job.session, r.status) for r in results} == {
+        (0, "skipped"),
+        (2, "written"),
+    }
+
+
+class _ParentOnlyCatalog(Catalog):
+    def __init__(self, root):
+        super().__init__(root)
+        self.pid = os.getpid()
+        self.maps_loaded = 0
+
+    def load_map(self, dataset):
+        assert os.getpid() == self.pid, "maps are loaded by the parent process"
+        self.maps_loaded += 1
+        return super().load_map(dataset)
+
+
+def test_export_loads_each_map_once(tmp_path):
+    (tmp_path / "root").mkdir()
+    catalog = _ParentOnlyCatalog(_write_root(tmp_path / "root"))
+    jobs = plan_exports(catalog, tmp_path / "out")
+
+    results = list(export_gifs(catalog, jobs, workers=2, width=80, height=60))
+    assert [r.status for r in results] == ["written", "written"]
+    assert catalog.maps_loaded == 1
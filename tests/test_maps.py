@@ -0,0 +1,131 @@
+import io
+
+import numpy as np
+
+from interactionviz.maps import MapMesh, WayKind, load_map_xml
+from interactionviz.maps.map import zipper_triangulate
+
+MAP = """<?xml version="1.0" encoding="UTF-8"?>
+<osm>
+  <node id="1" x="0.0" y="0.0"/>
+  <node id="2" x="10.0" y="0.0"/>
+  <node id="3" x="0.0" y="3.0"/>
+  <node id="4" x="10.0" y="3.0"/>
+  <node id="5" x="5.0" y="3.2"/>
+  <way id="10"><nd ref="3"/><nd ref="5"/><nd ref="4"/><tag k="type" v="line_thin"/><tag k="subtype" v="solid"/></way>
+  <way id="11"><nd ref="1"/><nd ref="2"/><tag k="type" v="virtual"/></way>
+  <way id="12"><nd ref="1"/><nd ref="3"/><tag k="type" v="stop_line"/></way>
+  <relation id="20">
+    <member type="way" ref="10" role="left"/>
+    <member type="way" ref="11" role="right"/>
+    <tag k="type" v="lanelet"/>
+  </relation>
+</osm>
+"""
+
+
+def test_map_mesh():
+    interaction_map = load_map_xml(io.StringIO(MAP))
+    mesh = interaction_map.mesh
+
+    assert interaction_map.mesh is mesh
+    assert mesh.lane_ids == ["20"]
+    np.testing.assert_array_equal(
+        mesh.lane_triangles(), interaction_map.lanes["20"].to_triangles()
+    )
+    assert len(mesh.lane_triangles()) == 3
+
+    assert set(mesh.ways) == {WayKind.SolidLine, WayKind.Virtual, WayKind.StopLine}
+    assert set(mesh.lane_boundaries) == {WayKind.SolidLine, WayKind.Virtual}
+    np.testing.assert_array_equal(
+        mesh.ways[WayKind.StopLine][0], [[0.0, 0.0], [0.0, 3.0]]
+    )
+
+
+def test_map_mesh_arrays_roundtrip():
+    mesh = load_map_xml(io.StringIO(MAP)).mesh
+    restored = MapMesh.from_arrays(mesh.to_arrays())
+
+    np.testing.assert_array_equal(restored.lane_triangles(), mesh.lane_triangles())
+    np.testing.assert_array_equal(restored.region_triangles(), mesh.region_triangles())
+    assert restored.ways[WayKind.SolidLine].way_ids == ["10"]
+    np.testing.assert_array_equal(
+        restored.ways[WayKind.SolidLine].vertices, mesh.ways[WayKind.SolidLine].vertices
+    )
+
+
+def _area(triangles):
+    u = triangles[:, 1] - triangles[:, 0]
+    v = triangles[:, 2] - triangles[:, 0]
+    return 0.5 * (u[:, 0] * v[:, 1] - u[:, 1] * v[:, 0])
+
+
+def _polygon_area(ps):
+    x, y = ps[:, 0], ps[:, 1]
+    return 0.5 * abs(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))
+
+
+def test_zipper_triangulate_curved_lane():
+    theta = np.linspace(0, 1.5 * np.pi, 30)
+    left = np.stack([10 * np.cos(theta), 10 * np.sin(theta)], axis=-1)
+    theta = np.linspace(0, 1.5 * np.pi, 17)
+    right = np.stack([13 * np.cos(theta), 13 * np.sin(theta)], axis=-1)
+
+    for r in (right, right[::-1]):
+        indices = zipper_triangulate(left, r)
+        triangles = np.concatenate([left, r])[indices]
+
+        assert len(indices) == len(left) + len(r) - 2
+        assert (_area(triangles) > 0).all()
+        np.testing.assert_allclose(
+            _area(triangles).sum(), _polygon_area(np.concatenate([left, right[::-1]]))
+        )
+
+
+def test_zipper_triangulate_degenerate():
+    point = np.array([[0.0, 0.0]])
+    line = np.array([[0.0, 1.0], [1.0, 1.0], [2.0, 1.0]])
+
+    assert zipper_triangulate(point, line).tolist() == [[0, 2, 1], [0, 3, 2]]
+    assert zipper_triangulate(point, point).shape == (0, 3)
+    assert zipper_triangulate(line, line).shape == (0, 3)
+
+
+def test_load_map_xml_arrays_and_views(tmp_path):
+    path = tmp_path / "map.osm_xy"
+    path.write_text(MAP)
+    interaction_map = load_map_xml(path)
+
+    assert interaction_map.node_positions.shape == (5, 2)
+    assert interaction_map.way_offsets.tolist() == [0, 3, 5, 7]
+    assert interaction_map.way_nodes.tolist() == [2, 4, 3, 0, 1, 0, 2]
+    assert interaction_map.lane_ways.tolist() == [[0, 1]]
+
+    assert list(interaction_map.nodes) == ["1", "2", "3", "4", "5"]
+    np.testing.assert_array_equal(interaction_map.nodes["5"].position, [5.0, 3.2])
+
+    way = interaction_map.ways["10"]
+    assert way.kind is WayKind.SolidLine
+    assert [n.osm_id for n in way.nodes] == ["3", "5", "4"]
+    np.testing.assert_array_equal(way.positions, [[0, 3], [5, 3.2], [10, 3]])
+
+    lane = interaction_map.lanes["20"]
+    assert lane.left_way.osm_id == "10"
+    assert lane.right_way.kind is WayKind.Virtual
+
+
+def test_spatial_index():
+    interaction_map = load_map_xml(io.StringIO(MAP))
+    index = interaction_map.spatial_index
+
+    points = np.array([[5.0, 1.0], [5.0, 10.0], [-1.0, 1.0], [0.0, 0.0]])
+    assert index.lanes_at(points).tolist() == [0, -1, -1, 0]
+
+    assert index.lanes_in_bbox(np.array([4.0, 1.0]), np.array([6.0, 2.0])).tolist() == [
+        0
+    ]
+    assert index.lanes_in_bbox(np.array([20.0, 1.0]), np.array([30.0, 2.0])).size == 0
+
+    # The box only touches the stop line, way 12.
+    ways = index.ways_in_bbox(np.array([-1.0, 1.0]), np.array([0.5, 2.0]))
+    assert [interaction_map.way_ids[w] for w in ways] == ["12"]
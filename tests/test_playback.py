@@ -0,0 +1,47 @@
+import numpy as np
+
+from interactionviz.viewers import FrameArrays, PlaybackClock, interpolate
+
+
+def test_clock_follows_wall_time_and_skips_frames():
+    clock = PlaybackClock(num_frames=10)
+    clock.advance(0.25)
+    assert clock.index == 2
+    assert np.isclose(clock.alpha, 0.5)
+
+    clock.speed = 4
+    clock.advance(0.1)
+    assert clock.index == 6
+
+    clock.pause()
+    clock.advance(1)
+    assert clock.index == 6
+
+    clock.play()
+    clock.advance(10)
+    assert clock.index == 9 and clock.ended and not clock.playing
+
+    clock.seek(-3)
+    assert clock.index == 0 and clock.alpha == 0
+
+
+def _agents(track_ids, xs, yaws):
+    n = len(track_ids)
+    return FrameArrays(
+        track_ids=track_ids,
+        kinds=np.zeros(n, dtype=np.int32),
+        positions=np.stack([np.array(xs, float), np.zeros(n)], axis=-1),
+        yaws=np.array(yaws, float),
+        extents=np.ones((n, 2)),
+    )
+
+
+def test_interpolate_matches_agents_by_track():
+    a = _agents(["1", "2", "3"], [0, 10, 20], [3.0, 1.0, 0])
+    b = _agents(["3", "1"], [30, 2], [0, -3.0])
+
+    between = interpolate(a, b, 0.5)
+    assert between.track_ids == ["1", "2", "3"]
+    np.testing.assert_allclose(between.positions[:, 0], [1, 10, 25])
+    # Agent 1 turns the short way round, through pi.
+    np.testing.assert_allclose(between.yaws, [np.pi, 1.0, 0])
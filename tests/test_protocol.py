@@ -0,0 +1,100 @@
+import numpy as np
+
+from interactionviz.tracks import load_tracks_files
+from interactionviz.viewers import Viewport, protocol
+from interactionviz.viewers.framecache import FrameCache
+
+from .test_tracks import _write_tracks
+
+
+def _viewport():
+    return Viewport(
+        screen_width=800,
+        screen_height=600,
+        viewport_x_range=np.array([0.0, 20.0]),
+        viewport_y_range=np.array([0.0, 30.0]),
+    )
+
+
+def test_deltas_reconstruct_every_frame(tmp_path):
+    tracks = load_tracks_files(*_write_tracks(tmp_path))
+    viewport = _viewport()
+    encoder = protocol.FrameEncoder(viewport, tracks)
+
+    state = {}
+    for index in range(len(tracks)):
+        message = protocol.decode(encoder.encode(index))
+        assert message["index"] == index
+        assert message["max_index"] == len(tracks)
+        assert message["frame_type"] == (
+            protocol.KEYFRAME if index == 0 else protocol.DELTA
+        )
+
+        for code in message["removed"]:
+            del state[code]
+        for code, s in zip(message["codes"], message["state"]):
+            state[code] = s
+
+        expected = protocol.FrameState.from_frame(viewport, tracks[index])
+        assert sorted(state) == expected.codes.tolist()
+        np.testing.assert_array_equal(
+            np.array([state[c] for c in expected.codes]), expected.state
+        )
+
+
+def test_unchanged_agents_are_not_resent(tmp_path):
+    tracks = load_tracks_files(*_write_tracks(tmp_path))
+    viewport = _viewport()
+    frame = protocol.FrameState.from_frame(viewport, tracks[1])
+
+    message = protocol.decode(protocol.encode_delta(1, 4, frame, frame))
+    assert len(message["removed"]) == 0
+    assert len(message["codes"]) == 0
+
+
+def test_seeking_sends_a_keyframe(tmp_path):
+    tracks = load_tracks_files(*_write_tracks(tmp_path))
+    encoder = protocol.FrameEncoder(_viewport(), tracks)
+
+    encoder.encode(0)
+    message = protocol.decode(encoder.encode(2))
+    assert message["frame_type"] == protocol.KEYFRAME
+
+
+def test_new_tracks_are_sent_once(tmp_path):
+    tracks = load_tracks_files(*_write_tracks(tmp_path))
+    encoder = protocol.FrameEncoder(_viewport(), tracks)
+
+    first = encoder.new_tracks(tracks[0])
+    assert first["track_ids"] == ["1"]
+    assert first["kinds"] == ["CAR"]
+
+    second = encoder.new_tracks(tracks[1])
+    assert second["track_ids"] == ["2", "P1"]
+    assert second["extents"][1] is None
+
+    assert encoder.new_tracks(tracks[2]) is None
+
+
+def test_encoders_share_frames_through_the_cache(tmp_path):
+    tracks = load_tracks_files(*_write_tracks(tmp_path))
+    cache = FrameCache()
+    first = protocol.FrameEncoder(_viewport(), tracks, cache)
+    second = protocol.FrameEncoder(_viewport(), tracks, cache)
+
+    messages = [first.encode(i) for i in range(len(tracks))]
+    assert [second.encode(i) for i in range(len(tracks))] == messages
+    assert cache.misses == len(tracks)
+    assert cache.hits == len(tracks)
+
+
+def test_frame_cache_evicts_least_recently_used():
+    cache = FrameCache(max_bytes=10)
+    cache.get("a", lambda: b"aaaa")
+    cache.get("b", lambda: b"bbbb")
+    cache.get("a", lambda: b"")
+    cache.get("c", lambda: b"cccc")
+
+    assert cache.nbytes == 8
+    assert cache.get("a", lambda: b"") == b"aaaa"
+    assert cache.get("b", lambda: b"new") == b"new"
@@ -0,0 +1,104 @@
+import asyncio
+import json
+
+from interactionviz.viewers.streaming import Player, QueuedFrame
+
+
+class _Serializer:
+    def __init__(self):
+        self.resets = 0
+
+    def serialize(self, index):
+        return QueuedFrame(index, f"delta {index}", [f"tracks {index}"])
+
+    def keyframe(self, frame):
+        return f"keyframe {frame.index}"
+
+    def reset(self):
+        self.resets += 1
+
+
+def test_player_sends_every_frame_in_order():
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def main():
+        player = Player(send, _Serializer(), num_frames=5)
+        await player.play(start=1, rate=1000)
+        await asyncio.gather(*player._tasks)
+        return player
+
+    player = asyncio.run(main())
+
+    assert sent[:-1] == [m for i in range(1, 5) for m in (f"tracks {i}", f"delta {i}")]
+    assert json.loads(sent[-1]) == dict(action="ended", index=4)
+    assert player.num_dropped == 0
+    assert not player.playing
+
+
+def test_player_coalesces_frames_for_slow_clients():
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+        if message.startswith("delta") or message.startswith("keyframe"):
+            await asyncio.sleep(0.02)
+
+    async def main():
+        player = Player(send, _Serializer(), num_frames=20)
+        await player.play(rate=500)
+        await asyncio.gather(*player._tasks)
+        return player
+
+    player = asyncio.run(main())
+    frames = [m for m in sent if not m.startswith("tracks")][:-1]
+
+    assert player.num_dropped > 0
+    assert len(frames) + player.num_dropped == 20
+    assert any(m.startswith("keyframe") for m in frames)
+    # Tracks of dropped frames are still sent.
+    assert [m for m in sent if m.startswith("tracks")] == [
+        f"tracks {i}" for i in range(20)
+    ]
+
+
+def test_seek_while_paused_sends_one_frame():
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def main():
+        serializer = _Serializer()
+        player = Player(send, serializer, num_frames=5)
+        await player.seek(3)
+        return player, serializer
+
+    player, serializer = asyncio.run(main())
+
+    assert sent == ["tracks 3", "delta 3"]
+    assert player.index == 4
+    # Nothing was queued, so what the client has been sent is still known.
+    assert serializer.resets == 0
+
+
+def test_pause_forgets_what_was_sent_only_if_frames_were_dropped():
+    async def send(message):
+        await asyncio.sleep(0.01)
+
+    async def main():
+        serializer = _Serializer()
+        player = Player(send, serializer, num_frames=100)
+        await player.play(rate=1000)
+        await asyncio.sleep(0.05)
+        await player.pause()
+        resets = serializer.resets
+
+        await player.play(start=98, rate=1000)
+        await asyncio.gather(*player._tasks)
+        await player.pause()
+        return resets, serializer.resets
+
+    assert asyncio.run(main()) == (1, 1)
@@ -0,0 +1,154 @@
+import io
+
+import numpy as np
+import pytest
+
+from interactionviz.tracks import (
+    AgentKind,
+    FrameView,
+    LazyTracks,
+    TrackQuery,
+    TrackStore,
+    load_tracks_files,
+)
+from interactionviz.tracks.tracks import _load_tracks_csv
+
+VEHICLES = """track_id,frame_id,timestamp_ms,agent_type,x,y,vx,vy,psi_rad,length,width
+1,1,100,car,1.0,2.0,0.5,0.0,0.1,4.5,1.8
+1,2,200,car,1.5,2.0,0.5,0.0,0.1,4.5,1.8
+2,2,200,car,10.0,20.0,0.0,1.0,1.5,4.0,2.0
+2,3,300,car,10.0,21.0,0.0,1.0,1.5,4.0,2.0
+"""
+
+PEDESTRIANS = """track_id,frame_id,timestamp_ms,agent_type,x,y,vx,vy
+P1,2,200,pedestrian/bicycle,5.0,5.0,1.0,0.0
+P1,4,400,pedestrian/bicycle,6.0,5.0,1.0,0.0
+"""
+
+
+def _write_tracks(tmp_path):
+    vehicles = tmp_path / "vehicle_tracks_000.csv"
+    pedestrians = tmp_path / "pedestrian_tracks_000.csv"
+    vehicles.write_text(VEHICLES)
+    pedestrians.write_text(PEDESTRIANS)
+    return vehicles, pedestrians
+
+
+def test_load_tracks_files_merges_frames(tmp_path):
+    tracks = load_tracks_files(*_write_tracks(tmp_path))
+
+    assert isinstance(tracks, TrackStore)
+    assert [f.frame_id for f in tracks] == [1, 2, 3, 4]
+    assert [len(f.agents) for f in tracks] == [1, 3, 1, 1]
+    assert tracks.num_rows == 6
+
+
+def test_frame_view_agents(tmp_path):
+    tracks = load_tracks_files(*_write_tracks(tmp_path))
+    frame = tracks[1]
+
+    assert isinstance(frame, FrameView)
+    assert frame.track_ids == ["1", "2", "P1"]
+
+    car, _, pedestrian = frame.agents
+    assert car.kind is AgentKind.CAR
+    np.testing.assert_allclose(car.position, [1.5, 2.0])
+    np.testing.assert_allclose(car.extent, [4.5, 1.8], rtol=1e-6)
+    assert car.yaw == np.float32(0.1)
+
+    assert pedestrian.kind is AgentKind.BICYCLE
+    assert pedestrian.extent is None
+    assert pedestrian.yaw is None
+
+    np.testing.assert_allclose(frame.positions, [[1.5, 2.0], [10.0, 20.0], [5.0, 5.0]])
+    assert tracks[-1].frame_id == 4
+
+
+def test_trajectories_follow_tracks_through_frames(tmp_path):
+    tracks = load_tracks_files(*_write_tracks(tmp_path))
+
+    car = tracks.trajectory("2")
+    assert car.kind is AgentKind.CAR
+    assert car.frame_ids.tolist() == [2, 3]
+    np.testing.assert_allclose(car.positions, [[10.0, 20.0], [10.0, 21.0]])
+    np.testing.assert_allclose(car.velocities, [[0.0, 1.0], [0.0, 1.0]])
+
+    everything = tracks.trajectories()
+    assert [t.track_id for t in everything] == tracks.track_ids
+    assert sum(len(t) for t in everything) == tracks.num_rows
+    pedestrian = tracks.trajectories(["P1", "1"])[0]
+    assert np.isnan(pedestrian.yaws).all()
+
+    with pytest.raises(KeyError):
+        tracks.trajectory("missing")
+
+
+def test_load_tracks_csv_chunks():
+    whole = _load_tracks_csv(io.StringIO(VEHICLES))
+    chunked = _load_tracks_csv(io.StringIO(VEHICLES), chunk_rows=1)
+
+    assert whole.keys() == chunked.keys()
+    for name in whole:
+        np.testing.assert_array_equal(whole[name], chunked[name])
+
+    pedestrians = _load_tracks_csv(io.StringIO(PEDESTRIANS))
+    assert np.isnan(pedestrians["psi"]).all()
+    assert (pedestrians["kind"] == AgentKind.BICYCLE.value).all()
+
+    # Blank lines and line endings are ignored, rows with missing fields are rejected.
+    spaced = _load_tracks_csv(io.StringIO(VEHICLES.replace("\n", "\r\n\n")))
+    np.testing.assert_array_equal(spaced["x"], whole["x"])
+    with pytest.raises(ValueError):
+        _load_tracks_csv(io.StringIO(VEHICLES.replace(",4.5,1.8", ",4.5", 1)))
+    assert len(_load_tracks_csv(io.StringIO(""))["x"]) == 0
+
+
+def test_lazy_tracks_match_store(tmp_path):
+    # Empty trackfiles are loaded as having no rows.
+    empty = tmp_path / "pedestrian_tracks_001.csv"
+    empty.write_text("")
+    paths = [*_write_tracks(tmp_path), empty]
+    store = load_tracks_files(*paths)
+    lazy = LazyTracks(*paths, cache_size=2)
+
+    assert len(lazy) == len(store)
+    for i in reversed(range(len(store))):
+        assert lazy[i].frame_id == store[i].frame_id
+        assert lazy[i].track_ids == store[i].track_ids
+        np.testing.assert_array_equal(lazy[i].positions, store[i].positions)
+        np.testing.assert_array_equal(lazy[i].yaws, store[i].yaws)
+
+    assert len(lazy._frames) == 2
+    assert lazy[1].agents[2].yaw is None
+
+
+def test_track_query_matches_a_scan(tmp_path):
+    tracks = load_tracks_files(*_write_tracks(tmp_path))
+    query = TrackQuery(tracks, cell_size=2.0, block_frames=2)
+
+    def scan(first, stop, lower, upper):
+        return [
+            (f.frame_id, a.track_id)
+            for f in tracks
+            for a in f.agents
+            if first <= f.frame_id < stop
+            and np.all(a.position >= lower)
+            and np.all(a.position <= upper)
+        ]
+
+    for frames, lower, upper in [
+        ((1, 5), [0, 0], [100, 100]),
+        ((2, 4), [0, 0], [10, 20.5]),
+        ((2, 3), [4, 4], [6, 6]),
+        ((3, 3), [0, 0], [100, 100]),
+    ]:
+        result = query.query(frames, bbox=(np.array(lower), np.array(upper)))
+        found = [
+            (f, tracks.track_ids[t]) for f, t in zip(result.frame_ids, result.tracks)
+        ]
+        assert found == scan(*frames, lower, upper)
+
+    triangle = np.array([[0, 0], [20, 0], [0, 20]])
+    result = query.query(polygon=triangle)
+    assert [tracks.track_ids[t] for t in result.tracks] == ["1", "1", "P1", "P1"]
+    assert len(query.query((2, 3))) == 3
@@ -0,0 +1,38 @@
+import numpy as np
+
+from interactionviz.viewers import Viewport
+
+
+def _viewport(screen_width=800, screen_height=600):
+    return Viewport(
+        screen_width=screen_width,
+        screen_height=screen_height,
+        viewport_x_range=np.array([100.0, 300.0]),
+        viewport_y_range=np.array([50.0, 100.0]),
+    )
+
+
+def test_project_corners():
+    viewport = _viewport()
+    projected = viewport.project(np.array([[200.0, 75.0], [300.0, 100.0]]))
+
+    # The map is 200m wide, so 1m is 600 / 200 = 3 pixels.
+    np.testing.assert_allclose(projected, [[400.0, 300.0], [700.0, 375.0]])
+
+
+def test_project_list_and_batch_agree():
+    viewport = _viewport()
+    points = np.random.default_rng(0).uniform(0, 500, size=(4, 6, 2))
+
+    batched = viewport.project(points)
+    listed = viewport.project(list(points[0]))
+
+    assert batched.shape == points.shape
+    assert isinstance(listed, list)
+    np.testing.assert_allclose(np.array(listed), batched[0])
+    np.testing.assert_allclose(viewport.unproject(batched), points)
+
+
+def test_project_no_scaling():
+    viewport = _viewport(None, None)
+    np.testing.assert_allclose(viewport.project([np.array([200.0, 75.0])]), [[0, 0]])
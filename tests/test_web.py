@@ -0,0 +1,172 @@
+import asyncio
+import gzip
+import http
+import io
+import json
+
+import numpy as np
+
+from interactionviz.catalog import Catalog
+from interactionviz.maps import load_map_xml
+from interactionviz.viewers import WebViewer, protocol
+from interactionviz.viewers.sessions import AsyncLRU
+
+from .test_catalog import _write_root
+from .test_maps import MAP
+
+
+def test_map_is_served_compressed_with_an_etag():
+    viewer = WebViewer(load_map_xml(io.StringIO(MAP)))
+
+    status, headers, body = asyncio.run(
+        viewer._serve_static("/map", {"Accept-Encoding": "gzip, deflate"})
+    )
+    assert status == http.HTTPStatus.OK
+    assert headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(body))["action"] == "map_data"
+
+    status, _, body = asyncio.run(
+        viewer._serve_static("/map", {"If-None-Match": headers["ETag"]})
+    )
+    assert status == http.HTTPStatus.NOT_MODIFIED
+    assert body == b""
+
+
+def test_static_files_are_preloaded():
+    viewer = WebViewer(load_map_xml(io.StringIO(MAP)))
+
+    status, headers, body = asyncio.run(viewer._serve_static("/viewer?x=1", {}))
+    assert status == http.HTTPStatus.OK
+    assert headers["Content-Type"] == "text/html"
+    assert b"app.js" in body
+
+    status, _, _ = asyncio.run(viewer._serve_static("/missing.js", {}))
+    assert status == http.HTTPStatus.NOT_FOUND
+    assert asyncio.run(viewer._serve_static("/", {})) is None
+
+
+class _Socket:
+    def __init__(self, requests):
+        self.requests = [json.dumps(r) for r in requests]
+        self.sent = []
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.requests:
+            raise StopAsyncIteration
+        return self.requests.pop(0)
+
+    async def send(self, message):
+        self.sent.append(message)
+
+    def responses(self, action):
+        return [
+            json.loads(m)["payload"]
+            for m in self.sent
+            if isinstance(m, str) and json.loads(m)["action"] == action
+        ]
+
+
+def test_clients_open_sessions_from_the_catalog(tmp_path):
+    catalog = Catalog(_write_root(tmp_path))
+    viewer = WebViewer(catalog=catalog)
+    socket = _Socket(
+        [
+            dict(action="hello", encodings=["binary"]),
+            dict(action="list_sessions"),
+            dict(action="open_session", dataset="DR_A", session=2),
+            dict(action="open_session", dataset="DR_C", session=0),
+        ]
+    )
+    asyncio.run(viewer._socket_server(socket, "/"))
+
+    sessions = socket.responses("session")
+    assert [(s["dataset"], s["session"]) for s in sessions] == [
+        ("DR_A", 0),
+        ("DR_A", 2),
+    ]
+    assert sessions[0]["max_index"] == 4
+    assert sessions[1]["map_url"] == "/map?dataset=DR_A"
+    assert socket.responses("sessions")[0]["datasets"][0] == dict(
+        name="DR_A", sessions=[0, 2]
+    )
+    assert "DR_C" in json.loads(socket.sent[-1])["message"]
+
+
+def test_sessions_load_once_and_are_evicted():
+    lru = AsyncLRU(max_bytes=10)
+    loads = []
+
+    def load(key):
+        loads.append(key)
+        return np.zeros(8, dtype=np.uint8)
+
+    async def main():
+        await asyncio.gather(*[lru.get("a", lambda: load("a")) for _ in range(5)])
+        await lru.get("b", lambda: load("b"))
+        await lru.get("a", lambda: load("a"))
+
+    asyncio.run(main())
+
+    assert loads == ["a", "b", "a"]
+    assert "a" in lru and "b" not in lru
+
+
+def test_cached_frames_match_the_tracks_of_a_reloaded_session(tmp_path):
+    root = _write_root(tmp_path)
+    # One track per frame, so tracks are numbered in the order their frames are decoded.
+    root.joinpath("recorded_trackfiles", "DR_A", "vehicle_tracks_005.csv").write_text(
+        "track_id,frame_id,timestamp_ms,agent_type,x,y,vx,vy,psi_rad,length,width\n"
+        + "".join(
+            f"{t},{t},{100 * t},car,{t}.0,0.0,0.0,0.0,0.0,4.0,2.0\n" for t in (1, 2, 3)
+        )
+    )
+    viewer = WebViewer(catalog=Catalog(root, lazy=True), max_bytes=1)
+
+    first = _Socket(
+        [
+            dict(action="hello", encodings=["binary"]),
+            dict(action="open_session", dataset="DR_A", session=5),
+            dict(action="seek", index=2),
+            # Evicts session 5.
+            dict(action="open_session", dataset="DR_A", session=0),
+        ]
+    )
+    asyncio.run(viewer._socket_server(first, "/"))
+
+    second = _Socket(
+        [
+            dict(action="hello", encodings=["binary"]),
+            dict(action="open_session", dataset="DR_A", session=5),
+            dict(action="seek", index=1),
+            dict(action="seek", index=2),
+        ]
+    )
+    asyncio.run(viewer._socket_server(second, "/"))
+
+    track_ids = {}
+    for payload in second.responses("tracks"):
+        track_ids.update(zip(payload["codes"], payload["track_ids"]))
+    frame = protocol.decode([m for m in second.sent if isinstance(m, bytes)][-1])
+    assert frame["index"] == 2
+    assert [track_ids[c] for c in frame["codes"]] == ["3"]
+
+
+def test_seeking_while_paused_sends_deltas_and_each_track_once(tmp_path):
+    viewer = WebViewer(catalog=Catalog(_write_root(tmp_path)))
+    socket = _Socket(
+        [dict(action="hello", encodings=["binary"])]
+        + [dict(action="seek", index=i) for i in range(2)]
+        # Still sent by older clients.
+        + [dict(action="request_frame", index=i) for i in range(2, 4)]
+    )
+    asyncio.run(viewer._socket_server(socket, "/"))
+
+    codes = [c for payload in socket.responses("tracks") for c in payload["codes"]]
+    assert sorted(codes) == sorted(set(codes))
+    frames = [protocol.decode(m) for m in socket.sent if isinstance(m, bytes)]
+    assert [f["frame_type"] for f in frames] == [protocol.KEYFRAME] + [
+        protocol.DELTA
+    ] * 3